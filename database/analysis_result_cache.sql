@@ -0,0 +1,16 @@
+-- Cache partagé des résultats d'analyse (API et workers Python)
+--
+-- Activé côté Python par RESULT_CACHE_SUPABASE=true (voir result_cache.py).
+-- La clé est un SHA-256 de l'URL normalisée, du segment, des options et
+-- de la configuration de l'analyseur (ANALYZER_VERSION comprise).
+
+CREATE TABLE IF NOT EXISTS analysis_result_cache (
+  key TEXT PRIMARY KEY,
+  result JSONB NOT NULL,
+  stored_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+-- Purge des entrées anciennes (à planifier, ex. pg_cron)
+-- DELETE FROM analysis_result_cache WHERE stored_at < now() - interval '30 days';
+CREATE INDEX IF NOT EXISTS analysis_result_cache_stored_at
+  ON analysis_result_cache (stored_at);
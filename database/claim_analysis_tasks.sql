@@ -0,0 +1,28 @@
+-- Réservation atomique d'un lot de tâches d'analyse (workers Python)
+--
+-- Appelée via PostgREST : POST /rest/v1/rpc/claim_analysis_tasks {"batch_size": N}
+-- (activée côté worker par TASK_CLAIM_RPC=true).
+-- FOR UPDATE SKIP LOCKED : deux workers concurrents ne réservent jamais la
+-- même ligne et ne s'attendent pas l'un l'autre.
+
+CREATE OR REPLACE FUNCTION claim_analysis_tasks(batch_size INTEGER DEFAULT 1)
+RETURNS SETOF analysis_tasks
+LANGUAGE sql
+AS $$
+  UPDATE analysis_tasks
+  SET status = 'processing'
+  WHERE id IN (
+    SELECT id
+    FROM analysis_tasks
+    WHERE status = 'pending'
+    ORDER BY created_at ASC
+    LIMIT batch_size
+    FOR UPDATE SKIP LOCKED
+  )
+  RETURNING *;
+$$;
+
+-- Index partiel : la sous-requête ne parcourt que les tâches en attente
+CREATE INDEX IF NOT EXISTS analysis_tasks_pending_created_at
+  ON analysis_tasks (created_at)
+  WHERE status = 'pending';
@@ -0,0 +1,23 @@
+-- Notification des workers à chaque nouvelle tâche d'analyse
+--
+-- Les workers écoutent le canal avec LISTEN (TASK_NOTIFY_DSN = connexion
+-- Postgres directe, TASK_NOTIFY_CHANNEL = analysis_tasks) et réservent la
+-- tâche dès la notification, sans attendre le prochain poll.
+
+CREATE OR REPLACE FUNCTION notify_analysis_task_pending()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  PERFORM pg_notify('analysis_tasks', NEW.id::text);
+  RETURN NEW;
+END;
+$$;
+
+-- Nouvelle tâche, ou tâche remise en attente (relance, worker arrêté)
+DROP TRIGGER IF EXISTS analysis_tasks_notify_pending ON analysis_tasks;
+CREATE TRIGGER analysis_tasks_notify_pending
+  AFTER INSERT OR UPDATE OF status ON analysis_tasks
+  FOR EACH ROW
+  WHEN (NEW.status = 'pending')
+  EXECUTE FUNCTION notify_analysis_task_pending();
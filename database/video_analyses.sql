@@ -0,0 +1,27 @@
+-- Historique des analyses à la demande (routes /analyze, /compare, /analyze-trailer)
+--
+-- Écrit par SupabaseManager.save_analysis_result, lu par GET /history et
+-- par le frontend (tmdb_id, pacing_score). Les colonnes sont ajoutées si la
+-- table existe déjà (anciennes analyses Dailymotion).
+
+CREATE TABLE IF NOT EXISTS video_analyses (
+  id BIGSERIAL PRIMARY KEY,
+  created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+ALTER TABLE video_analyses
+  ADD COLUMN IF NOT EXISTS tmdb_id BIGINT,
+  ADD COLUMN IF NOT EXISTS video_path TEXT,
+  ADD COLUMN IF NOT EXISTS title TEXT,
+  ADD COLUMN IF NOT EXISTS series_title TEXT,
+  ADD COLUMN IF NOT EXISTS pacing_score REAL,
+  ADD COLUMN IF NOT EXISTS composite_score REAL,
+  ADD COLUMN IF NOT EXISTS average_shot_length REAL,
+  ADD COLUMN IF NOT EXISTS cuts_per_minute REAL,
+  ADD COLUMN IF NOT EXISTS evaluation_label TEXT,
+  ADD COLUMN IF NOT EXISTS age_rating TEXT,
+  ADD COLUMN IF NOT EXISTS metadata JSONB,
+  ADD COLUMN IF NOT EXISTS tmdb_data JSONB;
+
+CREATE INDEX IF NOT EXISTS video_analyses_created_at
+  ON video_analyses (created_at DESC);
@@ -0,0 +1,710 @@
+"""
+Moteur d'analyse fusionné (single-pass) pour PacingScore
+
+Chaque frame n'est décodée qu'une seule fois : le flux lu par PySceneDetect
+alimente en parallèle la détection de cuts, les statistiques de luminosité
+(frames noires / flashs), l'échantillonnage du mouvement et la durée.
+
+Le flux provient d'une source de frames interchangeable (voir frame_source.py).
+"""
+
+import inspect
+import time
+from typing import Dict, List, Optional, Any, Tuple
+
+import cv2
+import numpy as np
+from scenedetect import SceneManager, ContentDetector
+from scenedetect.frame_timecode import FrameTimecode
+
+from frame_source import FrameSource, open_frame_source
+from motion_estimators import MotionEstimator, FarnebackEstimator, get_motion_estimator
+from quality_gate import QualityGate
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+# Paramètres historiques des étapes (identiques aux passes séparées)
+BLACK_FRAME_LUMINOSITY = 10
+FLASH_LUMINOSITY_DIFF = 100
+MOTION_FRAME_STEP = 10
+MOTION_MAX_SECONDS = 30
+# Taille des blocs préalloués de la série de luminosité (en frames)
+LUMINANCE_CHUNK_FRAMES = 4096
+
+# Unité de start_time / end_time pour toutes les étapes, détection des cuts
+# comprise. L'ancienne détection passait ces valeurs (entières) à
+# scenedetect.detect, qui les lisait comme des numéros de frame : les scores
+# d'un segment explicite diffèrent donc des résultats d'avant le moteur fusionné
+# (voir VideoAnalyzer.analysis_signature)
+SEGMENT_UNITS = "seconds"
+
+
+def frame_window(fps: float, total_frames: int, start_time: float = 0, end_time: float = None) -> Tuple[int, int]:
+    """
+    Calcule la fenêtre [start_frame, end_frame) d'une étape, avec les mêmes
+    arrondis que les passes historiques.
+    """
+    start_frame = int(start_time * fps) if start_time > 0 else 0
+    end_frame = int(end_time * fps) if end_time else total_frames
+    end_frame = min(end_frame, total_frames)
+    return start_frame, end_frame
+
+
+def segment_duration(total_duration: float, start_time: float = 0, end_time: float = None) -> float:
+    """Durée analysée du segment [start_time, end_time) d'une vidéo de `total_duration` secondes"""
+    if start_time or end_time:
+        segment_end = min(end_time, total_duration) if end_time else total_duration
+        return segment_end - start_time
+    return total_duration
+
+
+class FrameTap:
+    """
+    Consommateur de frames branché sur le flux décodé.
+
+    Ne traite que les frames de sa fenêtre [start_frame, end_frame) et vérifie
+    qu'il les a toutes reçues ; sinon `covered()` renvoie False et l'appelant
+    doit relancer l'étape séparément.
+    """
+
+    def __init__(self, start_frame: int, end_frame: int):
+        self.start_frame = start_frame
+        self.end_frame = end_frame
+        self.first_index = None
+        self.last_index = None
+        self.contiguous = True
+        self.failed = False
+
+    def wants(self, index: int) -> bool:
+        """True si la frame `index` doit être décodée pour cette étape"""
+        return self.start_frame <= index < self.end_frame
+
+    def next_wanted(self, index: int) -> int:
+        """Prochaine frame voulue après `index`"""
+        return index + 1
+
+    def last_wanted(self) -> int:
+        """Dernière frame voulue de la fenêtre"""
+        return self.end_frame - 1
+
+    def feed(self, index: int, frame: np.ndarray):
+        if self.failed or not self.wants(index):
+            return
+        if self.last_index is not None and index != self.next_wanted(self.last_index):
+            self.contiguous = False
+        if self.first_index is None:
+            self.first_index = index
+        self.last_index = index
+        try:
+            self.on_frame(index, frame)
+        except Exception as e:
+            logger.warning(f"{type(self).__name__}: erreur sur la frame {index}: {e}")
+            self.failed = True
+
+    def on_frame(self, index: int, frame: np.ndarray):
+        raise NotImplementedError
+
+    @staticmethod
+    def to_gray(frame: np.ndarray) -> np.ndarray:
+        """Les sources en niveaux de gris produisent déjà des frames 2D"""
+        if frame.ndim == 2:
+            return frame
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+    def covered(self, reached_eof: bool) -> bool:
+        """True si toute la fenêtre a été vue (ou si le flux s'est terminé avant)"""
+        if self.failed or not self.contiguous:
+            return False
+        first_wanted = self.next_wanted(self.start_frame - 1)
+        if first_wanted >= self.end_frame:
+            return True
+        if self.first_index != first_wanted:
+            return False
+        return reached_eof or self.last_index >= self.last_wanted()
+
+
+class LuminanceSeries:
+    """
+    Série temporelle float32 de la luminosité moyenne par frame, remplie dans
+    des blocs préalloués (pas de liste Python par frame).
+    """
+
+    def __init__(self, first_frame: int = 0, chunk_frames: int = LUMINANCE_CHUNK_FRAMES):
+        self.first_frame = first_frame
+        self.chunk_frames = chunk_frames
+        self._chunks: List[np.ndarray] = []
+        self._filled = 0
+
+    def append(self, value: float):
+        if not self._chunks or self._filled == self.chunk_frames:
+            self._chunks.append(np.empty(self.chunk_frames, dtype=np.float32))
+            self._filled = 0
+        self._chunks[-1][self._filled] = value
+        self._filled += 1
+
+    def __len__(self) -> int:
+        if not self._chunks:
+            return 0
+        return (len(self._chunks) - 1) * self.chunk_frames + self._filled
+
+    def to_array(self) -> np.ndarray:
+        if not self._chunks:
+            return np.empty(0, dtype=np.float32)
+        parts = self._chunks[:-1] + [self._chunks[-1][:self._filled]]
+        return np.concatenate(parts)
+
+
+def summarize_luminance(luminance: np.ndarray, fps: float, first_frame: int = 0,
+                        black_threshold: float = BLACK_FRAME_LUMINOSITY,
+                        flash_threshold: float = FLASH_LUMINOSITY_DIFF,
+                        top_k: int = 5) -> Dict[str, Any]:
+    """
+    Frames noires, flashs et intensité à partir d'une série de luminosité.
+
+    Entièrement vectorisé ; permet aussi de re-scorer une série déjà calculée
+    avec d'autres seuils.
+
+    Args:
+        luminance: Luminosité moyenne par frame (float32)
+        fps: Images par seconde de la vidéo
+        first_frame: Index de la frame correspondant à luminance[0]
+        top_k: Nombre de flashs détaillés (les plus forts, dans l'ordre chronologique)
+    """
+    black_frame_count = int(np.count_nonzero(luminance < black_threshold))
+
+    diffs = np.abs(np.diff(luminance))
+    flash_positions = np.flatnonzero(diffs > flash_threshold)
+    flash_count = int(flash_positions.size)
+
+    if flash_count > top_k:
+        strongest = np.argpartition(diffs[flash_positions], -top_k)[-top_k:]
+        flash_positions = np.sort(flash_positions[strongest])
+
+    flash_details = []
+    for position in flash_positions:
+        frame = first_frame + int(position) + 1
+        flash_details.append({
+            "frame": frame,
+            "time": frame / fps,
+            "diff": float(diffs[position])
+        })
+
+    # Calculer l'intensité totale (flashs + frames noirs)
+    total_stimulus = black_frame_count * 2 + flash_count * 3
+    stimulus_intensity = min(100, total_stimulus)
+
+    return {
+        "black_frames": black_frame_count,
+        "flashes": flash_count,
+        "flash_details": flash_details,  # Top flashs
+        "intensity": round(stimulus_intensity, 2)
+    }
+
+
+class LuminanceTap(FrameTap):
+    """Frames noires et flashs (changement brutal de luminosité moyenne)"""
+
+    def __init__(self, start_frame: int, end_frame: int, fps: float):
+        super().__init__(start_frame, end_frame)
+        self.fps = fps
+        self.series = LuminanceSeries(first_frame=start_frame)
+
+    def on_frame(self, index: int, frame: np.ndarray):
+        self.series.append(cv2.mean(self.to_gray(frame))[0])
+
+    @property
+    def luminance(self) -> np.ndarray:
+        return self.series.to_array()
+
+    def result(self) -> Dict[str, Any]:
+        return summarize_luminance(self.luminance, self.fps, first_frame=self.series.first_frame)
+
+
+class MotionTap(FrameTap):
+    """
+    Mouvement entre frames échantillonnées toutes les MOTION_FRAME_STEP frames,
+    mesuré par un MotionEstimator (Farneback pleine résolution par défaut).
+
+    `scale` ramène les déplacements mesurés sur une frame réduite à la
+    résolution d'origine, pour conserver l'échelle 0-100.
+    """
+
+    def __init__(self, start_frame: int, end_frame: int, scale: float = 1.0,
+                 estimator: MotionEstimator = None, deferred: bool = False):
+        """
+        Args:
+            deferred: Si True, les frames échantillonnées sont seulement
+                      conservées ; les scores sont calculés à l'appel de release()
+        """
+        super().__init__(start_frame, end_frame)
+        self.scale = scale
+        self.estimator = estimator or FarnebackEstimator()
+        self.prev_frame = None
+        self.motion_scores = []
+        self.pending: Optional[List[np.ndarray]] = [] if deferred else None
+
+    def wants(self, index: int) -> bool:
+        return super().wants(index) and index % MOTION_FRAME_STEP == 0
+
+    def next_wanted(self, index: int) -> int:
+        return (index // MOTION_FRAME_STEP + 1) * MOTION_FRAME_STEP
+
+    def last_wanted(self) -> int:
+        return (self.end_frame - 1) // MOTION_FRAME_STEP * MOTION_FRAME_STEP
+
+    def on_frame(self, index: int, frame: np.ndarray):
+        gray = self.to_gray(frame)
+        if self.pending is not None:
+            self.pending.append(gray)
+            return
+        self._score(gray)
+
+    def _score(self, gray: np.ndarray):
+        if self.prev_frame is not None:
+            self.motion_scores.append(self.estimator.score(self.prev_frame, gray, self.scale))
+        self.prev_frame = gray
+
+    def release(self):
+        """Calcule les scores des frames conservées, puis au fil de l'eau"""
+        pending, self.pending = self.pending, None
+        for gray in pending or []:
+            self._score(gray)
+
+    def result(self) -> float:
+        if self.motion_scores:
+            return round(np.mean(self.motion_scores), 2)
+        return 0.0
+
+
+class GateTap(FrameTap):
+    """
+    Consulte un QualityGate à chaque frame de la fenêtre, avec le nombre de
+    cuts déjà détectés (compté par le callback du SceneManager).
+
+    ACCEPT libère les étapes différées ; ABORT arrête la détection.
+    """
+
+    def __init__(self, start_frame: int, end_frame: int, fps: float, gate: QualityGate,
+                 scene_manager: SceneManager, deferred_taps: List["MotionTap"] = None):
+        super().__init__(start_frame, end_frame)
+        self.fps = fps
+        self.gate = gate
+        self.scene_manager = scene_manager
+        self.deferred_taps = deferred_taps or []
+        self.cuts = 0
+        self.frames_done = 0
+        self.decision = QualityGate.CONTINUE
+        self.decision_frame = None
+
+    def on_cut(self, *args):
+        """Callback SceneManager (frame, position) : un cut de plus"""
+        self.cuts += 1
+
+    def on_frame(self, index: int, frame: np.ndarray):
+        self.frames_done += 1
+        if self.decision != QualityGate.CONTINUE:
+            return
+        decision = self.gate.check(self.cuts, self.frames_done, self.end_frame - self.start_frame, self.fps)
+        if decision == QualityGate.CONTINUE:
+            return
+        self.decision = decision
+        self.decision_frame = index
+        if decision == QualityGate.ACCEPT:
+            self.release()
+        else:
+            self.scene_manager.stop()
+
+    def release(self):
+        for tap in self.deferred_taps:
+            tap.release()
+
+
+class LumaContentDetector(ContentDetector):
+    """
+    ContentDetector pour les sources en niveaux de gris : le score d'une
+    frame est la seule variation de luminance (équivalent de luma_only=True).
+    Les frames BGR sont traitées par le détecteur standard.
+    """
+
+    def __init__(self, *args, **kwargs):
+        kwargs["luma_only"] = True
+        super().__init__(*args, **kwargs)
+        self._last_lum = None
+
+    def _calculate_frame_score(self, position, frame_img: np.ndarray) -> float:
+        if frame_img.ndim == 3:
+            return super()._calculate_frame_score(position, frame_img)
+        lum = frame_img.astype(np.int32)
+        if self._last_lum is None:
+            self._last_lum = lum
+            return 0.0
+        frame_score = float(np.mean(np.abs(lum - self._last_lum)))
+        self._last_lum = lum
+        return frame_score
+
+
+# PySceneDetect 0.6 repère les frames par leur numéro, 0.7 par un FrameTimecode
+_DETECTOR_TAKES_TIMECODE = list(inspect.signature(ContentDetector.process_frame).parameters)[1] == "timecode"
+
+
+def frame_index(position) -> int:
+    """Numéro de frame d'une position de détecteur (int ou FrameTimecode)"""
+    return getattr(position, "frame_num", position)
+
+
+class FrameScoreRecorder:
+    """
+    Mixin de détecteur : enregistre le score de chaque frame à partir de
+    `record_from` au lieu d'émettre des cuts (voir replay_cuts).
+    """
+
+    def __init__(self, *args, record_from: int = 0, record_to: int = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.record_from = record_from
+        self.record_to = record_to
+        self.first_recorded = None
+        self.frame_scores: List[float] = []
+
+    def process_frame(self, position, frame_img: np.ndarray) -> list:
+        score = self._calculate_frame_score(position, frame_img)
+        index = frame_index(position)
+        if index >= self.record_from and (self.record_to is None or index < self.record_to):
+            if self.first_recorded is None:
+                self.first_recorded = index
+            self.frame_scores.append(np.nan if score is None else score)
+        return []
+
+
+class RecordingContentDetector(FrameScoreRecorder, ContentDetector):
+    pass
+
+
+class RecordingLumaContentDetector(FrameScoreRecorder, LumaContentDetector):
+    pass
+
+
+class ScoreReplayDetector(ContentDetector):
+    """ContentDetector alimenté par des scores déjà calculés (aucun décodage)"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.next_score = None
+
+    def _calculate_frame_score(self, position, frame_img) -> Optional[float]:
+        return self.next_score
+
+
+def replay_cuts(frame_scores: np.ndarray, first_frame: int, frame_rate,
+                threshold: float, min_scene_len: int) -> List[int]:
+    """
+    Rejoue le filtre de longueur minimale du ContentDetector sur une série
+    de scores par frame : donne les mêmes cuts qu'une détection en série
+    sur les mêmes frames.
+    """
+    detector = ScoreReplayDetector(threshold=threshold, min_scene_len=min_scene_len)
+    cuts = set()
+    for offset, score in enumerate(frame_scores):
+        index = first_frame + offset
+        detector.next_score = None if np.isnan(score) else float(score)
+        position = FrameTimecode(index, frame_rate) if _DETECTOR_TAKES_TIMECODE else index
+        cuts.update(frame_index(cut) for cut in detector.process_frame(position, None))
+    return sorted(cuts)
+
+
+class FusedAnalysisEngine:
+    """
+    Exécute en une seule passe de décodage la détection de cuts, la détection
+    des flashs / frames noires, l'échantillonnage du mouvement et le calcul
+    de la durée.
+
+    Avec la source "cv2", les résultats sont identiques à ceux des passes
+    séparées ; la source "ffmpeg-gray" en donne une approximation sur des
+    frames réduites, nettement moins coûteuse. Si une étape n'a
+    pas pu voir toute sa fenêtre de frames (segment plus large que celui
+    décodé pour la détection de cuts), elle est signalée comme non couverte
+    (valeur None) et doit être recalculée par l'appelant.
+    """
+
+    def __init__(self, threshold: float = 27.0, min_scene_len: int = 15,
+                 frame_source: str = None, analysis_width: int = None,
+                 motion_estimator: str = None):
+        """
+        Args:
+            threshold: Seuil du ContentDetector
+            min_scene_len: Durée minimale d'une scène (en frames)
+            frame_source: Backend de décodage ("cv2" ou "ffmpeg-gray", défaut: ANALYZER_FRAME_SOURCE)
+            analysis_width: Largeur d'analyse des backends réduits (défaut: ANALYZER_ANALYSIS_WIDTH)
+            motion_estimator: Estimateur de mouvement (voir motion_estimators.py,
+                              défaut: ANALYZER_MOTION_ESTIMATOR)
+        """
+        self.threshold = threshold
+        self.min_scene_len = min_scene_len
+        self.frame_source = frame_source
+        self.analysis_width = analysis_width
+        self.motion_estimator = motion_estimator
+        # Validation immédiate du nom de l'estimateur
+        get_motion_estimator(motion_estimator)
+
+    def new_motion_tap(self, video: FrameSource, start_frame: int, end_frame: int,
+                       deferred: bool = False) -> MotionTap:
+        return MotionTap(
+            start_frame, end_frame,
+            scale=video.native_width / float(video.output_width),
+            estimator=get_motion_estimator(self.motion_estimator),
+            deferred=deferred
+        )
+
+    def open_source(self, video_path: str) -> FrameSource:
+        return open_frame_source(video_path, backend=self.frame_source, analysis_width=self.analysis_width)
+
+    @staticmethod
+    def seek_to_frame(video: FrameSource, start_frame: int):
+        """
+        Positionne la source pour que la prochaine frame lue soit `start_frame`.
+
+        Les backends sautent à la keyframe précédente et ne décodent que
+        l'intervalle keyframe -> start_frame, au lieu de tout le début.
+        """
+        if start_frame > 0:
+            video.seek(FrameTimecode(int(start_frame), video.frame_rate))
+
+    def run_taps(self, video_path: str, build_taps) -> List[FrameTap]:
+        """
+        Exécute une ou plusieurs étapes seules (sans détection de cuts),
+        en ne décodant que la fenêtre de frames qu'elles couvrent.
+
+        Args:
+            video_path: Chemin vers la vidéo
+            build_taps: fonction (source, fps, total_frames) -> liste de FrameTap
+        """
+        video = self.open_source(video_path)
+        taps = build_taps(video, video.native_fps, video.native_frame_count)
+        taps = [tap for tap in taps if tap.end_frame > tap.start_frame]
+        if not taps:
+            return []
+        video.taps.extend(taps)
+        self.seek_to_frame(video, min(tap.start_frame for tap in taps))
+        last_frame = max(tap.end_frame for tap in taps)
+        while video.frame_number < last_frame:
+            # Frames non échantillonnées : grab() sans retrieve()/conversion
+            index = video.frame_number
+            decode = any(tap.wants(index) for tap in taps)
+            if video.read(decode=decode) is False:
+                break
+        return taps
+
+    def run_luminance(self, video_path: str, start_time: float = 0, end_time: float = None) -> LuminanceTap:
+        """Étape flashs / frames noires seule ; le tap expose résultat et série de luminosité"""
+        windows = []
+
+        def build_taps(video, fps, total_frames):
+            windows.append(LuminanceTap(*frame_window(fps, total_frames, start_time, end_time), fps=fps))
+            return windows
+
+        self.run_taps(video_path, build_taps)
+        return windows[0]
+
+    def detect_black_frames_and_flashes(self, video_path: str, start_time: float = 0,
+                                        end_time: float = None) -> Dict[str, Any]:
+        """Étape flashs / frames noires seule, sur le segment demandé"""
+        return self.run_luminance(video_path, start_time, end_time).result()
+
+    def calculate_motion_intensity(self, video_path: str, start_time: float = 0,
+                                   end_time: float = None) -> float:
+        """Étape mouvement seule, sur le segment demandé"""
+        taps = self.run_taps(video_path, lambda video, fps, total_frames: [
+            self.new_motion_tap(video, *frame_window(fps, total_frames, start_time, end_time))
+        ])
+        if not taps:
+            return 0.0
+        return taps[0].result()
+
+    def run(self, video_path: str, analyze_motion: bool = True, analyze_flashes: bool = True,
+            start_time: float = 0, end_time: float = None, gate: QualityGate = None) -> Dict[str, Any]:
+        """
+        Args:
+            gate: Contrôle qualité progressif (voir quality_gate.py) : le
+                  mouvement n'est calculé qu'une fois le candidat accepté, et
+                  le décodage s'arrête si le gate l'abandonne
+
+        Retourne un dictionnaire contenant :
+            scene_list, fps, total_duration, analyzed_duration,
+            flash_analysis (None si non couvert ou désactivé),
+            luminance, luminance_first_frame (série float32 par frame, ou None),
+            motion_intensity (None si non couvert ou désactivé),
+            gate (décision, cuts et instant de la décision ; None sans gate),
+            stats (frames décodées, temps de décodage, frames/s)
+        """
+        started = time.perf_counter()
+        video = self.open_source(video_path)
+
+        # Durée : métadonnées du conteneur, sans ouvrir un second VideoCapture
+        fps = video.native_fps
+        total_frames = video.native_frame_count
+        total_duration = total_frames / fps if fps > 0 else 0
+
+        analyzed_duration = segment_duration(total_duration, start_time, end_time)
+
+        luminance_tap = None
+        if analyze_flashes:
+            luminance_tap = LuminanceTap(*frame_window(fps, total_frames, start_time, end_time), fps=fps)
+            video.taps.append(luminance_tap)
+
+        motion_tap = None
+        if analyze_motion and total_duration > 0:
+            motion_end = start_time + min(MOTION_MAX_SECONDS, analyzed_duration)
+            motion_tap = self.new_motion_tap(video, *frame_window(fps, total_frames, start_time, motion_end),
+                                             deferred=gate is not None)
+            video.taps.append(motion_tap)
+
+        scene_manager = SceneManager()
+        gate_tap = None
+        if gate is not None:
+            gate_tap = GateTap(*frame_window(fps, total_frames, start_time, end_time), fps=fps, gate=gate,
+                               scene_manager=scene_manager, deferred_taps=[motion_tap] if motion_tap else [])
+            video.taps.insert(0, gate_tap)
+
+        detector_class = LumaContentDetector if video.is_gray else ContentDetector
+        detector = detector_class(threshold=self.threshold, min_scene_len=self.min_scene_len)
+        end_timecode = None
+        if start_time or end_time:
+            # Seek vers la keyframe précédant le segment, puis décodage jusqu'à
+            # la première frame du segment (même arrondi que les autres étapes)
+            self.seek_to_frame(video, frame_window(fps, total_frames, start_time, end_time)[0])
+            if end_time is not None:
+                end_timecode = FrameTimecode(float(end_time), video.frame_rate)
+        scene_manager.add_detector(detector)
+        scene_manager.detect_scenes(video=video, end_time=end_timecode,
+                                    callback=gate_tap.on_cut if gate_tap else None)
+        scene_list = scene_manager.get_scene_list()
+
+        gate_result = None
+        if gate_tap is not None:
+            if gate_tap.decision == QualityGate.CONTINUE:
+                # Fin de fenêtre sans décision : étapes différées calculées
+                gate_tap.release()
+            gate_result = {
+                "decision": gate_tap.decision,
+                "cuts": gate_tap.cuts,
+                "frames": gate_tap.frames_done,
+                "seconds": round(gate_tap.frames_done / fps, 2) if fps > 0 else 0.0
+            }
+
+        if video.reached_eof and not video.is_seekable:
+            # Flux réseau : la durée réelle n'est connue qu'à la fin de la lecture
+            total_frames = video.frame_number
+            total_duration = total_frames / fps if fps > 0 else 0
+            analyzed_duration = segment_duration(total_duration, start_time, end_time)
+
+        flash_analysis = None
+        luminance = None
+        if luminance_tap is not None and luminance_tap.covered(video.reached_eof):
+            flash_analysis = luminance_tap.result()
+            luminance = luminance_tap.luminance
+
+        motion_intensity = None
+        if motion_tap is not None and motion_tap.pending is None and motion_tap.covered(video.reached_eof):
+            motion_intensity = motion_tap.result()
+
+        elapsed = time.perf_counter() - started
+        stats = {
+            "frames_decoded": video.frames_decoded,
+            "decode_seconds": round(elapsed, 3),
+            "frames_per_second": round(video.frames_decoded / elapsed, 1) if elapsed > 0 else 0.0,
+            "frame_source": video.BACKEND_NAME,
+            "frame_size": list(video.frame_size)
+        }
+
+        return {
+            "scene_list": scene_list,
+            "fps": fps,
+            "total_duration": total_duration,
+            "analyzed_duration": analyzed_duration,
+            "flash_analysis": flash_analysis,
+            "luminance": luminance,
+            "luminance_first_frame": luminance_tap.start_frame if luminance_tap else 0,
+            "motion_intensity": motion_intensity,
+            "gate": gate_result,
+            "stats": stats
+        }
+
+    def run_chunk(self, video_path: str, decode_start: int, own_start: int, own_end: int,
+                  analyze_flashes: bool = True, motion_window: Tuple[int, int] = None,
+                  last_chunk: bool = False, end_time: float = None) -> Dict[str, Any]:
+        """
+        Analyse une tranche [own_start, own_end) de l'analyse parallèle
+        (voir parallel_analysis.py).
+
+        Le décodage commence à `decode_start` (frame précédant la tranche, ou
+        dernière frame échantillonnée pour le mouvement) : le score de la
+        première frame de la tranche est donc calculé comme en série. Les
+        cuts ne sont pas décidés ici : la tranche renvoie le score de chaque
+        frame, rejoué en série par replay_cuts().
+
+        Args:
+            motion_window: Fenêtre [start, end) du mouvement pour toute l'analyse
+            last_chunk: True pour la dernière tranche, lue jusqu'à `end_time`
+                        (même arrondi que run()) ou jusqu'à la fin du fichier
+
+        Retourne un dictionnaire contenant :
+            frame_scores, first_scored_frame (None si aucune frame),
+            end_frame (frame suivant la dernière lue),
+            luminance (None si non couvert ou désactivé),
+            motion_scores (None si non couvert, [] si hors fenêtre),
+            frames_decoded, frame_source, frame_size
+        """
+        video = self.open_source(video_path)
+        fps = video.native_fps
+
+        luminance_tap = None
+        if analyze_flashes:
+            luminance_tap = LuminanceTap(own_start, own_end, fps=fps)
+            video.taps.append(luminance_tap)
+
+        motion_tap = None
+        if motion_window is not None:
+            motion_start, motion_end = motion_window
+            # La dernière frame échantillonnée avant la tranche sert de
+            # référence : la paire à cheval sur la frontière est calculée ici
+            seed = max(motion_start, (own_start - 1) // MOTION_FRAME_STEP * MOTION_FRAME_STEP)
+            tap_end = min(motion_end, own_end)
+            if seed < tap_end:
+                motion_tap = self.new_motion_tap(video, seed, tap_end)
+                video.taps.append(motion_tap)
+
+        detector_class = RecordingLumaContentDetector if video.is_gray else RecordingContentDetector
+        detector = detector_class(
+            threshold=self.threshold, min_scene_len=self.min_scene_len,
+            record_from=own_start, record_to=None if last_chunk else own_end
+        )
+        self.seek_to_frame(video, decode_start)
+        end_timecode = None
+        if last_chunk:
+            if end_time is not None:
+                end_timecode = FrameTimecode(float(end_time), video.frame_rate)
+        else:
+            end_timecode = FrameTimecode(int(own_end) + 1, video.frame_rate)
+        scene_manager = SceneManager()
+        scene_manager.add_detector(detector)
+        scene_manager.detect_scenes(video=video, end_time=end_timecode)
+
+        luminance = None
+        if luminance_tap is not None and luminance_tap.covered(video.reached_eof):
+            luminance = luminance_tap.luminance
+
+        motion_scores = [] if motion_window is not None else None
+        if motion_tap is not None:
+            motion_scores = motion_tap.motion_scores if motion_tap.covered(video.reached_eof) else None
+
+        return {
+            "frame_scores": np.array(detector.frame_scores, dtype=np.float64),
+            "first_scored_frame": detector.first_recorded,
+            "end_frame": video.frame_number,
+            "luminance": luminance,
+            "motion_scores": motion_scores,
+            "frames_decoded": video.frames_decoded,
+            "frame_source": video.BACKEND_NAME,
+            "frame_size": list(video.frame_size)
+        }
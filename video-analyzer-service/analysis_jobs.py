@@ -0,0 +1,281 @@
+"""
+Tâches d'analyse asynchrones de l'API
+
+Un téléchargement suivi d'une analyse prend souvent plusieurs minutes :
+avec "async": true, les routes de l'API ne bloquent plus la requête HTTP
+(threads du serveur occupés, timeouts du proxy nginx) :
+- POST retourne immédiatement l'identifiant de la tâche (202) ;
+- un pool borné de JOB_WORKERS threads exécute les tâches ;
+- GET /jobs/<id> retourne l'état, l'avancement de chaque étape
+  (téléchargement, analyse...) et le résultat final ;
+- les tâches terminées sont conservées JOB_RESULT_TTL secondes ;
+- au-delà de JOB_MAX_QUEUED tâches en attente, la soumission est refusée
+  (JobQueueFull, 429 côté API).
+
+Les tâches s'exécutent dans le processus qui a reçu le POST ; leur état est
+recopié dans JOB_STORE_PATH (SQLite, défaut CACHE_DIR/jobs.sqlite) à
+chaque changement, pour que GET /jobs/<id> réponde depuis n'importe quel
+processus de serve.py. JOB_STORE_PATH vide : état en mémoire seulement
+(un seul processus).
+"""
+
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from result_cache import CACHE_DIR
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 2))
+JOB_MAX_QUEUED = int(os.getenv("JOB_MAX_QUEUED", 20))
+JOB_RESULT_TTL = int(os.getenv("JOB_RESULT_TTL", 3600))  # secondes
+JOB_STORE_PATH = os.getenv("JOB_STORE_PATH", os.path.join(CACHE_DIR, "jobs.sqlite"))
+# Tâche non terminée sans nouvelles depuis ce délai : processus arrêté pendant l'exécution
+JOB_ABANDONED_AFTER = 24 * 3600  # secondes
+
+# (étape, état) -> None ; voir VideoAnalyzer.analyze_url
+Progress = Callable[[str, str], None]
+# Travail d'une tâche : reçoit le callback d'avancement, retourne (réponse JSON, code HTTP)
+Work = Callable[[Progress], Tuple[Dict[str, Any], int]]
+
+
+class JobQueueFull(Exception):
+    """Trop de tâches en attente : réessayer plus tard"""
+
+
+class Job:
+    """Tâche d'analyse : état, étapes et résultat"""
+
+    def __init__(self, kind: str):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = "queued"  # queued -> running -> completed | failed
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        self.result: Optional[Dict[str, Any]] = None
+        self.http_status: Optional[int] = None
+        self.error: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def progress(self, stage: str, state: str):
+        """Début ("running") ou fin ("done") d'une étape"""
+        now = time.time()
+        with self._lock:
+            entry = self.stages.setdefault(stage, {"status": state, "started_at": now, "finished_at": None})
+            entry["status"] = state
+            if state != "running":
+                entry["finished_at"] = now
+
+    def _finish(self, status: str, result: Optional[Dict[str, Any]], http_status: int, error: Optional[str]):
+        now = time.time()
+        with self._lock:
+            self.status = status
+            self.result = result
+            self.http_status = http_status
+            self.error = error
+            self.finished_at = now
+            # Étapes interrompues par l'échec
+            for entry in self.stages.values():
+                if entry["status"] == "running":
+                    entry["status"] = "failed" if status == "failed" else "done"
+                    entry["finished_at"] = now
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "job_id": self.id,
+                "type": self.kind,
+                "status": self.status,
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                "stages": {stage: dict(entry) for stage, entry in self.stages.items()},
+                "result": self.result,
+                "http_status": self.http_status,
+                "error": self.error
+            }
+
+
+class JobStore:
+    """État des tâches (Job.to_dict) dans SQLite, lisible par tous les processus de l'API"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS analysis_jobs ("
+                " job_id TEXT PRIMARY KEY, job TEXT NOT NULL,"
+                " finished_at REAL, updated_at REAL NOT NULL)"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        """Une connexion par thread (sqlite3 ne partage pas les connexions entre threads)"""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=10)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def save(self, job: Dict[str, Any]):
+        try:
+            with self._connection() as connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO analysis_jobs (job_id, job, finished_at, updated_at) VALUES (?, ?, ?, ?)",
+                    (job["job_id"], json.dumps(job), job["finished_at"], time.time())
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"Stockage des tâches indisponible ({e})")
+
+    def load(self, job_id: str, ttl: int) -> Optional[Dict[str, Any]]:
+        """Dernier état connu de la tâche, None si inconnue ou terminée depuis plus de `ttl`"""
+        try:
+            row = self._connection().execute(
+                "SELECT job FROM analysis_jobs WHERE job_id = ? AND (finished_at IS NULL OR finished_at >= ?)",
+                (job_id, time.time() - ttl)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Stockage des tâches indisponible ({e})")
+            return None
+        return json.loads(row[0]) if row is not None else None
+
+    def purge(self, ttl: int):
+        """Supprime les tâches expirées et celles abandonnées par un processus arrêté"""
+        now = time.time()
+        try:
+            with self._connection() as connection:
+                connection.execute(
+                    "DELETE FROM analysis_jobs WHERE finished_at < ? OR (finished_at IS NULL AND updated_at < ?)",
+                    (now - ttl, now - JOB_ABANDONED_AFTER)
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"Stockage des tâches indisponible ({e})")
+
+
+def create_job_store() -> Optional[JobStore]:
+    """Stockage configuré par l'environnement (JOB_STORE_PATH vide = désactivé)"""
+    if not JOB_STORE_PATH:
+        return None
+    return JobStore(JOB_STORE_PATH)
+
+
+class JobManager:
+    """Pool borné de tâches d'analyse, avec file d'attente limitée et rétention des résultats"""
+
+    def __init__(self, max_workers: int = JOB_WORKERS, max_queued: int = JOB_MAX_QUEUED,
+                 ttl: int = JOB_RESULT_TTL, store: Optional[JobStore] = None):
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.ttl = ttl
+        # État partagé avec les autres processus (voir status)
+        self.store = store
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def submit(self, kind: str, work: Work) -> Job:
+        """Met `work` en file ; lève JobQueueFull si JOB_MAX_QUEUED tâches attendent déjà"""
+        job = Job(kind)
+        with self._lock:
+            self._purge()
+            if self.queued >= self.max_queued:
+                self.rejected += 1
+                raise JobQueueFull(f"{self.queued} tâches en attente, réessayer plus tard")
+            self.queued += 1
+            self._jobs[job.id] = job
+        if self.store is not None:
+            self.store.purge(self.ttl)
+        self._persist(job)
+        self._executor.submit(self._run, job, work)
+        print(f"[JOB] {job.id} ({kind}) en file")
+        return job
+
+    def _run(self, job: Job, work: Work):
+        with self._lock:
+            self.queued -= 1
+            self.running += 1
+        job.started_at = time.time()
+        job.status = "running"
+        self._persist(job)
+
+        def progress(stage: str, state: str):
+            job.progress(stage, state)
+            self._persist(job)
+
+        try:
+            result, http_status = work(progress)
+            failed = http_status >= 400 or not result.get("success", True)
+            job._finish("failed" if failed else "completed", result, http_status,
+                        result.get("error") if failed else None)
+        except Exception as e:
+            logger.exception(f"Tâche {job.id} ({job.kind}) en erreur")
+            job._finish("failed", {"success": False, "error": str(e)}, 500, str(e))
+        self._persist(job)
+        with self._lock:
+            self.running -= 1
+            if job.status == "failed":
+                self.failed += 1
+            else:
+                self.completed += 1
+        print(f"[JOB] {job.id} ({job.kind}) {job.status} en {job.finished_at - job.started_at:.1f}s")
+
+    def _persist(self, job: Job):
+        if self.store is not None:
+            self.store.save(job.to_dict())
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Tâche exécutée par ce processus"""
+        with self._lock:
+            self._purge()
+            return self._jobs.get(job_id)
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """État de la tâche (Job.to_dict), qu'elle s'exécute dans ce processus ou un autre"""
+        job = self.get(job_id)
+        if job is not None:
+            return job.to_dict()
+        if self.store is not None:
+            return self.store.load(job_id, self.ttl)
+        return None
+
+    def _purge(self):
+        """Oublie les tâches terminées depuis plus de `ttl` (appelé sous verrou)"""
+        cutoff = time.time() - self.ttl
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished_at is not None and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "queued": self.queued,
+                "running": self.running,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "retained": len(self._jobs)
+            }
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
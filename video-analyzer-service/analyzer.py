@@ -7,15 +7,17 @@ import os
 import sys
 import json
 import time
+import shlex
 import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 from pathlib import Path
-from typing import Dict, List, Tuple, Optional, Any
+from typing import Callable, Dict, List, Tuple, Optional, Any, Union
 import hashlib
 
 # Pour éviter les erreurs d'import
 try:
-    from scenedetect import detect, ContentDetector, ThresholdDetector
-    from scenedetect.frame_timecode import FrameTimecode
     import cv2
     import numpy as np
     import yt_dlp
@@ -23,213 +25,288 @@ except ImportError as e:
     print(f"Erreur d'import: {e}. Installation nécessaire...")
     sys.exit(1)
 
+from analysis_engine import (
+    FusedAnalysisEngine, summarize_luminance, BLACK_FRAME_LUMINOSITY, FLASH_LUMINOSITY_DIFF, SEGMENT_UNITS
+)
+from parallel_analysis import ParallelAnalysisEngine, DEFAULT_WORKERS
+from frame_source import StreamInput, probe_video, DEFAULT_BACKEND, DEFAULT_ANALYSIS_WIDTH
+from motion_estimators import DEFAULT_MOTION_ESTIMATOR
+from quality_gate import QualityGate
+from ytdlp_engine import get_engine, YtDlpCancelled
+from result_cache import ResultCache, analysis_key
+from download_cache import DownloadCache
+
 import logging
 logger = logging.getLogger(__name__)
 
+# À incrémenter quand le calcul d'un résultat change : invalide le cache des résultats
+ANALYZER_VERSION = "1"
+
+# Vidéos indépendantes d'une comparaison (/compare, trailer vs épisode)
+# téléchargées et analysées en parallèle, au plus COMPARE_WORKERS à la fois
+# pour tout le processus
+COMPARE_WORKERS = int(os.getenv("COMPARE_WORKERS", 4))
+_compare_pool: Optional[ThreadPoolExecutor] = None
+_compare_pool_lock = threading.Lock()
+
+
+def comparison_pool() -> ThreadPoolExecutor:
+    """Pool partagé des analyses concurrentes des comparaisons (créé au premier usage)"""
+    global _compare_pool
+    with _compare_pool_lock:
+        if _compare_pool is None:
+            _compare_pool = ThreadPoolExecutor(max_workers=COMPARE_WORKERS, thread_name_prefix="compare")
+        return _compare_pool
+
+
+class AnalysisBusy(Exception):
+    """Aucun créneau d'analyse libéré à temps (voir AnalysisSlots) : réessayer plus tard"""
+
+
+class AnalysisSlots:
+    """
+    Borne les analyses (analyze_video) exécutées en même temps par un
+    processus, quelle que soit la requête qui les lance (une comparaison en
+    compte deux, un lot autant que de vidéos). Une analyse attend un créneau
+    au plus `timeout` secondes (None : sans limite), sinon AnalysisBusy.
+    Les téléchargements n'occupent pas de créneau.
+    """
+    
+    def __init__(self, size: int, timeout: Optional[float] = None):
+        self.size = size
+        self.timeout = timeout
+        self._semaphore = threading.BoundedSemaphore(size)
+    
+    def __enter__(self):
+        if not self._semaphore.acquire(timeout=self.timeout):
+            raise AnalysisBusy(f"{self.size} analyses en cours")
+        return self
+    
+    def __exit__(self, *exc):
+        self._semaphore.release()
+
+
+def run_concurrently(*calls: Callable[[], Any]) -> List[Any]:
+    """Exécute des appels indépendants sur le pool des comparaisons ; résultats dans l'ordre des appels"""
+    futures = [comparison_pool().submit(call) for call in calls]
+    return [future.result() for future in futures]
+
 
 class VideoAnalyzer:
     """Analyseur vidéo pour détecter les cuts de scène et l'intensité du mouvement"""
     
-    def __init__(self, threshold: float = 27.0, min_scene_len: int = 15):
+    def __init__(self, threshold: float = 27.0, min_scene_len: int = 15,
+                 frame_source: str = None, analysis_width: int = None, motion_estimator: str = None,
+                 workers: int = None, slots: AnalysisSlots = None):
         """
         Args:
             threshold: Seuil de détection (0-255, plus haut = moins sensible)
             min_scene_len: Durée minimale d'une scène (en frames)
+            frame_source: Source de frames ("cv2" ou "ffmpeg-gray", défaut: ANALYZER_FRAME_SOURCE)
+            analysis_width: Largeur d'analyse pour "ffmpeg-gray" (défaut: ANALYZER_ANALYSIS_WIDTH)
+            motion_estimator: "farneback", "farneback-pyramid", "lucas-kanade" ou "frame-diff"
+                              (défaut: ANALYZER_MOTION_ESTIMATOR)
+            workers: Processus d'analyse par vidéo, 1 = analyse en série (défaut: ANALYZER_WORKERS)
+            slots: Analyses simultanées bornées (optionnel, voir AnalysisSlots)
         """
         self.threshold = threshold
         self.min_scene_len = min_scene_len
+        self.engine = FusedAnalysisEngine(
+            threshold=threshold,
+            min_scene_len=min_scene_len,
+            frame_source=frame_source,
+            analysis_width=analysis_width,
+            motion_estimator=motion_estimator
+        )
+        self.workers = workers or DEFAULT_WORKERS
+        self.parallel_engine = ParallelAnalysisEngine(self.engine)
+        self.slots = slots
+    
+    def analysis_signature(self) -> Dict[str, Any]:
+        """Paramètres dont dépend le résultat d'une analyse (clé du cache des résultats)"""
+        return {
+            "version": ANALYZER_VERSION,
+            # Début/fin de segment en secondes (et non plus en frames pour les cuts)
+            "segment_units": SEGMENT_UNITS,
+            "threshold": self.threshold,
+            "min_scene_len": self.min_scene_len,
+            "frame_source": self.engine.frame_source or DEFAULT_BACKEND,
+            "analysis_width": self.engine.analysis_width or DEFAULT_ANALYSIS_WIDTH,
+            "motion_estimator": self.engine.motion_estimator or DEFAULT_MOTION_ESTIMATOR
+        }
         
     def _calculate_motion_intensity(self, video_path: str, start_time: float = 0, end_time: float = None) -> float:
         """
         Calcule l'intensité du mouvement via flux optique (Optical Flow)
         
-        Méthode : Lucas-Kanade optical flow entre frames successives
+        Méthode : estimateur configuré (Farneback par défaut) entre frames
+        échantillonnées (1 sur 10) ; les frames intermédiaires sont sautées
+        par grab(), sans retrieve()
         Retourne : Moyenne du déplacement des pixels (score 0-100)
+        
+        Le décodage commence à la keyframe précédant start_time (seek), pas au
+        début du fichier.
         """
         try:
-            cap = cv2.VideoCapture(video_path)
-            
-            if not cap.isOpened():
-                return 0.0
-            
-            fps = cap.get(cv2.CAP_PROP_FPS)
-            total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-            duration = total_frames / fps if fps > 0 else 0
-            
-            # Calculer les frames de début et fin
-            start_frame = int(start_time * fps) if start_time > 0 else 0
-            end_frame = int(end_time * fps) if end_time else total_frames
-            end_frame = min(end_frame, total_frames)
-            
-            # Prendre des frames échantillon (toutes les 10 frames pour performance)
-            frame_step = 10
-            
-            prev_frame = None
-            motion_scores = []
-            
-            frame_count = 0
-            while True:
-                ret, frame = cap.read()
-                if not ret or frame_count >= end_frame:
-                    break
-                
-                if frame_count >= start_frame and frame_count % frame_step == 0:
-                    # Convertir en niveaux de gris
-                    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-                    
-                    if prev_frame is not None:
-                        # Calculer le flux optique
-                        flow = cv2.calcOpticalFlowFarneback(
-                            prev_frame, gray, None, 0.5, 3, 15, 3, 5, 1.2, 0
-                        )
-                        
-                        # Magnitude du flux
-                        magnitude = np.sqrt(flow[..., 0]**2 + flow[..., 1]**2)
-                        mean_magnitude = np.mean(magnitude)
-                        
-                        # Normaliser pour obtenir un score 0-100
-                        normalized_score = min(100, mean_magnitude * 10)
-                        motion_scores.append(normalized_score)
-                    
-                    prev_frame = gray
-                
-                frame_count += 1
-            
-            cap.release()
-            
-            # Retourner la moyenne des scores de mouvement
-            if motion_scores:
-                avg_motion = np.mean(motion_scores)
-                return round(avg_motion, 2)
-            else:
-                return 0.0
-                
+            return self.engine.calculate_motion_intensity(video_path, start_time, end_time)
         except Exception as e:
             print(f"⚠ Erreur dans le calcul du mouvement: {e}")
             return 0.0
     
-    def _detect_black_frames_and_flashes(self, video_path: str, start_time: float = 0, end_time: float = None) -> Dict[str, Any]:
+    def _detect_black_frames_and_flashes(self, video_path: str, start_time: float = 0,
+                                         end_time: float = None) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
         """
         Détecte les passages noirs et les flashs (changement brutal de luminosité)
         
-        Utilise ThresholdDetector pour détecter les frames très sombres
-        Calcule les transitions brutales de luminosité
+        Frames noires : luminosité moyenne < 10
+        Flashs : variation de luminosité moyenne > 100 entre deux frames
+        
+        Le décodage commence à la keyframe précédant start_time (seek), pas au
+        début du fichier.
+        Retourne (résultat, série de luminosité ou None en cas d'erreur).
         """
         try:
-            cap = cv2.VideoCapture(video_path)
-            
-            if not cap.isOpened():
-                return {"black_frames": 0, "flashes": 0, "intensity": 0.0}
-            
-            fps = cap.get(cv2.CAP_PROP_FPS)
-            total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-            
-            # Calculer les frames de début et fin si segment spécifié
-            start_frame = int(start_time * fps) if start_time > 0 else 0
-            end_frame = int(end_time * fps) if end_time else total_frames
-            end_frame = min(end_frame, total_frames)
-            
-            black_frame_count = 0
-            flash_transitions = []
-            prev_luminosity = None
-            
-            frame_count = 0
-            while True:
-                ret, frame = cap.read()
-                if not ret or frame_count >= end_frame:
-                    break
-                
-                if frame_count < start_frame:
-                    frame_count += 1
-                    continue
-                
-                # Convertir en niveaux de gris
-                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-                
-                # Calculer la luminosité moyenne
-                mean_luminosity = np.mean(gray)
-                
-                # Détecter les frames noires (luminosité < 10)
-                if mean_luminosity < 10:
-                    black_frame_count += 1
-                
-                # Détecter les flashs (changement brutal de luminosité)
-                if prev_luminosity is not None:
-                    luminosity_diff = abs(mean_luminosity - prev_luminosity)
-                    # Flash si changement > 100 niveaux de gris
-                    if luminosity_diff > 100:
-                        flash_transitions.append({
-                            "frame": frame_count,
-                            "time": frame_count / fps,
-                            "diff": luminosity_diff
-                        })
-                
-                prev_luminosity = mean_luminosity
-                frame_count += 1
-            
-            cap.release()
-            
-            # Calculer l'intensité totale (flashs + frames noirs)
-            total_stimulus = black_frame_count * 2 + len(flash_transitions) * 3
-            stimulus_intensity = min(100, total_stimulus)
-            
-            return {
-                "black_frames": black_frame_count,
-                "flashes": len(flash_transitions),
-                "flash_details": flash_transitions[:5],  # Top 5 flashs
-                "intensity": round(stimulus_intensity, 2)
+            tap = self.engine.run_luminance(video_path, start_time, end_time)
+            luminance = {
+                "values": tap.luminance,
+                "first_frame": tap.series.first_frame,
+                "fps": tap.fps
             }
-            
+            return tap.result(), luminance
         except Exception as e:
             print(f"⚠ Erreur dans la détection des flashs: {e}")
-            return {"black_frames": 0, "flashes": 0, "intensity": 0.0}
+            return {"black_frames": 0, "flashes": 0, "intensity": 0.0}, None
+    
+    @staticmethod
+    def rescore_flashes(luminance: Optional[Dict[str, Any]], black_threshold: float = BLACK_FRAME_LUMINOSITY,
+                        flash_threshold: float = FLASH_LUMINOSITY_DIFF) -> Optional[Dict[str, Any]]:
+        """
+        Recalcule frames noires / flashs d'une analyse avec d'autres seuils, à
+        partir de sa série de luminosité (champ "luminance" du résultat
+        d'analyze_video avec keep_luminance=True), sans décoder.
+        """
+        if not luminance:
+            return None
+        return summarize_luminance(
+            luminance["values"],
+            luminance["fps"],
+            first_frame=luminance["first_frame"],
+            black_threshold=black_threshold,
+            flash_threshold=flash_threshold
+        )
         
-    def analyze_video(self, video_path: str, analyze_motion: bool = True, analyze_flashes: bool = True, start_time: float = 0, end_time: float = None) -> Dict:
+    def analyze_video(self, video_path: Union[str, StreamInput], analyze_motion: bool = True, analyze_flashes: bool = True, start_time: float = 0, end_time: float = None,
+                      workers: int = None, gate: QualityGate = None, keep_luminance: bool = False) -> Dict:
         """
         Analyse une vidéo pour détecter les cuts, mouvement et flashs
         
         Args:
-            video_path: Chemin vers la vidéo
+            video_path: Chemin vers la vidéo, ou flux en cours de téléchargement
+                        (voir YouTubeDownloader.open_video_stream)
             analyze_motion: Active l'analyse du mouvement
             analyze_flashes: Active la détection des flashs
             start_time: Temps de début d'analyse en secondes (optionnel)
             end_time: Temps de fin d'analyse en secondes (optionnel, None = jusqu'à la fin)
+            workers: Nombre de processus (optionnel, défaut: self.workers) ; au-delà
+                     de 1, la fenêtre est découpée en tranches analysées en parallèle
+            gate: Contrôle qualité progressif (optionnel, voir quality_gate.py) ;
+                  un candidat abandonné renvoie success=False et rejected=True
+                  sans passer par les étapes coûteuses. En parallèle, le gate
+                  n'est appliqué qu'au résultat final
+            keep_luminance: Ajoute au résultat la série de luminosité ("luminance",
+                            voir rescore_flashes) ; volumineuse, absente par défaut
             
-        Retourne un dictionnaire complet avec toutes les métriques
+        Retourne un dictionnaire complet avec toutes les métriques, dont
+        "engine_stats" (statistiques de décodage : frames/s, tranches...)
+        Avec self.slots, attend un créneau d'analyse (AnalysisBusy si aucun
+        ne se libère à temps).
         """
+        with self.slots or nullcontext():
+            return self._analyze_video(video_path, analyze_motion, analyze_flashes, start_time, end_time,
+                                       workers, gate, keep_luminance)
+    
+    def _analyze_video(self, video_path: Union[str, StreamInput], analyze_motion: bool, analyze_flashes: bool,
+                       start_time: float, end_time: Optional[float], workers: Optional[int],
+                       gate: Optional[QualityGate], keep_luminance: bool) -> Dict:
+        """Analyse d'analyze_video, créneau obtenu"""
         try:
             print(f"[ANALYSE] Démarrage de l'analyse de: {video_path}")
             
-            # 1. Détection des scènes avec PySceneDetect
+            # 1. Passe unique : cuts, flashs/frames noirs, mouvement et durée
             print("   [1/6] Détection des scènes...")
-            detector = ContentDetector(
-                threshold=self.threshold,
-                min_scene_len=self.min_scene_len
-            )
-            if start_time or end_time:
-                scene_list = detect(video_path, detector, start_time=start_time, end_time=end_time)
+            workers = workers or self.workers
+            if workers > 1:
+                engine_output = self.parallel_engine.run(
+                    video_path,
+                    analyze_motion=analyze_motion,
+                    analyze_flashes=analyze_flashes,
+                    start_time=start_time,
+                    end_time=end_time,
+                    workers=workers
+                )
             else:
-                scene_list = detect(video_path, detector)
+                engine_output = self.engine.run(
+                    video_path,
+                    analyze_motion=analyze_motion,
+                    analyze_flashes=analyze_flashes,
+                    start_time=start_time,
+                    end_time=end_time,
+                    gate=gate
+                )
+            scene_list = engine_output["scene_list"]
+            # Propres à cet appel : l'analyseur est partagé entre threads
+            engine_stats = engine_output["stats"]
+            chunks_info = f", {engine_stats['chunks']} tranches" if "chunks" in engine_stats else ""
+            print(f"   [ENGINE] {engine_stats['frames_decoded']} frames décodées en "
+                  f"{engine_stats['decode_seconds']:.2f}s "
+                  f"({engine_stats['frames_per_second']:.1f} frames/s{chunks_info})")
+            
+            # Contrôle qualité progressif : candidat abandonné avant les étapes coûteuses
+            gate_result = engine_output.get("gate")
+            if gate is not None and gate_result is None:
+                total_frames = int(engine_output["analyzed_duration"] * engine_output["fps"])
+                cuts = max(0, len(scene_list) - 1)
+                gate_result = {
+                    "decision": gate.check(cuts, total_frames, total_frames, engine_output["fps"]),
+                    "cuts": cuts,
+                    "frames": total_frames,
+                    "seconds": round(engine_output["analyzed_duration"], 2)
+                }
+            if gate_result and gate_result["decision"] == QualityGate.ABORT:
+                print(f"   [GATE] Candidat abandonné après {gate_result['seconds']:.1f}s: "
+                      f"{gate_result['cuts']} cuts")
+                return {
+                    "success": False,
+                    "rejected": True,
+                    "error": f"Contrôle qualité: {gate_result['cuts']} cuts après {gate_result['seconds']:.1f}s",
+                    "num_scenes": len(scene_list),
+                    "gate": gate_result,
+                    "pacing_score": 0,
+                    "composite_score": 0
+                }
+            if gate_result:
+                print(f"   [GATE] Décision '{gate_result['decision']}' après {gate_result['seconds']:.1f}s "
+                      f"({gate_result['cuts']} cuts)")
             
             # 2. Détection des flashs et frames noirs
             flash_analysis = {}
+            luminance = None
             if analyze_flashes:
                 print("   [2/6] Détection des flashs et frames noirs...")
-                flash_analysis = self._detect_black_frames_and_flashes(video_path, start_time, end_time)
+                flash_analysis = engine_output["flash_analysis"]
+                if flash_analysis is not None:
+                    luminance = {
+                        "values": engine_output["luminance"],
+                        "first_frame": engine_output["luminance_first_frame"],
+                        "fps": engine_output["fps"]
+                    }
+                else:
+                    # Fenêtre non couverte par la passe unique : passe dédiée
+                    flash_analysis, luminance = self._detect_black_frames_and_flashes(video_path, start_time, end_time)
             
-            # 3. Calcul de la durée totale
-            cap = cv2.VideoCapture(video_path)
-            fps = cap.get(cv2.CAP_PROP_FPS)
-            frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-            total_duration = frame_count / fps if fps > 0 else 0
-            cap.release()
-            
-            # Si on a un segment spécifié, calculer sa durée
-            if start_time or end_time:
-                segment_end = min(end_time, total_duration) if end_time else total_duration
-                analyzed_duration = segment_end - start_time
-            else:
-                analyzed_duration = total_duration
+            # 3. Calcul de la durée totale (métadonnées lues par le moteur)
+            total_duration = engine_output["total_duration"]
+            analyzed_duration = engine_output["analyzed_duration"]
             
             # 4. Calcul des métriques de base
             num_scenes = len(scene_list)
@@ -240,12 +317,14 @@ class VideoAnalyzer:
             motion_intensity = 0.0
             if analyze_motion and total_duration > 0:
                 print("   [4/6] Analyse du mouvement (flux optique)...")
-                # Analyser le 1er quart de la vidéo pour le mouvement
-                motion_intensity = self._calculate_motion_intensity(
-                    video_path, 
-                    start_time=start_time, 
-                    end_time=start_time + min(30, analyzed_duration)  # 30s max dans le segment
-                )
+                motion_intensity = engine_output["motion_intensity"]
+                if motion_intensity is None:
+                    # Analyser le 1er quart de la vidéo pour le mouvement
+                    motion_intensity = self._calculate_motion_intensity(
+                        video_path, 
+                        start_time=start_time, 
+                        end_time=start_time + min(30, analyzed_duration)  # 30s max dans le segment
+                    )
                 print(f"   [4/6] Intensité mouvement: {motion_intensity}/100")
             else:
                 print("   [4/6] Analyse du mouvement désactivée")
@@ -293,8 +372,11 @@ class VideoAnalyzer:
                     "level": self._get_motion_level(motion_intensity)
                 },
                 "flash_analysis": flash_analysis,
-                "composite_evaluation": self.get_composite_evaluation(final_score)
+                "composite_evaluation": self.get_composite_evaluation(final_score),
+                "engine_stats": engine_stats
             }
+            if keep_luminance:
+                result["luminance"] = luminance
             
             print(f"[RESULTAT] Score composite: {final_score:.2f}")
             print(f"[RESULTAT] Score historique: {base_pacing_score:.2f}")
@@ -310,6 +392,95 @@ class VideoAnalyzer:
                 "composite_score": 0
             }
     
+    def analyze_url(self, video_url: str, max_duration: int = 120, start_time: float = None,
+                    analyze_motion: bool = True, analyze_flashes: bool = True,
+                    output_dir: str = None, cache: ResultCache = None,
+                    download_cache: DownloadCache = None,
+                    progress: Callable[[str, str], None] = None,
+                    cancel: threading.Event = None) -> Optional[Dict]:
+        """
+        Télécharge un segment puis l'analyse (le fichier est supprimé ensuite).
+        
+        Avec `cache` (voir result_cache.py), un segment déjà analysé avec la
+        même configuration est servi sans téléchargement ni analyse.
+        Avec `download_cache` (voir download_cache.py), le segment téléchargé
+        est conservé et réutilisé au lieu d'être supprimé.
+        `progress(étape, état)` est appelé au début ("running") et à la fin
+        ("done") de chaque étape : "cache", "download", "analysis".
+        `cancel` : si levé, le téléchargement est interrompu et l'analyse
+        n'est pas lancée.
+        Retourne None si le téléchargement échoue ou est annulé.
+        """
+        progress = progress or (lambda stage, state: None)
+        key, cached = self.cached_analysis(video_url, max_duration, start_time, analyze_motion, analyze_flashes,
+                                           cache)
+        if cached is not None:
+            progress("cache", "done")
+            return cached
+        
+        progress("download", "running")
+        segment = self.download_segment(video_url, max_duration, start_time, output_dir, download_cache, cancel)
+        if segment is None:
+            return None
+        progress("download", "done")
+        if cancel is not None and cancel.is_set():
+            segment.release()
+            return None
+        with segment:
+            progress("analysis", "running")
+            result = self.analyze_video(segment.path, analyze_motion=analyze_motion, analyze_flashes=analyze_flashes)
+        progress("analysis", "done")
+        
+        if key is not None:
+            cache.put(key, result)
+        return result
+    
+    def cached_analysis(self, video_url: str, max_duration: int = 120, start_time: float = None,
+                        analyze_motion: bool = True, analyze_flashes: bool = True,
+                        cache: ResultCache = None) -> Tuple[Optional[str], Optional[Dict]]:
+        """
+        Clé de l'analyse dans `cache` et résultat déjà calculé (ou None).
+        Sans cache : (None, None).
+        """
+        if cache is None:
+            return None, None
+        key = analysis_key(video_url, start_time, max_duration, self.analysis_signature(),
+                           analyze_motion=analyze_motion, analyze_flashes=analyze_flashes)
+        cached = cache.get(key)
+        if cached is not None:
+            print(f"[CACHE] Résultat déjà calculé pour {video_url}")
+        return key, cached
+    
+    @staticmethod
+    def download_segment(video_url: str, max_duration: int = 120, start_time: float = None,
+                         output_dir: str = None, download_cache: DownloadCache = None,
+                         cancel: threading.Event = None):
+        """
+        Télécharge un segment (ou le réserve dans `download_cache`).
+        Retourne un objet avec `.path` à libérer par `release()` (ou en
+        context manager) après l'analyse, ou None si le téléchargement échoue.
+        `cancel` : voir YouTubeDownloader.download_video_snippet.
+        """
+        if download_cache is not None:
+            return download_cache.acquire(
+                video_url, start_time, max_duration,
+                lambda directory: YouTubeDownloader.download_snippet_to(
+                    video_url, os.path.join(directory, snippet_filename(video_url, max_duration, start_time)),
+                    max_duration=max_duration, start_time=start_time, cancel=cancel
+                )
+            )
+        
+        video_path = YouTubeDownloader.download_video_snippet(
+            video_url=video_url,
+            output_dir=output_dir,
+            max_duration=max_duration,
+            start_time=start_time,
+            cancel=cancel
+        )
+        if not video_path:
+            return None
+        return SnippetLease(video_path)
+    
     def analyze_comparison(self, video1_path: str, video2_path: str, 
                           name1: str = "Vidéo 1", name2: str = "Vidéo 2") -> Dict:
         """
@@ -317,9 +488,15 @@ class VideoAnalyzer:
         """
         print(f"📊 Comparaison: {name1} vs {name2}")
         
-        result1 = self.analyze_video(video1_path, analyze_motion=False, analyze_flashes=False)
-        result2 = self.analyze_video(video2_path, analyze_motion=False, analyze_flashes=False)
-        
+        result1, result2 = run_concurrently(
+            lambda: self.analyze_video(video1_path, analyze_motion=False, analyze_flashes=False),
+            lambda: self.analyze_video(video2_path, analyze_motion=False, analyze_flashes=False)
+        )
+        return self.compare_results(result1, result2, name1, name2)
+    
+    def compare_results(self, result1: Dict, result2: Dict,
+                        name1: str = "Vidéo 1", name2: str = "Vidéo 2") -> Dict:
+        """Comparaison de deux résultats d'analyze_video (voir analyze_comparison)"""
         if not result1.get("success") or not result2.get("success"):
             return {"success": False, "error": "Erreur lors de l'analyse d'une des vidéos"}
         
@@ -358,7 +535,9 @@ class VideoAnalyzer:
         return comparison
     
     def analyze_trailer_vs_episode(self, trailer_url: str, episode_url: str = None, 
-                                   episode_duration: int = 600) -> Dict:
+                                   episode_duration: int = 600, cache: ResultCache = None,
+                                   download_cache: DownloadCache = None,
+                                   progress: Callable[[str, str], None] = None) -> Dict:
         """
         Compare un trailer avec un épisode réel
         
@@ -366,37 +545,60 @@ class VideoAnalyzer:
         1. Analyser le trailer (1-2 minutes)
         2. Si trailer est trop stimulant, proposer analyse d'un épisode réel
         3. Comparer les scores pour recommander
+        
+        `cache`, `download_cache` : caches des résultats et des segments (voir analyze_url)
+        `progress` : étapes préfixées par "trailer." et "episode." (voir analyze_url)
         """
+        progress = progress or (lambda stage, state: None)
         print(f"🎬 Analyse Trailer vs Épisode")
         
         # Étape 1: Analyser le trailer
         from supabase_manager import supabase_manager
-        downloader = YouTubeDownloader()
         
-        # Télécharger le trailer
-        try:
-            trailer_path = downloader.download_video_snippet(trailer_url, max_duration=120)
-        except Exception as e:
-            return {"success": False, "error": f"Impossible de télécharger le trailer: {e}"}
-        
-        # Analyser le trailer
-        trailer_result = self.analyze_video(trailer_path, analyze_motion=False)
+        # Télécharger et analyser le trailer et l'épisode en parallèle
+        trailer_future = comparison_pool().submit(
+            self.analyze_url, trailer_url, max_duration=120, analyze_motion=False, cache=cache,
+            download_cache=download_cache, progress=lambda stage, state: progress(f"trailer.{stage}", state)
+        )
+        episode_future = None
+        episode_cancel = threading.Event()
+        if episode_url:
+            episode_future = comparison_pool().submit(
+                self.analyze_url, episode_url, max_duration=episode_duration, analyze_motion=False, cache=cache,
+                download_cache=download_cache, progress=lambda stage, state: progress(f"episode.{stage}", state),
+                cancel=episode_cancel
+            )
         
-        # Nettoyer
-        if os.path.exists(trailer_path):
-            os.remove(trailer_path)
+        def abandon_episode():
+            # Épisode inutile : retiré de la file, ou téléchargement interrompu
+            if episode_future is not None:
+                episode_future.cancel()
+                episode_cancel.set()
         
-        if not trailer_result.get("success"):
-            return {"success": False, "error": "Erreur d'analyse du trailer"}
+        trailer_error = None
+        try:
+            trailer_result = trailer_future.result()
+        except AnalysisBusy:
+            abandon_episode()
+            raise
+        except Exception as e:
+            trailer_error = f"Impossible de télécharger le trailer: {e}"
+        else:
+            if trailer_result is None:
+                trailer_error = "Impossible de télécharger le trailer"
+            elif not trailer_result.get("success"):
+                trailer_error = "Erreur d'analyse du trailer"
+        if trailer_error is not None:
+            abandon_episode()
+            return {"success": False, "error": trailer_error}
         
         # Étape 2: Analyser un épisode si disponible
         episode_result = None
-        if episode_url:
+        if episode_future is not None:
             try:
-                episode_path = downloader.download_video_snippet(episode_url, max_duration=episode_duration)
-                episode_result = self.analyze_video(episode_path, analyze_motion=False)
-                if os.path.exists(episode_path):
-                    os.remove(episode_path)
+                episode_result = episode_future.result()
+            except AnalysisBusy:
+                raise
             except Exception as e:
                 print(f"⚠ Impossible d'analyser l'épisode: {e}")
         
@@ -592,50 +794,185 @@ class VideoAnalyzer:
             }
 
 
+DOWNLOAD_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+DOWNLOAD_FORMAT = 'bestvideo[height<=480][ext=mp4]/best[height<=480]'
+
+
+def snippet_filename(video_url: str, max_duration: Optional[float], start_time: Optional[float]) -> str:
+    """
+    Nom du fichier d'un segment téléchargé : distinct pour chaque (URL, début,
+    durée), et pour chaque processus (plusieurs processus de l'API peuvent
+    partager le même dossier temporaire).
+    """
+    segment = f"{video_url}|{start_time or 0}|{max_duration}"
+    return f"video_{hashlib.md5(segment.encode()).hexdigest()[:12]}_{os.getpid()}.mp4"
+
+
+class _SnippetDownload:
+    """Téléchargement d'un segment partagé par tous les appelants concurrents"""
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.path: Optional[str] = None
+        self.error: Optional[Exception] = None
+        self.cancelled = False
+        self.refs = 1  # appelants qui utilisent (ou attendent) le fichier
+
+
+# Segments téléchargés ou en cours, par chemin de sortie (voir download_video_snippet)
+_snippets: Dict[str, _SnippetDownload] = {}
+_snippets_lock = threading.Lock()
+
+
 class YouTubeDownloader:
     """Téléchargeur de vidéos YouTube via yt-dlp (bibliothèque Python)"""
     
     @staticmethod
-    def download_video_snippet(video_url: str, output_dir: str = None, max_duration: int = 120, start_time: float = None) -> str:
+    def download_video_snippet(video_url: str, output_dir: str = None, max_duration: int = 120, start_time: float = None,
+                               cancel: threading.Event = None) -> str:
         """
         Télécharge une partie d'une vidéo via yt-dlp.
         
+        Les appels concurrents pour le même segment (URL, début, durée) et le
+        même dossier attendent un seul téléchargement et partagent son
+        fichier : il est supprimé par release_snippet quand le dernier
+        appelant l'a libéré (ne pas le supprimer directement).
+        
         Args:
             video_url: URL de la vidéo
             output_dir: Dossier de sortie
             max_duration: Durée maximale à télécharger (secondes)
             start_time: Temps de début en secondes (si None, commence au début)
+            cancel: Si levé, le téléchargement est interrompu (moteur en processus)
             
+        Retourne le chemin du fichier téléchargé
+        """
+        if output_dir is None:
+            output_dir = tempfile.gettempdir()
+        output_path = os.path.join(output_dir, snippet_filename(video_url, max_duration, start_time))
+        
+        while True:
+            with _snippets_lock:
+                flight = _snippets.get(output_path)
+                leader = flight is None
+                if leader:
+                    flight = _snippets[output_path] = _SnippetDownload()
+                else:
+                    flight.refs += 1
+            
+            if leader:
+                try:
+                    flight.path = YouTubeDownloader.download_snippet_to(video_url, output_path, max_duration,
+                                                                        start_time, cancel)
+                    return flight.path
+                except Exception as e:
+                    flight.error = e
+                    flight.cancelled = cancel is not None and cancel.is_set()
+                    with _snippets_lock:
+                        if _snippets.get(output_path) is flight:
+                            del _snippets[output_path]
+                    raise
+                finally:
+                    flight.done.set()
+            
+            while not flight.done.wait(0.5):
+                if cancel is not None and cancel.is_set():
+                    YouTubeDownloader._release(output_path, flight)
+                    raise Exception("Téléchargement annulé")
+            if flight.error is None:
+                logger.info(f"[TELECHARGEMENT] Segment partagé avec un téléchargement en cours: {output_path}")
+                return flight.path
+            if not flight.cancelled:
+                raise flight.error
+            # Téléchargement annulé par l'appelant qui le menait : nouvelle tentative
+    
+    @staticmethod
+    def release_snippet(path: str):
+        """Libère un segment de download_video_snippet : supprimé quand plus personne ne l'utilise"""
+        with _snippets_lock:
+            flight = _snippets.get(path)
+        YouTubeDownloader._release(path, flight)
+    
+    @staticmethod
+    def _release(path: str, flight: Optional[_SnippetDownload]):
+        with _snippets_lock:
+            if flight is not None:
+                flight.refs -= 1
+                if flight.refs > 0:
+                    return
+                if _snippets.get(path) is flight:
+                    del _snippets[path]
+            # Sous le verrou : un nouveau téléchargement du même segment ne peut pas démarrer entre-temps
+            try:
+                if os.path.exists(path):
+                    os.remove(path)
+            except OSError as e:
+                logger.warning(f"Impossible de supprimer {path}: {e}")
+    
+    @staticmethod
+    def download_snippet_to(video_url: str, output_path: str, max_duration: int = 120, start_time: float = None,
+                            cancel: threading.Event = None) -> str:
+        """
+        Télécharge une partie d'une vidéo dans `output_path`, sans partage
+        avec les appels concurrents (l'appelant choisit un chemin qui lui est
+        propre, ex. DownloadCache). Mêmes arguments que download_video_snippet.
+        
         Retourne le chemin du fichier téléchargé
         """
         import subprocess
         import sys
         
-        if output_dir is None:
-            output_dir = tempfile.gettempdir()
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
         
-        os.makedirs(output_dir, exist_ok=True)
+        # Arguments pour limiter la durée et éventuellement starting point
+        dl_args = []
+        if start_time is not None:
+            dl_args.append(f'-ss {start_time}')
+        dl_args.append(f'-t {max_duration}')
         
-        video_hash = hashlib.md5(video_url.encode()).hexdigest()[:8]
-        output_path = os.path.join(output_dir, f"video_{video_hash}.mp4")
+        engine = get_engine()
+        if engine is not None:
+            options = {
+                'format': DOWNLOAD_FORMAT,
+                'quiet': True,
+                'noprogress': True,
+                'no_warnings': True,
+                'http_headers': {'User-Agent': DOWNLOAD_USER_AGENT},
+                'external_downloader': {'default': 'ffmpeg'},
+            }
+            try:
+                logger.info(f"[TELECHARGEMENT] {video_url} (start={start_time}s, duration={max_duration}s)")
+                engine.download(video_url, output_path, options, downloader_args=shlex.split(' '.join(dl_args)),
+                                timeout=180, cancel=cancel)
+                if not os.path.exists(output_path):
+                    raise Exception("Erreur yt-dlp: fichier absent après téléchargement")
+                logger.info(f"[SUCCES] Téléchargement: {output_path}")
+                return output_path
+            except Exception as e:
+                # Fichier partiel (.part) laissé par un ffmpeg interrompu
+                for path in (output_path, output_path + '.part'):
+                    if os.path.exists(path):
+                        try:
+                            os.remove(path)
+                        except:
+                            pass
+                if isinstance(e, YtDlpCancelled):
+                    if cancel is not None and cancel.is_set():
+                        raise Exception("Téléchargement annulé")
+                    raise Exception("Timeout: téléchargement trop long")
+                raise
         
         python_exe = sys.executable
         cmd = [
             python_exe, '-m', 'yt_dlp',
             video_url,
-            '--format', 'bestvideo[height<=480][ext=mp4]/best[height<=480]',
+            '--format', DOWNLOAD_FORMAT,
             '--output', output_path,
             '--quiet',
             '--no-warnings',
-            '--user-agent', 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+            '--user-agent', DOWNLOAD_USER_AGENT,
             '--external-downloader', 'ffmpeg',
         ]
-        
-        # Arguments pour limiter la durée et éventuellement starting point
-        dl_args = []
-        if start_time is not None:
-            dl_args.append(f'-ss {start_time}')
-        dl_args.append(f'-t {max_duration}')
         cmd.extend(['--external-downloader-args', ' '.join(dl_args)])
         
         try:
@@ -659,6 +996,102 @@ class YouTubeDownloader:
                     pass
             raise e
     
+    @staticmethod
+    def open_video_stream(video_url: str, max_duration: int = 120, start_time: float = None,
+                          cache_dir: str = None) -> StreamInput:
+        """
+        Prépare l'analyse d'une partie d'une vidéo pendant son téléchargement.
+        
+        yt-dlp ne fait que résoudre l'URL média du format choisi (même format
+        et même user-agent que download_video_snippet) ; le segment est
+        ensuite lu par ffmpeg et décodé directement par l'analyseur, sans
+        attendre la fin du téléchargement.
+        
+        Args:
+            video_url: URL de la vidéo
+            max_duration: Durée maximale à lire (secondes)
+            start_time: Temps de début en secondes (si None, commence au début)
+            cache_dir: Si défini, le segment est aussi écrit dans ce dossier
+                       (même nom que download_video_snippet, voir snippet_filename)
+            
+        Retourne un StreamInput à passer à VideoAnalyzer.analyze_video
+        """
+        import subprocess
+        import sys
+        
+        logger.info(f"[STREAMING] {video_url} (start={start_time}s, duration={max_duration}s)")
+        engine = get_engine()
+        if engine is not None:
+            options = {
+                'format': DOWNLOAD_FORMAT,
+                'noplaylist': True,
+                'quiet': True,
+                'no_warnings': True,
+                'http_headers': {'User-Agent': DOWNLOAD_USER_AGENT},
+            }
+            try:
+                info = engine.extract_info(video_url, options, timeout=60)
+            except YtDlpCancelled:
+                raise Exception("Timeout: résolution du flux trop longue")
+            except Exception as e:
+                raise Exception(f"Erreur yt-dlp: {str(e)[:500]}")
+            if not info:
+                raise Exception("Erreur yt-dlp: aucune information extraite")
+        else:
+            cmd = [
+                sys.executable, '-m', 'yt_dlp',
+                video_url,
+                '--format', DOWNLOAD_FORMAT,
+                '--dump-single-json',
+                '--no-playlist',
+                '--quiet',
+                '--no-warnings',
+                '--user-agent', DOWNLOAD_USER_AGENT,
+            ]
+            try:
+                result = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
+            except subprocess.TimeoutExpired:
+                raise Exception("Timeout: résolution du flux trop longue")
+            if result.returncode != 0:
+                error_msg = result.stderr[:500] if result.stderr else "Unknown error"
+                raise Exception(f"Erreur yt-dlp: {error_msg}")
+            info = json.loads(result.stdout)
+        
+        # Formats vidéo + audio séparés : seule la piste vidéo est analysée
+        media = info
+        if not info.get('url') and info.get('requested_formats'):
+            media = next((f for f in info['requested_formats'] if f.get('vcodec') not in (None, 'none')),
+                         info['requested_formats'][0])
+        if not media.get('url'):
+            raise Exception("Erreur yt-dlp: aucune URL média pour ce format")
+        
+        fps, width, height = media.get('fps'), media.get('width'), media.get('height')
+        if not fps or not width or not height:
+            # Métadonnées absentes du manifeste : lecture de l'en-tête du flux
+            fps, _, (width, height) = probe_video(media['url'])
+        
+        total_duration = info.get('duration')
+        duration = max_duration
+        if total_duration:
+            duration = min(max_duration, total_duration - (start_time or 0))
+        
+        tee_path = None
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+            tee_path = os.path.join(cache_dir, snippet_filename(video_url, max_duration, start_time))
+        
+        return StreamInput(
+            url=media['url'],
+            fps=float(fps),
+            width=int(width),
+            height=int(height),
+            duration=duration,
+            start_time=start_time,
+            http_headers=media.get('http_headers') or {'User-Agent': DOWNLOAD_USER_AGENT},
+            tee_path=tee_path,
+            source_url=video_url
+        )
+    
     @staticmethod
     def _progress_hook(d):
         """Hook pour suivre la progression du téléchargement"""
@@ -677,6 +1110,26 @@ class YouTubeDownloader:
             print("[ENCODE] Terminé")
 
 
+class SnippetLease:
+    """Segment de download_video_snippet réservé jusqu'à `release()` (même interface que SegmentLease)"""
+    
+    def __init__(self, path: str):
+        self.path = path
+        self.hit = False
+        self._released = False
+    
+    def release(self):
+        if not self._released:
+            self._released = True
+            YouTubeDownloader.release_snippet(self.path)
+    
+    def __enter__(self) -> str:
+        return self.path
+    
+    def __exit__(self, *exc):
+        self.release()
+
+
 def main():
     """Exemple d'utilisation"""
     analyzer = VideoAnalyzer(threshold=27.0)
@@ -698,7 +1151,7 @@ def main():
         print(json.dumps(result, indent=2, ensure_ascii=False))
         
         # Nettoyer
-        os.remove(video_path)
+        downloader.release_snippet(video_path)
         
     except Exception as e:
         print(f"Erreur: {e}")
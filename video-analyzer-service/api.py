@@ -2,11 +2,15 @@
 Flask API pour l'analyse vidéo
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, url_for
 from flask_cors import CORS
 import os
 import tempfile
-from analyzer import VideoAnalyzer, YouTubeDownloader
+from analyzer import VideoAnalyzer, YouTubeDownloader, AnalysisSlots, AnalysisBusy, run_concurrently
+from result_cache import create_result_cache
+from download_cache import create_download_cache
+from analysis_jobs import JobManager, JobQueueFull, Progress, Work, create_job_store
+from batch_analysis import BatchAnalysis
 from supabase_manager import supabase_manager
 from typing import Dict, Any
 from dotenv import load_dotenv
@@ -23,12 +27,25 @@ CONFIG = {
     "max_video_duration": int(os.getenv("MAX_VIDEO_DURATION", 120)),
     "temp_dir": os.getenv("TEMP_DIR", "./temp/videos"),
     "host": os.getenv("FLASK_HOST", "0.0.0.0"),
-    "port": int(os.getenv("FLASK_PORT", 5000))
+    "port": int(os.getenv("FLASK_PORT", 5000)),
+    # Analyses (analyze_video) exécutées en même temps par ce processus : une
+    # comparaison en compte deux, un lot une par vidéo (voir AnalysisSlots)
+    "max_concurrent_analyses": int(os.getenv("MAX_CONCURRENT_ANALYSES", 2)),
+    # Attente max d'une analyse pour un créneau, ensuite 503
+    "analysis_slot_timeout": float(os.getenv("ANALYSIS_SLOT_TIMEOUT", 60))
 }
 
-# Services
-analyzer = VideoAnalyzer(threshold=CONFIG["threshold"])
+# Services ; analyses gourmandes en CPU : au plus max_concurrent_analyses à la fois (voir serve.py)
+analyzer = VideoAnalyzer(threshold=CONFIG["threshold"],
+                         slots=AnalysisSlots(CONFIG["max_concurrent_analyses"], CONFIG["analysis_slot_timeout"]))
 downloader = YouTubeDownloader()
+# Résultats déjà calculés (même URL, segment et configuration), partagés avec le worker
+result_cache = create_result_cache()
+# Segments téléchargés conservés (budget disque) ; vidéos orphelines de temp_dir nettoyées
+download_cache = create_download_cache(sweep_dirs=[CONFIG["temp_dir"]])
+# Analyses longues exécutées en tâche de fond ("async": true), voir GET /jobs/<id> ;
+# état partagé entre les processus de serve.py
+jobs = JobManager(store=create_job_store())
 
 # Verbose logging
 print("=" * 60)
@@ -38,16 +55,76 @@ print(f"[Config] Temp directory: {CONFIG['temp_dir']}")
 print(f"[Config] Seuil de détection: {CONFIG['threshold']}")
 print(f"[Config] Durée max video: {CONFIG['max_video_duration']}s")
 print(f"[Config] Server: {CONFIG['host']}:{CONFIG['port']}")
+print(f"[Config] Cache des résultats: {result_cache.path if result_cache else 'désactivé'}")
+print(f"[Config] Cache des segments: {download_cache.directory if download_cache else 'désactivé'}")
+print(f"[Config] Tâches asynchrones: {jobs.max_workers} en parallèle, {jobs.max_queued} en attente max")
+print(f"[Config] État des tâches: {jobs.store.path if jobs.store else 'mémoire du processus'}")
+print(f"[Config] Analyses simultanées: {CONFIG['max_concurrent_analyses']} par processus")
 print("=" * 60)
 
 
+def run_or_submit(kind: str, data: Dict[str, Any], work: Work):
+    """
+    Exécute `work` pendant la requête, ou, si le corps JSON contient
+    "async": true, le met en file (202 + identifiant de tâche, 429 si la
+    file est pleine) ; le résultat est ensuite lu sur GET /jobs/<id>.
+    Dans les deux cas, 503 si une analyse n'obtient pas de créneau à temps.
+    """
+    def guarded(progress: Progress):
+        try:
+            return work(progress)
+        except AnalysisBusy as e:
+            print(f"[SERVEUR] {e}, requête refusée (503)")
+            return {
+                "success": False,
+                "error": "Trop d'analyses en cours, réessayer plus tard"
+            }, 503
+    
+    if not data.get("async"):
+        result, status = guarded(None)
+        if status == 503:
+            return jsonify(result), status, {"Retry-After": "30"}
+        return jsonify(result), status
+    
+    try:
+        job = jobs.submit(kind, guarded)
+    except JobQueueFull as e:
+        return jsonify({"success": False, "error": str(e)}), 429, {"Retry-After": "30"}
+    
+    status_url = url_for("get_job", job_id=job.id)
+    return jsonify({
+        "success": True,
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": status_url
+    }), 202, {"Location": status_url}
+
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def get_job(job_id: str):
+    """
+    État d'une tâche asynchrone : status (queued, running, completed,
+    failed), étapes (stages) et, une fois terminée, résultat de la route
+    """
+    job = jobs.status(job_id)
+    if job is None:
+        return jsonify({
+            "success": False,
+            "error": "Tâche inconnue ou expirée"
+        }), 404
+    return jsonify(dict(job, success=True))
+
+
 @app.route("/health", methods=["GET"])
 def health():
     """Endpoint de vérification de santé"""
     return jsonify({
         "status": "healthy",
         "service": "pacing-score-video-analyzer",
-        "version": "1.0.0"
+        "version": "1.0.0",
+        "result_cache": result_cache.stats() if result_cache else None,
+        "download_cache": download_cache.stats() if download_cache else None,
+        "jobs": jobs.stats()
     })
 
 
@@ -61,7 +138,8 @@ def analyze_video():
         "video_url": "https://www.youtube.com/watch?v=...",
         "max_duration": 120,  # Optionnel, durée max en secondes
         "analyze_motion": true,  # Optionnel, analyser le mouvement (plus lent)
-        "analyze_flashes": true  # Optionnel, détecter les flashs
+        "analyze_flashes": true,  # Optionnel, détecter les flashs
+        "async": false  # Optionnel, réponse immédiate avec un job_id (voir GET /jobs/<id>)
     }
     """
     try:
@@ -82,41 +160,34 @@ def analyze_video():
         # Créer le dossier temporaire
         os.makedirs(CONFIG["temp_dir"], exist_ok=True)
         
-        # Télécharger la vidéo
-        print(f"[TÉLÉCHARGEMENT] {video_url}")
-        video_path = downloader.download_video_snippet(
-            video_url=video_url,
-            output_dir=CONFIG["temp_dir"],
-            max_duration=max_duration
-        )
-        
-        if not video_path:
-            return jsonify({
-                "success": False,
-                "error": "Échec du téléchargement"
-            }), 500
-        
-        # Analyser la vidéo
-        print(f"[ANALYSE] Démarrage de l'analyse...")
-        result = analyzer.analyze_video(
-            video_path, 
-            analyze_motion=analyze_motion,
-            analyze_flashes=analyze_flashes
-        )
-        
-        # Nettoyer le fichier temporaire
-        try:
-            os.remove(video_path)
-            print(f"[NETTOYAGE] {video_path}")
-        except:
-            pass
-        
-        # Sauvegarder dans Supabase
-        if result.get("success"):
-            supabase_manager.save_analysis_result(result, video_url)
+        def work(progress: Progress):
+            # Télécharger et analyser la vidéo (fichier temporaire supprimé ensuite)
+            print(f"[TÉLÉCHARGEMENT] {video_url}")
+            result = analyzer.analyze_url(
+                video_url,
+                max_duration=max_duration,
+                analyze_motion=analyze_motion,
+                analyze_flashes=analyze_flashes,
+                output_dir=CONFIG["temp_dir"],
+                cache=result_cache,
+                download_cache=download_cache,
+                progress=progress
+            )
+            
+            if result is None:
+                return {
+                    "success": False,
+                    "error": "Échec du téléchargement"
+                }, 500
+            
+            # Sauvegarder dans Supabase
+            if result.get("success"):
+                supabase_manager.save_analysis_result(result, video_url)
+            
+            # Retourner les résultats
+            return result, 200
         
-        # Retourner les résultats
-        return jsonify(result)
+        return run_or_submit("analyze", data, work)
         
     except Exception as e:
         return jsonify({
@@ -135,7 +206,8 @@ def compare_videos():
         "video1_url": "https://www.youtube.com/watch?v=...",
         "video2_url": "https://www.youtube.com/watch?v=...",
         "name1": "Puffin Rock",
-        "name2": "Cocomelon"
+        "name2": "Cocomelon",
+        "async": false  # Optionnel, voir /analyze
     }
     """
     try:
@@ -152,55 +224,51 @@ def compare_videos():
         name1 = data.get("name1", "Vidéo 1")
         name2 = data.get("name2", "Vidéo 2")
         
-        # Télécharger les deux vidéos
+        # Télécharger et analyser les deux vidéos (mêmes options qu'analyze_comparison)
         os.makedirs(CONFIG["temp_dir"], exist_ok=True)
         
-        print(f"[TÉLÉCHARGEMENT] 1: {name1}")
-        video1_path = downloader.download_video_snippet(
-            video_url=video1_url,
-            output_dir=CONFIG["temp_dir"],
-            max_duration=120
-        )
-        
-        print(f"[TÉLÉCHARGEMENT] 2: {name2}")
-        video2_path = downloader.download_video_snippet(
-            video_url=video2_url,
-            output_dir=CONFIG["temp_dir"],
-            max_duration=120
-        )
-        
-        if not video1_path or not video2_path:
-            return jsonify({
-                "success": False,
-                "error": "Échec du téléchargement d'une des vidéos"
-            }), 500
-        
-        # Comparer les vidéos
-        result = analyzer.analyze_comparison(video1_path, video2_path, name1, name2)
-        
-        # Nettoyer
-        try:
-            if video1_path and os.path.exists(video1_path):
-                os.remove(video1_path)
-            if video2_path and os.path.exists(video2_path):
-                os.remove(video2_path)
-        except:
-            pass
-        
-        # Sauvegarder les analyses individuelles
-        if result.get("success"):
-            supabase_manager.save_analysis_result(
-                result["comparison"]["video1"], 
-                video1_url, 
-                name1
-            )
-            supabase_manager.save_analysis_result(
-                result["comparison"]["video2"], 
-                video2_url, 
-                name2
+        def work(progress: Progress):
+            progress = progress or (lambda stage, state: None)
+            
+            # Les deux vidéos en parallèle (pool partagé des comparaisons)
+            print(f"[TÉLÉCHARGEMENT] 1: {name1} / 2: {name2}")
+            result1, result2 = run_concurrently(
+                lambda: analyzer.analyze_url(video1_url, max_duration=120, analyze_motion=False, analyze_flashes=False,
+                                             output_dir=CONFIG["temp_dir"], cache=result_cache,
+                                             download_cache=download_cache,
+                                             progress=lambda stage, state: progress(f"video1.{stage}", state)),
+                lambda: analyzer.analyze_url(video2_url, max_duration=120, analyze_motion=False, analyze_flashes=False,
+                                             output_dir=CONFIG["temp_dir"], cache=result_cache,
+                                             download_cache=download_cache,
+                                             progress=lambda stage, state: progress(f"video2.{stage}", state))
             )
+            
+            if result1 is None or result2 is None:
+                return {
+                    "success": False,
+                    "error": "Échec du téléchargement d'une des vidéos"
+                }, 500
+            
+            # Comparer les vidéos
+            print(f"📊 Comparaison: {name1} vs {name2}")
+            result = analyzer.compare_results(result1, result2, name1, name2)
+            
+            # Sauvegarder les analyses individuelles
+            if result.get("success"):
+                supabase_manager.save_analysis_result(
+                    result["comparison"]["video1"], 
+                    video1_url, 
+                    name1
+                )
+                supabase_manager.save_analysis_result(
+                    result["comparison"]["video2"], 
+                    video2_url, 
+                    name2
+                )
+            
+            return result, 200
         
-        return jsonify(result)
+        return run_or_submit("compare", data, work)
         
     except Exception as e:
         return jsonify({
@@ -218,7 +286,8 @@ def analyze_trailer():
     {
         "trailer_url": "https://www.youtube.com/watch?v=...",
         "episode_url": "https://www.youtube.com/watch?v=...",  # Optionnel
-        "series_title": "Nom de la série"
+        "series_title": "Nom de la série",
+        "async": false  # Optionnel, voir /analyze
     }
     """
     try:
@@ -236,15 +305,21 @@ def analyze_trailer():
         
         os.makedirs(CONFIG["temp_dir"], exist_ok=True)
         
-        print(f"[TRAILER] Analyse de la bande-annonce de: {series_title}")
-        
-        # Utiliser l'analyse trailer vs épisode
-        result = analyzer.analyze_trailer_vs_episode(
-            trailer_url=trailer_url,
-            episode_url=episode_url
-        )
+        def work(progress: Progress):
+            print(f"[TRAILER] Analyse de la bande-annonce de: {series_title}")
+            
+            # Utiliser l'analyse trailer vs épisode
+            result = analyzer.analyze_trailer_vs_episode(
+                trailer_url=trailer_url,
+                episode_url=episode_url,
+                cache=result_cache,
+                download_cache=download_cache,
+                progress=progress
+            )
+            
+            return result, 200
         
-        return jsonify(result)
+        return run_or_submit("analyze-trailer", data, work)
         
     except Exception as e:
         return jsonify({
@@ -261,7 +336,7 @@ def get_history():
     limit = request.args.get('limit', 10, type=int)
     
     # Si Supabase n'est pas configuré, retourner une réponse mock
-    if not supabase_manager.client:
+    if not supabase_manager.initialized:
         return jsonify({
             "success": True,
             "data": [
@@ -308,7 +383,7 @@ def serve_ui():
 @app.route("/analyze-batch", methods=["POST"])
 def analyze_batch():
     """
-    Analyse plusieurs vidéos en batch
+    Analyse plusieurs vidéos en batch, en parallèle (voir batch_analysis.py)
     
     Paramètres (JSON):
     {
@@ -316,8 +391,14 @@ def analyze_batch():
             {"url": "...", "title": "..."},
             {"url": "...", "title": "..."}
         ],
-        "max_duration": 120
+        "max_duration": 120,
+        "stream": false,  # Optionnel, une ligne NDJSON par vidéo dès qu'elle est analysée
+        "async": false  # Optionnel, voir /analyze
     }
+    
+    En streaming (ou avec Accept: application/x-ndjson), chaque ligne est
+    le résultat d'une vidéo avec son "index" dans le lot, dans l'ordre de
+    fin ; la dernière ligne est {"done": true, "total_analyzed": n}.
     """
     try:
         data = request.get_json()
@@ -330,42 +411,44 @@ def analyze_batch():
         
         videos = data["videos"]
         max_duration = data.get("max_duration", CONFIG["max_video_duration"])
-        results = []
         
-        for video_info in videos:
-            video_url = video_info.get("url")
-            video_title = video_info.get("title", "Inconnu")
+        def batch(progress: Progress = None) -> BatchAnalysis:
+            # Télécharger et analyser (fichiers supprimés ensuite)
+            return BatchAnalysis(analyzer, videos, max_duration=max_duration, output_dir=CONFIG["temp_dir"],
+                                 cache=result_cache, download_cache=download_cache, progress=progress)
+        
+        stream = data.get("stream") or "application/x-ndjson" in request.headers.get("Accept", "")
+        if stream and not data.get("async"):
+            def lines():
+                analyzed = 0
+                for index, result in batch():
+                    if result is None:
+                        video_info = videos[index]
+                        result = {
+                            "success": False,
+                            "error": "Échec du téléchargement",
+                            "video_title": video_info.get("title", "Inconnu"),
+                            "video_url": video_info.get("url")
+                        }
+                    else:
+                        analyzed += 1
+                    yield app.json.dumps(dict(result, index=index)) + "\n"
+                yield app.json.dumps({"done": True, "success": True, "total_analyzed": analyzed}) + "\n"
             
-            try:
-                # Télécharger et analyser
-                video_path = downloader.download_video_snippet(
-                    video_url=video_url,
-                    output_dir=CONFIG["temp_dir"],
-                    max_duration=max_duration
-                )
-                
-                if video_path:
-                    result = analyzer.analyze_video(video_path)
-                    result["video_title"] = video_title
-                    result["video_url"] = video_url
-                    results.append(result)
-                    
-                    # Nettoyer
-                    os.remove(video_path)
-                    
-            except Exception as e:
-                results.append({
-                    "success": False,
-                    "error": str(e),
-                    "video_title": video_title,
-                    "video_url": video_url
-                })
+            # Chaque analyse du lot attend son créneau (ligne en échec si aucun ne se libère)
+            return Response(lines(), mimetype="application/x-ndjson")
         
-        return jsonify({
-            "success": True,
-            "total_analyzed": len(results),
-            "results": results
-        })
+        def work(progress: Progress):
+            # Ordre du lot ; vidéos non téléchargées omises
+            results = [result for _, result in sorted(batch(progress), key=lambda item: item[0])
+                       if result is not None]
+            return {
+                "success": True,
+                "total_analyzed": len(results),
+                "results": results
+            }, 200
+        
+        return run_or_submit("analyze-batch", data, work)
         
     except Exception as e:
         return jsonify({
@@ -383,7 +466,8 @@ def analyze_from_trailer():
     Paramètres (JSON):
     {
         "trailer_url": "https://www.youtube.com/watch?v=...",
-        "series_title": "Nom de la série"
+        "series_title": "Nom de la série",
+        "async": false  # Optionnel, voir /analyze
     }
     """
     try:
@@ -403,29 +487,29 @@ def analyze_from_trailer():
         # Télécharger les 2 premières minutes de la bande-annonce
         os.makedirs(CONFIG["temp_dir"], exist_ok=True)
         
-        video_path = downloader.download_video_snippet(
-            video_url=trailer_url,
-            output_dir=CONFIG["temp_dir"],
-            max_duration=120  # 2 minutes
-        )
-        
-        if not video_path:
-            return jsonify({
-                "success": False,
-                "error": "Échec du téléchargement de la bande-annonce"
-            }), 500
-        
-        # Analyser
-        result = analyzer.analyze_video(video_path)
-        
-        # Ajouter les informations de la série
-        result["series_title"] = series_title
-        result["trailer_url"] = trailer_url
-        
-        # Nettoyer
-        os.remove(video_path)
+        def work(progress: Progress):
+            result = analyzer.analyze_url(
+                trailer_url,
+                max_duration=120,  # 2 minutes
+                output_dir=CONFIG["temp_dir"],
+                cache=result_cache,
+                download_cache=download_cache,
+                progress=progress
+            )
+            
+            if result is None:
+                return {
+                    "success": False,
+                    "error": "Échec du téléchargement de la bande-annonce"
+                }, 500
+            
+            # Ajouter les informations de la série
+            result["series_title"] = series_title
+            result["trailer_url"] = trailer_url
+            
+            return result, 200
         
-        return jsonify(result)
+        return run_or_submit("analyze-from-trailer", data, work)
         
     except Exception as e:
         return jsonify({
@@ -435,7 +519,7 @@ def analyze_from_trailer():
 
 
 if __name__ == "__main__":
-    # Pour éviter les problèmes avec Waitress sur Windows, on utilise Flask en mode debug
+    # Serveur de développement ; en production : python serve.py (plusieurs processus)
     print("[SERVEUR] Démarrage avec Flask (développement)")
     print(f"[SERVEUR] URL: http://{CONFIG['host']}:{CONFIG['port']}")
     print(f"[SERVEUR] Interface: http://{CONFIG['host']}:{CONFIG['port']}")
@@ -0,0 +1,133 @@
+"""
+Analyse en lot de l'API (/analyze-batch)
+
+Les vidéos d'un lot sont indépendantes : au lieu de les télécharger puis
+analyser l'une après l'autre, deux étages (voir pipeline.Stage) travaillent
+en parallèle :
+- téléchargement : BATCH_DOWNLOAD_WORKERS threads ; un résultat déjà en
+  cache est rendu sans téléchargement ;
+- analyse : BATCH_ANALYSIS_WORKERS threads ; au plus BATCH_QUEUE_SIZE
+  segments téléchargés attendent leur analyse (fichiers sur disque bornés).
+
+Chaque résultat est rendu dès qu'il est prêt (ordre de fin, avec l'index
+de la vidéo dans le lot) : l'API peut le transmettre aussitôt (NDJSON).
+"""
+
+import os
+import queue
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from pipeline import Stage
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+BATCH_DOWNLOAD_WORKERS = int(os.getenv("BATCH_DOWNLOAD_WORKERS", 4))
+BATCH_ANALYSIS_WORKERS = int(os.getenv("BATCH_ANALYSIS_WORKERS", 2))
+BATCH_QUEUE_SIZE = int(os.getenv("BATCH_QUEUE_SIZE", 2))
+
+
+class BatchAnalysis:
+    """
+    Lot de vidéos ({"url", "title"}) analysées en parallèle ; itérer sur
+    l'objet rend (index, résultat) dans l'ordre de fin. Le résultat porte
+    video_title et video_url ; il vaut None si le téléchargement a échoué.
+    """
+
+    def __init__(self, analyzer, videos: List[Dict[str, Any]], max_duration: int = 120,
+                 output_dir: str = None, cache=None, download_cache=None,
+                 download_workers: int = BATCH_DOWNLOAD_WORKERS, analysis_workers: int = BATCH_ANALYSIS_WORKERS,
+                 progress: Callable[[str, str], None] = None):
+        """
+        Args:
+            analyzer: VideoAnalyzer partagé
+            videos: Vidéos du lot
+            max_duration: Durée analysée de chaque vidéo (secondes)
+            output_dir, cache, download_cache: voir VideoAnalyzer.analyze_url
+            progress: Étapes de chaque vidéo, préfixées par son index ("3.download")
+        """
+        self.analyzer = analyzer
+        self.videos = videos
+        self.max_duration = max_duration
+        self.output_dir = output_dir
+        self.cache = cache
+        self.download_cache = download_cache
+        self.progress = progress or (lambda stage, state: None)
+        self.results: "queue.Queue[Tuple[int, Optional[Dict[str, Any]]]]" = queue.Queue()
+        self.downloads = Stage("batch-download", self._download, workers=download_workers,
+                               queue_size=max(1, len(videos)), on_error=self._download_failed)
+        self.analyses = Stage("batch-analysis", self._analyze, workers=analysis_workers,
+                              queue_size=BATCH_QUEUE_SIZE, on_error=self._analysis_failed)
+
+    def __iter__(self) -> Iterator[Tuple[int, Optional[Dict[str, Any]]]]:
+        self.downloads.start()
+        self.analyses.start()
+        try:
+            for index, video in enumerate(self.videos):
+                self.downloads.submit((index, video))
+            for _ in self.videos:
+                yield self.results.get()
+        finally:
+            # Fin normale, ou client déconnecté pendant le streaming
+            self.downloads.stop()
+            self.analyses.stop()
+            self._release_pending()
+
+    def _stage_progress(self, index: int) -> Callable[[str, str], None]:
+        return lambda stage, state: self.progress(f"{index}.{stage}", state)
+
+    def _emit(self, index: int, video: Dict[str, Any], result: Optional[Dict[str, Any]]):
+        if result is not None:
+            result = dict(result, video_title=video.get("title", "Inconnu"), video_url=video.get("url"))
+        self.results.put((index, result))
+
+    def _download(self, item: Tuple[int, Dict[str, Any]]):
+        index, video = item
+        progress = self._stage_progress(index)
+        key, cached = self.analyzer.cached_analysis(video.get("url"), self.max_duration, cache=self.cache)
+        if cached is not None:
+            progress("cache", "done")
+            self._emit(index, video, cached)
+            return
+
+        progress("download", "running")
+        segment = self.analyzer.download_segment(video.get("url"), self.max_duration, output_dir=self.output_dir,
+                                                 download_cache=self.download_cache)
+        if segment is None:
+            progress("download", "failed")
+            self._emit(index, video, None)
+            return
+        progress("download", "done")
+        if not self.analyses.submit((index, video, key, segment)):
+            segment.release()  # lot interrompu
+
+    def _analyze(self, item):
+        index, video, key, segment = item
+        progress = self._stage_progress(index)
+        progress("analysis", "running")
+        with segment:
+            result = self.analyzer.analyze_video(segment.path)
+        progress("analysis", "done")
+        if key is not None:
+            self.cache.put(key, result)
+        self._emit(index, video, result)
+
+    def _download_failed(self, item, error: Exception):
+        index, video = item
+        self._emit(index, video, {"success": False, "error": str(error)})
+
+    def _analysis_failed(self, item, error: Exception):
+        index, video, _, segment = item
+        segment.release()
+        self._emit(index, video, {"success": False, "error": str(error)})
+
+    def _release_pending(self):
+        """Segments téléchargés mais jamais analysés (lot interrompu)"""
+        for pending in (self.analyses.retries, self.analyses.inbox):
+            while True:
+                try:
+                    _, _, _, segment = pending.get_nowait()
+                except queue.Empty:
+                    break
+                segment.release()
@@ -0,0 +1,154 @@
+"""
+Benchmark : tâches d'analyse asynchrones de l'API
+
+Sert une vidéo synthétique en HTTP local, puis (client de test Flask) :
+- POST /analyze synchrone : la requête dure tout le téléchargement + analyse ;
+- N POST /analyze avec "async": true envoyés ensemble : réponse 202
+  immédiate, au plus JOB_WORKERS tâches en parallèle, 429 au-delà de
+  JOB_MAX_QUEUED tâches en attente ;
+- GET /jobs/<id> jusqu'à la fin : étapes (download, analysis) et résultat
+  identique au résultat synchrone ;
+- après JOB_RESULT_TTL, la tâche est oubliée (404).
+
+Caches désactivés : chaque tâche télécharge et analyse réellement.
+Nécessite ffmpeg (téléchargement de segment par yt-dlp).
+
+Usage :
+    python benchmarks/bench_analysis_jobs.py [--jobs 8] [--workers 2] [--max-queued 3]
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--jobs", type=int, default=8, help="Requêtes asynchrones simultanées")
+parser.add_argument("--workers", type=int, default=2, help="JOB_WORKERS")
+parser.add_argument("--max-queued", type=int, default=3, help="JOB_MAX_QUEUED")
+parser.add_argument("--seconds", type=int, default=30, help="Durée de la vidéo synthétique")
+args = parser.parse_args()
+
+# Avant l'import de l'API (configuration lue à l'import)
+WORK_DIR = tempfile.mkdtemp(prefix="bench_analysis_jobs_")
+TTL = 3
+os.environ.update({
+    "JOB_WORKERS": str(args.workers),
+    "JOB_MAX_QUEUED": str(args.max_queued),
+    "JOB_RESULT_TTL": str(TTL),
+    "RESULT_CACHE_PATH": "",
+    "DOWNLOAD_CACHE_DIR": "",
+    "JOB_STORE_PATH": os.path.join(WORK_DIR, "jobs.sqlite"),
+    "TEMP_DIR": os.path.join(WORK_DIR, "videos")
+})
+
+from bench_segment_seek import generate_video
+from bench_ytdlp_engine import serve_directory
+
+
+def main():
+    failures = []
+    try:
+        generate_video(os.path.join(WORK_DIR, "raw.mp4"), args.seconds)
+        # moov en tête : ffmpeg peut lire le segment en HTTP sans tout télécharger
+        subprocess.run(["ffmpeg", "-y", "-loglevel", "error", "-i", os.path.join(WORK_DIR, "raw.mp4"),
+                        "-c", "copy", "-movflags", "+faststart", os.path.join(WORK_DIR, "synthetic.mp4")],
+                       check=True)
+        server = serve_directory(WORK_DIR)
+        url = f"http://127.0.0.1:{server.server_address[1]}/synthetic.mp4"
+
+        import analyzer as analyzer_module
+        # Extracteur générique : aucun format "<= 480p" annoncé pour un fichier brut
+        analyzer_module.DOWNLOAD_FORMAT = "best"
+        import api
+        # Pas de Supabase en benchmark : save_analysis_result journalise l'erreur et renvoie False
+        client = api.app.test_client()
+        payload = {"video_url": url, "max_duration": args.seconds}
+
+        started = time.perf_counter()
+        sync = client.post("/analyze", json=payload).get_json()
+        sync_time = time.perf_counter() - started
+
+        # Requêtes asynchrones simultanées
+        responses = []
+        lock = threading.Lock()
+
+        def post():
+            started = time.perf_counter()
+            response = client.post("/analyze", json=dict(payload, **{"async": True}))
+            with lock:
+                responses.append((time.perf_counter() - started, response.status_code, response.get_json(),
+                                  response.headers.get("Retry-After")))
+
+        threads = [threading.Thread(target=post) for _ in range(args.jobs)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        accepted = [body["job_id"] for _, status, body, _ in responses if status == 202]
+        rejected = [retry for _, status, _, retry in responses if status == 429]
+        post_latency = max(elapsed for elapsed, _, _, _ in responses)
+
+        # Suivi des tâches
+        max_running = 0
+        finished = {}
+        while len(finished) < len(accepted) and time.perf_counter() - started < 600:
+            max_running = max(max_running, client.get("/health").get_json()["jobs"]["running"])
+            for job_id in accepted:
+                if job_id not in finished:
+                    job = client.get(f"/jobs/{job_id}").get_json()
+                    if job["status"] in ("completed", "failed"):
+                        finished[job_id] = job
+            time.sleep(0.05)
+        async_time = time.perf_counter() - started
+
+        time.sleep(TTL + 0.5)
+        expired = client.get(f"/jobs/{accepted[0]}").status_code if accepted else None
+        server.shutdown()
+    finally:
+        shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+    def comparable(result):
+        # engine_stats : temps de décodage propres à chaque analyse
+        return {field: value for field, value in (result or {}).items() if field not in ("cached", "engine_stats")}
+
+    print("=" * 60)
+    print(f"Vidéo synthétique de {args.seconds}s ; JOB_WORKERS={args.workers}, JOB_MAX_QUEUED={args.max_queued}")
+    print(f"  POST synchrone     : {sync_time:.2f}s (requête bloquée)")
+    print(f"  {args.jobs} POST async     : réponse en {post_latency * 1000:.0f}ms max ; "
+          f"{len(accepted)} acceptées (202), {len(rejected)} refusées (429, Retry-After {rejected[:1]})")
+    print(f"  tâches acceptées   : terminées en {async_time:.2f}s, {max_running} en parallèle au plus")
+    if finished:
+        print(f"  étapes d'une tâche : {sorted(next(iter(finished.values()))['stages'])}")
+    print(f"  après TTL          : GET /jobs/<id> -> {expired}")
+
+    if post_latency > 1.0:
+        failures.append("POST asynchrone bloquant")
+    if len(accepted) < args.max_queued or (args.jobs > args.workers + args.max_queued and not rejected):
+        failures.append("file d'attente non bornée ou trop restrictive")
+    if max_running > args.workers:
+        failures.append(f"{max_running} tâches simultanées pour {args.workers} workers")
+    if len(finished) != len(accepted):
+        failures.append("tâches non terminées")
+    for job in finished.values():
+        if job["status"] != "completed" or comparable(job["result"]) != comparable(sync) \
+                or {"download", "analysis"} - set(job["stages"]):
+            failures.append("résultat ou étapes d'une tâche incorrects")
+            break
+    if expired != 404:
+        failures.append("tâche conservée après son TTL")
+    if failures:
+        print("ÉCHEC : " + " ; ".join(failures))
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Benchmark : /analyze-batch séquentiel vs parallèle en streaming NDJSON
+
+Sert N vidéos synthétiques en HTTP local avec une latence par requête
+(source distante simulée), puis :
+- séquentiel (comportement précédent) : analyze_url vidéo après vidéo ;
+- POST /analyze-batch avec "stream": true : téléchargements et analyses
+  en parallèle (BATCH_DOWNLOAD_WORKERS / BATCH_ANALYSIS_WORKERS), délai
+  avant la première ligne NDJSON et durée totale ;
+- même lot relancé : résultats servis depuis le cache.
+
+Vérifie une ligne par vidéo (plus la ligne finale) et des résultats
+identiques au séquentiel. Nécessite ffmpeg (téléchargement par yt-dlp).
+
+Usage :
+    python benchmarks/bench_batch_analysis.py [--videos 20] [--latency 0.5] [--download-workers 8]
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--videos", type=int, default=20, help="Vidéos du lot")
+parser.add_argument("--latency", type=float, default=0.5, help="Latence de chaque requête HTTP (secondes)")
+parser.add_argument("--download-workers", type=int, default=8, help="BATCH_DOWNLOAD_WORKERS")
+parser.add_argument("--analysis-workers", type=int, default=2, help="BATCH_ANALYSIS_WORKERS")
+args = parser.parse_args()
+
+# Avant l'import de l'API (configuration lue à l'import)
+WORK_DIR = tempfile.mkdtemp(prefix="bench_batch_analysis_")
+os.environ.update({
+    "BATCH_DOWNLOAD_WORKERS": str(args.download_workers),
+    "BATCH_ANALYSIS_WORKERS": str(args.analysis_workers),
+    "RESULT_CACHE_PATH": os.path.join(WORK_DIR, "result_cache.sqlite"),
+    "DOWNLOAD_CACHE_DIR": "",
+    "TEMP_DIR": os.path.join(WORK_DIR, "videos")
+})
+
+from bench_segment_seek import generate_video
+from bench_ytdlp_engine import serve_directory
+
+SECONDS = (10, 20, 30)
+
+
+def comparable(result):
+    return {field: value for field, value in (result or {}).items()
+            if field not in ("cached", "engine_stats", "index", "video_title", "video_url")}
+
+
+def main():
+    failures = []
+    try:
+        media = os.path.join(WORK_DIR, "media")
+        os.makedirs(media)
+        for seconds in SECONDS:
+            generate_video(os.path.join(WORK_DIR, f"raw{seconds}.mp4"), seconds)
+            # moov en tête : ffmpeg peut lire le segment en HTTP sans tout télécharger
+            subprocess.run(["ffmpeg", "-y", "-loglevel", "error", "-i", os.path.join(WORK_DIR, f"raw{seconds}.mp4"),
+                            "-c", "copy", "-movflags", "+faststart", os.path.join(media, f"base{seconds}.mp4")],
+                           check=True)
+        for index in range(args.videos):
+            os.symlink(f"base{SECONDS[index % len(SECONDS)]}.mp4", os.path.join(media, f"trailer{index}.mp4"))
+        server = serve_directory(media, latency=args.latency)
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        videos = [{"url": f"{base}/trailer{index}.mp4", "title": f"Trailer {index}"} for index in range(args.videos)]
+
+        import analyzer as analyzer_module
+        # Extracteur générique : aucun format "<= 480p" annoncé pour un fichier brut
+        analyzer_module.DOWNLOAD_FORMAT = "best"
+        import api
+        client = api.app.test_client()
+
+        # Référence : une vidéo après l'autre, sans cache
+        started = time.perf_counter()
+        sequential = [api.analyzer.analyze_url(video["url"], max_duration=max(SECONDS),
+                                               output_dir=api.CONFIG["temp_dir"]) for video in videos]
+        sequential_time = time.perf_counter() - started
+
+        def streamed():
+            started = time.perf_counter()
+            response = client.post("/analyze-batch", json={"videos": videos, "max_duration": max(SECONDS),
+                                                           "stream": True}, buffered=False)
+            first_line, lines, pending = None, [], b""
+            for chunk in response.response:
+                pending += chunk if isinstance(chunk, bytes) else chunk.encode()
+                while b"\n" in pending:
+                    line, pending = pending.split(b"\n", 1)
+                    if first_line is None:
+                        first_line = time.perf_counter() - started
+                    lines.append(json.loads(line))
+            response.close()
+            return first_line, time.perf_counter() - started, lines
+
+        first_line, parallel_time, lines = streamed()
+        cached_first, cached_time, cached_lines = streamed()
+        server.shutdown()
+    finally:
+        shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+    items = sorted((line for line in lines if "index" in line), key=lambda line: line["index"])
+    print("=" * 60)
+    print(f"{args.videos} vidéos ({'/'.join(map(str, SECONDS))}s), latence {args.latency}s par requête ; "
+          f"{args.download_workers} téléchargements / {args.analysis_workers} analyses en parallèle")
+    print(f"  séquentiel            : {sequential_time:.1f}s, rien avant la fin")
+    print(f"  parallèle (NDJSON)    : {parallel_time:.1f}s (x{sequential_time / parallel_time:.1f}), "
+          f"première ligne après {first_line:.1f}s")
+    print(f"  relancé (cache)       : {cached_time:.2f}s, première ligne après {cached_first:.2f}s")
+
+    if len(items) != args.videos or lines[-1].get("done") is not True:
+        failures.append(f"{len(items)} lignes de résultat pour {args.videos} vidéos")
+    if any(comparable(line) != comparable(reference) for line, reference in zip(items, sequential)):
+        failures.append("résultats différents du séquentiel")
+    if sum(1 for line in cached_lines if line.get("cached")) != args.videos:
+        failures.append("lot relancé non servi depuis le cache")
+    if parallel_time >= sequential_time:
+        failures.append("aucun gain du parallélisme")
+    if failures:
+        print("ÉCHEC : " + " ; ".join(failures))
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
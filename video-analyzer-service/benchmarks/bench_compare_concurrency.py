@@ -0,0 +1,121 @@
+"""
+Benchmark : /compare et trailer vs épisode, vidéos l'une après l'autre vs en parallèle
+
+Sert deux vidéos synthétiques en HTTP local avec une latence par requête
+(source distante simulée), puis mesure (caches désactivés, médiane de R
+essais) :
+- POST /compare (client de test Flask) ;
+- VideoAnalyzer.analyze_trailer_vs_episode ;
+avec un pool des comparaisons à 1 thread (comportement précédent :
+téléchargement et analyse de la première vidéo, puis de la seconde) puis
+à COMPARE_WORKERS threads. Vérifie des résultats identiques.
+
+Nécessite ffmpeg (téléchargement de segment par yt-dlp).
+
+Usage :
+    python benchmarks/bench_compare_concurrency.py [--seconds 60] [--latency 0.5] [--repeats 3]
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Avant l'import de l'API (configuration lue à l'import)
+WORK_DIR = tempfile.mkdtemp(prefix="bench_compare_concurrency_")
+os.environ.update({
+    "RESULT_CACHE_PATH": "",
+    "DOWNLOAD_CACHE_DIR": "",
+    "TEMP_DIR": os.path.join(WORK_DIR, "videos")
+})
+
+from bench_segment_seek import generate_video
+from bench_ytdlp_engine import serve_directory
+
+
+def comparable(value):
+    """Résultat sans engine_stats (temps de décodage propres à chaque analyse)"""
+    if isinstance(value, dict):
+        return {field: comparable(item) for field, item in value.items() if field != "engine_stats"}
+    return value
+
+
+def median_time(call, repeats: int):
+    times, result = [], None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = call()
+        times.append(time.perf_counter() - started)
+    return statistics.median(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=int, default=60, help="Durée de chaque vidéo synthétique")
+    parser.add_argument("--latency", type=float, default=0.5, help="Latence de chaque requête HTTP (secondes)")
+    parser.add_argument("--repeats", type=int, default=3, help="Essais par mesure")
+    args = parser.parse_args()
+
+    timings = {}
+    results = {}
+    try:
+        media = os.path.join(WORK_DIR, "media")
+        os.makedirs(media)
+        for name, seed_seconds in (("video1", args.seconds), ("video2", args.seconds - 7)):
+            generate_video(os.path.join(WORK_DIR, f"{name}.mp4"), seed_seconds)
+            # moov en tête : ffmpeg peut lire le segment en HTTP sans tout télécharger
+            subprocess.run(["ffmpeg", "-y", "-loglevel", "error", "-i", os.path.join(WORK_DIR, f"{name}.mp4"),
+                            "-c", "copy", "-movflags", "+faststart", os.path.join(media, f"{name}.mp4")], check=True)
+        server = serve_directory(media, latency=args.latency)
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+
+        import analyzer as analyzer_module
+        # Extracteur générique : aucun format "<= 480p" annoncé pour un fichier brut
+        analyzer_module.DOWNLOAD_FORMAT = "best"
+        import api
+        # Pas de Supabase en benchmark : save_analysis_result journalise l'erreur et renvoie False
+        client = api.app.test_client()
+
+        def compare():
+            return client.post("/compare", json={"video1_url": f"{base}/video1.mp4",
+                                                 "video2_url": f"{base}/video2.mp4"}).get_json()
+
+        def trailer_vs_episode():
+            return api.analyzer.analyze_trailer_vs_episode(f"{base}/video1.mp4", f"{base}/video2.mp4",
+                                                           episode_duration=args.seconds)
+
+        for mode, workers in (("séquentiel", 1), ("parallèle", analyzer_module.COMPARE_WORKERS)):
+            analyzer_module._compare_pool = ThreadPoolExecutor(max_workers=workers)
+            for label, call in (("/compare", compare), ("trailer vs épisode", trailer_vs_episode)):
+                timings[(mode, label)], results[(mode, label)] = median_time(call, args.repeats)
+        server.shutdown()
+    finally:
+        shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+    failures = []
+    print("=" * 60)
+    print(f"2 vidéos de ~{args.seconds}s, latence {args.latency}s par requête, médiane de {args.repeats} essais")
+    for label in ("/compare", "trailer vs épisode"):
+        sequential, parallel = timings[("séquentiel", label)], timings[("parallèle", label)]
+        print(f"  {label:<20}: {sequential:.2f}s -> {parallel:.2f}s ({100 * (1 - parallel / sequential):.0f}% de moins)")
+        if not results[("parallèle", label)].get("success"):
+            failures.append(f"{label} en échec")
+        if comparable(results[("parallèle", label)]) != comparable(results[("séquentiel", label)]):
+            failures.append(f"{label} : résultats différents")
+        if parallel >= sequential:
+            failures.append(f"{label} : aucun gain")
+    if failures:
+        print("ÉCHEC : " + " ; ".join(failures))
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Benchmark : cache disque des segments téléchargés, partagé entre processus
+
+Sert une vidéo synthétique en HTTP local, puis P processus (comme l'API et
+les workers d'un même hôte) demandent chacun, en parallèle, les mêmes
+segments (URL, début, durée) via DownloadCache :
+- chaque segment distinct n'est téléchargé qu'une fois (verrous fcntl) ;
+- octets économisés et temps comparés à un téléchargement par demande ;
+- avec un budget réduit, la taille du cache reste dans le budget (LRU) ;
+- budget réduit et processus concurrents (évictions permanentes, fichiers
+  .lock supprimés puis recréés) : un segment n'est jamais évincé pendant
+  sa lecture ;
+- le nettoyage supprime les fichiers orphelins anciens, pas les récents.
+
+Nécessite ffmpeg (téléchargement de segment par yt-dlp).
+
+Usage :
+    python benchmarks/bench_download_cache.py [--processes 3] [--segments 4] [--repeats 3]
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import analyzer as analyzer_module
+from analyzer import YouTubeDownloader, snippet_filename
+from download_cache import DownloadCache
+from bench_segment_seek import generate_video
+from bench_ytdlp_engine import serve_directory
+
+# Extracteur générique : aucun format "<= 480p" annoncé pour un fichier brut
+analyzer_module.DOWNLOAD_FORMAT = "best"
+
+SEGMENT_SECONDS = 10
+
+
+def download(url: str, directory: str, start: int) -> str:
+    return YouTubeDownloader.download_snippet_to(
+        url, os.path.join(directory, snippet_filename(url, SEGMENT_SECONDS, start)), SEGMENT_SECONDS, start)
+
+
+def request_segments(cache_dir: str, max_mb: int, url: str, segments: int, repeats: int, results):
+    """Un processus : chaque segment demandé `repeats` fois"""
+    cache = DownloadCache(cache_dir, max_mb=max_mb)
+    lost = 0
+    for _ in range(repeats):
+        for index in range(segments):
+            start = index * SEGMENT_SECONDS
+            lease = cache.acquire(url, start, SEGMENT_SECONDS, lambda directory, start=start: download(url, directory, start))
+            if lease is None:
+                raise RuntimeError("téléchargement échoué")
+            with lease:
+                time.sleep(0.01)  # lecture par l'analyse
+                lost += not os.path.exists(lease.path)
+    stats = cache.stats()
+    results.put((stats["misses"], stats["hits"], cache.bytes_saved, cache.bytes_downloaded, lost))
+
+
+def run_processes(cache_dir: str, max_mb: int, url: str, processes: int, segments: int, repeats: int):
+    # spawn : processus indépendants (comme l'API et les workers), sans
+    # hériter des verrous des threads du processus parent
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    workers = [context.Process(target=request_segments,
+                                       args=(cache_dir, max_mb, url, segments, repeats, results))
+               for _ in range(processes)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    totals = [results.get() for _ in workers]
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+    return elapsed, [sum(column) for column in zip(*totals)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, default=3, help="Processus concurrents")
+    parser.add_argument("--segments", type=int, default=4, help="Segments distincts de 10s")
+    parser.add_argument("--repeats", type=int, default=3, help="Demandes de chaque segment par processus")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="bench_download_cache_")
+    failures = []
+    try:
+        generate_video(os.path.join(work_dir, "raw.mp4"), args.segments * SEGMENT_SECONDS)
+        # moov en tête : ffmpeg peut lire un segment en HTTP sans tout télécharger
+        subprocess.run(["ffmpeg", "-y", "-loglevel", "error", "-i", os.path.join(work_dir, "raw.mp4"),
+                        "-c", "copy", "-movflags", "+faststart", os.path.join(work_dir, "synthetic.mp4")],
+                       check=True)
+        server = serve_directory(work_dir)
+        url = f"http://127.0.0.1:{server.server_address[1]}/synthetic.mp4"
+
+        # Référence : un téléchargement par demande
+        started = time.perf_counter()
+        reference_dir = os.path.join(work_dir, "reference")
+        path = download(url, reference_dir, 0)
+        segment_bytes = os.path.getsize(path)
+        one_download = time.perf_counter() - started
+        requests = args.processes * args.segments * args.repeats
+
+        cache_dir = os.path.join(work_dir, "segments")
+        elapsed, (misses, hits, saved, downloaded, lost) = run_processes(
+            cache_dir, 1024, url, args.processes, args.segments, args.repeats)
+        if misses != args.segments:
+            failures.append(f"{misses} téléchargements pour {args.segments} segments distincts")
+
+        # Budget d'un segment et demi, processus concurrents : évictions sous contention
+        churn_mb = 1.5 * segment_bytes / (1024 * 1024)
+        _, (churn_misses, _, _, _, churn_lost) = run_processes(
+            os.path.join(work_dir, "churn"), churn_mb, url, args.processes, args.segments, args.repeats)
+        if lost or churn_lost:
+            failures.append(f"{lost + churn_lost} segment(s) évincé(s) pendant leur lecture")
+
+        # Budget réduit à deux segments : éviction LRU, jamais d'un segment en lecture
+        budget_mb = 2.5 * segment_bytes / (1024 * 1024)
+        small = DownloadCache(os.path.join(work_dir, "small"), max_mb=budget_mb)
+
+        def fetch(start):
+            return small.acquire(url, start, SEGMENT_SECONDS, lambda directory: download(url, directory, start))
+
+        held = fetch(0)
+        for index in range(1, args.segments):
+            fetch(index * SEGMENT_SECONDS).release()
+        held_kept = os.path.exists(held.path)
+        held.release()
+        small_used = small.used_bytes()
+        if not held_kept:
+            failures.append("segment en lecture évincé")
+        if small_used > small.max_bytes or not small.evictions:
+            failures.append(f"cache réduit à {small_used} octets pour un budget de {small.max_bytes} "
+                            f"({small.evictions} évictions)")
+
+        # Orphelins : ancien fichier partiel supprimé, fichier récent conservé
+        sweep_dir = os.path.join(work_dir, "api-temp")
+        os.makedirs(sweep_dir)
+        stale = os.path.join(sweep_dir, "video_dead.mp4.part")
+        fresh = os.path.join(sweep_dir, "video_live.mp4")
+        for orphan in (stale, fresh):
+            with open(orphan, "wb") as handle:
+                handle.write(b"\0" * 1024)
+        old = time.time() - 7200
+        os.utime(stale, (old, old))
+        DownloadCache(cache_dir, orphan_age=3600, sweep_dirs=[sweep_dir])
+        if os.path.exists(stale) or not os.path.exists(fresh):
+            failures.append("nettoyage des orphelins incorrect")
+        server.shutdown()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print("=" * 60)
+    print(f"{args.processes} processus x {args.segments} segments x {args.repeats} demandes = {requests} demandes")
+    print(f"  sans cache (estimé) : {requests} téléchargements, {requests * segment_bytes / 1e6:.1f} Mo, "
+          f"~{requests * one_download:.1f}s")
+    print(f"  avec cache          : {misses} téléchargements, {downloaded / 1e6:.1f} Mo, {elapsed:.1f}s ; "
+          f"{hits} hits, {saved / 1e6:.1f} Mo économisés")
+    print(f"  budget {small.max_bytes / 1e6:.2f} Mo   : {small_used / 1e6:.2f} Mo occupés après {args.segments} segments, "
+          f"{small.evictions} évictions, segment en lecture {'conservé' if held_kept else 'évincé'}")
+    print(f"  budget 1,5 segment  : {churn_misses} téléchargements pour {requests} demandes concurrentes, "
+          f"{churn_lost} segment(s) évincé(s) pendant leur lecture")
+    if failures:
+        print("ÉCHEC : " + " ; ".join(failures))
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""
+Benchmark : téléchargements concurrents de segments dans un même dossier
+
+Sert une vidéo synthétique en HTTP local, puis T threads (comme des
+requêtes API simultanées sur le même TEMP_DIR) demandent en même temps des
+segments identiques et qui se chevauchent (même URL, débuts et durées
+différents) :
+- ancien nommage (video_<hash de l'URL>.mp4, un téléchargement par appel,
+  suppression directe) : fichiers écrasés ou supprimés sous un autre appel ;
+- download_video_snippet : un téléchargement par segment distinct, fichier
+  partagé par les appels concurrents et supprimé au dernier release_snippet.
+
+Chaque appel vérifie que son fichier existe et a la durée de son segment
+pendant toute son "analyse", puis le dossier doit être vide.
+Nécessite ffmpeg (téléchargement de segment par yt-dlp).
+
+Usage :
+    python benchmarks/bench_download_singleflight.py [--threads 24] [--rounds 3]
+"""
+
+import os
+import sys
+import time
+import random
+import shutil
+import hashlib
+import argparse
+import tempfile
+import threading
+import subprocess
+from collections import Counter
+
+import cv2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import analyzer as analyzer_module
+from analyzer import YouTubeDownloader
+from bench_segment_seek import generate_video
+from bench_ytdlp_engine import serve_directory
+
+# Extracteur générique : aucun format "<= 480p" annoncé pour un fichier brut
+analyzer_module.DOWNLOAD_FORMAT = "best"
+
+# (début, durée) : segments identiques, chevauchants et de durées différentes
+SEGMENTS = [(0, 10), (0, 10), (5, 10), (0, 20), (10, 10), (5, 10)]
+
+downloads = Counter()
+downloads_lock = threading.Lock()
+_download_snippet_to = YouTubeDownloader.download_snippet_to
+
+
+def counted_download(video_url, output_path, max_duration=120, start_time=None, cancel=None):
+    with downloads_lock:
+        downloads[output_path] += 1
+    return _download_snippet_to(video_url, output_path, max_duration, start_time, cancel)
+
+
+YouTubeDownloader.download_snippet_to = staticmethod(counted_download)
+
+
+def segment_seconds(path: str) -> float:
+    capture = cv2.VideoCapture(path)
+    try:
+        frames = capture.get(cv2.CAP_PROP_FRAME_COUNT)
+        fps = capture.get(cv2.CAP_PROP_FPS)
+        return frames / fps if fps else 0.0
+    finally:
+        capture.release()
+
+
+def legacy_snippet(url: str, output_dir: str, duration: int, start: int) -> str:
+    """Comportement précédent : nom dérivé de l'URL seule, pas de partage"""
+    path = os.path.join(output_dir, f"video_{hashlib.md5(url.encode()).hexdigest()[:8]}.mp4")
+    return YouTubeDownloader.download_snippet_to(url, path, duration, start)
+
+
+def run_round(mode: str, url: str, output_dir: str, threads: int):
+    """Retourne (erreurs, chemins par segment)"""
+    barrier = threading.Barrier(threads)
+    # Fichiers gardés jusqu'à ce que tous les appels du tour aient fini de lire
+    analysed = threading.Barrier(threads)
+    errors = []
+    paths = {}
+    lock = threading.Lock()
+
+    def caller(index):
+        start, duration = SEGMENTS[index % len(SEGMENTS)]
+        barrier.wait()
+        time.sleep(random.uniform(0, 0.2))  # arrivées étalées pendant le téléchargement
+        path = None
+        try:
+            if mode == "legacy":
+                path = legacy_snippet(url, output_dir, duration, start)
+            else:
+                path = YouTubeDownloader.download_video_snippet(url, output_dir, duration, start)
+            with lock:
+                paths.setdefault((start, duration), set()).add(path)
+            # "Analyse" : le fichier doit rester intact jusqu'à la fin
+            for _ in range(3):
+                seconds = segment_seconds(path) if os.path.exists(path) else 0.0
+                if abs(seconds - duration) > 1.0:
+                    raise Exception(f"segment ({start}, {duration}) : {seconds:.1f}s lues")
+                time.sleep(random.uniform(0, 0.1))
+        except Exception as e:
+            with lock:
+                errors.append(str(e)[:80])
+        finally:
+            analysed.wait()
+            if path and mode == "legacy":
+                if os.path.exists(path):
+                    os.remove(path)
+            elif path:
+                YouTubeDownloader.release_snippet(path)
+
+    workers = [threading.Thread(target=caller, args=(index,)) for index in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return errors, paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=24, help="Appels simultanés par tour")
+    parser.add_argument("--rounds", type=int, default=3, help="Tours")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="bench_download_singleflight_")
+    random.seed(0)
+    results = {}
+    leftovers = {}
+    try:
+        generate_video(os.path.join(work_dir, "raw.mp4"), 30)
+        # moov en tête : ffmpeg peut lire un segment en HTTP sans tout télécharger
+        subprocess.run(["ffmpeg", "-y", "-loglevel", "error", "-i", os.path.join(work_dir, "raw.mp4"),
+                        "-c", "copy", "-movflags", "+faststart", os.path.join(work_dir, "synthetic.mp4")],
+                       check=True)
+        server = serve_directory(work_dir)
+        url = f"http://127.0.0.1:{server.server_address[1]}/synthetic.mp4"
+
+        for mode in ("legacy", "singleflight"):
+            output_dir = os.path.join(work_dir, mode)
+            os.makedirs(output_dir)
+            errors, distinct_paths, downloads_made = [], True, 0
+            started = time.perf_counter()
+            for _ in range(args.rounds):
+                downloads.clear()
+                round_errors, paths = run_round(mode, url, output_dir, args.threads)
+                errors += round_errors
+                downloads_made += sum(downloads.values())
+                if mode == "singleflight":
+                    # Un chemin par segment, tous différents
+                    distinct_paths &= all(len(found) == 1 for found in paths.values())
+                    distinct_paths &= len(set().union(*paths.values())) == len(paths)
+                    distinct_paths &= all(count == 1 for count in downloads.values())
+            results[mode] = (time.perf_counter() - started, errors, downloads_made, distinct_paths)
+            leftovers[mode] = os.listdir(output_dir)
+        server.shutdown()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    calls = args.threads * args.rounds
+    print("=" * 60)
+    print(f"{args.rounds} tours x {args.threads} appels simultanés sur {len(set(SEGMENTS))} segments distincts")
+    for mode, label in (("legacy", "ancien nommage"), ("singleflight", "single-flight")):
+        elapsed, errors, downloads_made, _ = results[mode]
+        print(f"  {label:<15}: {elapsed:.1f}s, {downloads_made} téléchargements pour {calls} appels, "
+              f"{len(errors)} erreurs, {len(leftovers[mode])} fichiers restants")
+        for error in sorted(set(errors))[:3]:
+            print(f"      {error}")
+
+    _, errors, downloads_made, distinct_paths = results["singleflight"]
+    failures = []
+    if errors:
+        failures.append(f"{len(errors)} appels en erreur")
+    if downloads_made != len(set(SEGMENTS)) * args.rounds or not distinct_paths:
+        failures.append("segments téléchargés plusieurs fois ou chemins partagés entre segments")
+    if leftovers["singleflight"] or analyzer_module._snippets:
+        failures.append("fichiers ou téléchargements non libérés")
+    if failures:
+        print("ÉCHEC : " + " ; ".join(failures))
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Benchmark de calibration des estimateurs de mouvement
+
+Mesure, pour chaque estimateur de motion_estimators.py, son coût par paire de
+frames et le facteur qui ramène sa mesure brute sur l'échelle 0-100 de la
+référence (Farneback pleine résolution). Les facteurs affichés sont ceux à
+reporter dans l'attribut `calibration` de chaque estimateur.
+
+Par défaut, des clips synthétiques (panoramique texturé + objets mobiles, à
+différentes vitesses) sont générés ; --videos permet de calibrer sur de
+vraies vidéos (recommandé avant de changer l'estimateur en production).
+
+Usage :
+    python benchmarks/bench_motion_calibration.py
+    python benchmarks/bench_motion_calibration.py --videos a.mp4 b.mp4
+"""
+
+import os
+import sys
+import time
+import argparse
+from typing import List, Tuple
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analysis_engine import MOTION_FRAME_STEP
+from motion_estimators import MOTION_ESTIMATORS, FarnebackEstimator
+
+
+def synthetic_pairs(speeds: List[float], pairs_per_speed: int = 6,
+                    width: int = 640, height: int = 360) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Paires de frames (niveaux de gris) séparées de MOTION_FRAME_STEP frames,
+    pour un panoramique à `speed` pixels par frame.
+    """
+    rng = np.random.default_rng(0)
+    pairs = []
+    for speed in speeds:
+        shift = int(round(speed * MOTION_FRAME_STEP))
+        for _ in range(pairs_per_speed):
+            texture = rng.integers(0, 255, (height // 8, (width + shift) // 8 + 1), dtype=np.uint8)
+            texture = cv2.resize(texture, ((width + shift) // 8 * 8 + 8, height), interpolation=cv2.INTER_CUBIC)
+            texture = cv2.GaussianBlur(texture, (5, 5), 0)
+            prev_gray = np.ascontiguousarray(texture[:, :width])
+            gray = np.ascontiguousarray(texture[:, shift:shift + width])
+            # Objet mobile indépendant du panoramique
+            y = int(rng.integers(40, height - 40))
+            x = int(rng.integers(40, width - 80))
+            cv2.circle(prev_gray, (x, y), 25, 255, -1)
+            cv2.circle(gray, (x + shift // 2 + 5, y), 25, 255, -1)
+            pairs.append((prev_gray, gray))
+    return pairs
+
+
+def video_pairs(paths: List[str], max_pairs: int = 200) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """Paires de frames échantillonnées comme dans l'analyse (1 sur MOTION_FRAME_STEP)"""
+    pairs = []
+    for path in paths:
+        cap = cv2.VideoCapture(path)
+        prev_gray = None
+        index = 0
+        while len(pairs) < max_pairs:
+            if index % MOTION_FRAME_STEP != 0:
+                if not cap.grab():
+                    break
+                index += 1
+                continue
+            ret, frame = cap.read()
+            if not ret:
+                break
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            if prev_gray is not None:
+                pairs.append((prev_gray, gray))
+            prev_gray = gray
+            index += 1
+        cap.release()
+    return pairs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--videos", nargs="*", help="Vidéos réelles pour la calibration")
+    parser.add_argument("--max-pairs", type=int, default=200, help="Paires max extraites des vidéos")
+    args = parser.parse_args()
+
+    if args.videos:
+        pairs = video_pairs(args.videos, args.max_pairs)
+    else:
+        pairs = synthetic_pairs([0.0, 0.1, 0.2, 0.3, 0.5, 0.7, 1.0, 1.5])
+    if not pairs:
+        print("Aucune paire de frames exploitable")
+        sys.exit(1)
+
+    reference = FarnebackEstimator()
+    ref_scores = np.array([
+        float(reference.measure(prev_gray, gray)) * reference.calibration for prev_gray, gray in pairs
+    ])
+
+    print(f"{len(pairs)} paires de frames, score de référence moyen: {ref_scores.mean():.2f}")
+    print("=" * 78)
+    print(f"{'Estimateur':<20}{'Tier':>5}{'ms/paire':>10}{'Facteur':>12}{'Actuel':>10}{'Erreur moy.':>13}{'Corr.':>8}")
+    for name, estimator_class in sorted(MOTION_ESTIMATORS.items(), key=lambda item: -item[1].cost_tier):
+        estimator = estimator_class()
+        started = time.perf_counter()
+        raw = np.array([float(estimator.measure(prev_gray, gray)) for prev_gray, gray in pairs])
+        elapsed_ms = (time.perf_counter() - started) * 1000 / len(pairs)
+
+        # Moindres carrés sans ordonnée à l'origine : ref ≈ facteur × brut
+        denominator = float(np.dot(raw, raw))
+        factor = float(np.dot(raw, ref_scores)) / denominator if denominator > 0 else 0.0
+        calibrated = np.minimum(100, raw * factor)
+        error = float(np.mean(np.abs(calibrated - np.minimum(100, ref_scores))))
+        correlation = float(np.corrcoef(raw, ref_scores)[0, 1]) if raw.std() > 0 and ref_scores.std() > 0 else 0.0
+
+        print(f"{name:<20}{estimator.cost_tier:>5}{elapsed_ms:>10.2f}{factor:>12.3f}"
+              f"{estimator.calibration:>10.3f}{error:>13.2f}{correlation:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
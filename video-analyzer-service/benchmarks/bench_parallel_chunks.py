@@ -0,0 +1,75 @@
+"""
+Benchmark : analyse parallèle par tranches vs analyse en série
+
+Génère une vidéo synthétique, l'analyse en série puis avec N processus, et
+vérifie que num_scenes, l'ASL, les flashs et le mouvement sont identiques.
+Affiche le gain de temps (qui dépend du nombre de cœurs disponibles).
+
+Usage :
+    python benchmarks/bench_parallel_chunks.py [--minutes 5] [--workers 4] [--frame-source cv2]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analyzer import VideoAnalyzer
+from bench_segment_seek import generate_video
+
+
+COMPARED_KEYS = ("num_scenes", "average_shot_length", "flash_analysis", "motion_analysis")
+
+
+def timed_analysis(analyzer: VideoAnalyzer, path: str, workers: int, **kwargs):
+    started = time.perf_counter()
+    result = analyzer.analyze_video(path, analyze_motion=True, analyze_flashes=True, workers=workers, **kwargs)
+    elapsed = time.perf_counter() - started
+    if not result.get("success"):
+        raise RuntimeError(result.get("error"))
+    return result, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--minutes", type=int, default=5, help="Durée de la vidéo synthétique")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="Processus de l'analyse parallèle")
+    parser.add_argument("--frame-source", default=None, help="Source de frames (cv2, ffmpeg-gray)")
+    args = parser.parse_args()
+
+    analyzer = VideoAnalyzer(frame_source=args.frame_source)
+    # Tranches courtes : plus de frontières à vérifier
+    analyzer.parallel_engine.min_chunk_seconds = 5
+
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "synthetic.mp4")
+        print(f"Génération d'une vidéo de {args.minutes} min...")
+        generate_video(path, args.minutes * 60)
+
+        for label, segment in [("vidéo entière", {}), ("segment", {"start_time": 12.5, "end_time": 12.5 + args.minutes * 30})]:
+            serial, serial_time = timed_analysis(analyzer, path, 1, **segment)
+            parallel, parallel_time = timed_analysis(analyzer, path, args.workers, **segment)
+            chunks = parallel["engine_stats"].get("chunks", 1)
+            mismatched = [key for key in COMPARED_KEYS if serial[key] != parallel[key]]
+
+            print("=" * 60)
+            print(f"{label} : {serial['num_scenes']} scènes, ASL {serial['average_shot_length']}s")
+            print(f"  série     : {serial_time:.2f}s")
+            print(f"  parallèle : {parallel_time:.2f}s ({chunks} tranches, x{serial_time / parallel_time:.2f})")
+            if mismatched:
+                failures += 1
+                for key in mismatched:
+                    print(f"  DIFFÉRENCE {key} : {serial[key]} != {parallel[key]}")
+
+    if failures:
+        print("ÉCHEC : l'analyse parallèle ne reproduit pas l'analyse en série")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
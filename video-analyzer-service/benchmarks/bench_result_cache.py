@@ -0,0 +1,117 @@
+"""
+Benchmark : cache des résultats d'analyse (API /analyze répétée)
+
+Sert une vidéo synthétique en HTTP local, puis appelle plusieurs fois
+POST /analyze (client de test Flask) avec la même URL :
+- premier appel : téléchargement + analyse, résultat mis en cache ;
+- appels suivants (y compris URL avec paramètres de suivi utm_*) : servis
+  depuis le cache, sans téléchargement ;
+- options différentes (analyze_motion) : nouvelle analyse ;
+- autre processus (nouvelle instance sur le même fichier, comme le worker) :
+  résultat retrouvé.
+
+Vérifie que le résultat servi est identique au résultat calculé.
+Nécessite ffmpeg (téléchargement de segment par yt-dlp).
+
+Usage :
+    python benchmarks/bench_result_cache.py [--seconds 60] [--repeats 5]
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Avant tout import de result_cache (configuration lue à l'import)
+WORK_DIR = tempfile.mkdtemp(prefix="bench_result_cache_")
+os.environ["RESULT_CACHE_PATH"] = os.path.join(WORK_DIR, "result_cache.sqlite")
+os.environ["TEMP_DIR"] = os.path.join(WORK_DIR, "videos")
+
+from bench_segment_seek import generate_video
+from bench_ytdlp_engine import serve_directory
+
+
+def timed_post(client, payload):
+    started = time.perf_counter()
+    response = client.post("/analyze", json=payload)
+    return time.perf_counter() - started, response.get_json()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=int, default=60, help="Durée de la vidéo synthétique")
+    parser.add_argument("--repeats", type=int, default=5, help="Appels répétés après le premier")
+    args = parser.parse_args()
+
+    tmp = WORK_DIR
+    try:
+        generate_video(os.path.join(tmp, "raw.mp4"), args.seconds)
+        # moov en tête : ffmpeg peut lire le segment en HTTP sans tout télécharger
+        subprocess.run(["ffmpeg", "-y", "-loglevel", "error", "-i", os.path.join(tmp, "raw.mp4"),
+                        "-c", "copy", "-movflags", "+faststart", os.path.join(tmp, "synthetic.mp4")], check=True)
+        server = serve_directory(tmp)
+        url = f"http://127.0.0.1:{server.server_address[1]}/synthetic.mp4"
+
+        import analyzer as analyzer_module
+        # Extracteur générique : aucun format "<= 480p" annoncé pour un fichier brut
+        analyzer_module.DOWNLOAD_FORMAT = "best"
+        import api
+        # Pas de Supabase en benchmark : save_analysis_result journalise l'erreur et renvoie False
+        from result_cache import ResultCache, analysis_key
+        client = api.app.test_client()
+        payload = {"video_url": url, "max_duration": args.seconds, "analyze_motion": False}
+
+        first_time, first = timed_post(client, payload)
+        repeat_times = []
+        repeats = []
+        for index in range(args.repeats):
+            repeat_url = url if index % 2 == 0 else f"{url}?utm_source=bench"
+            elapsed, result = timed_post(client, dict(payload, video_url=repeat_url))
+            repeat_times.append(elapsed)
+            repeats.append(result)
+        motion_time, motion = timed_post(client, dict(payload, analyze_motion=True))
+
+        # Autre processus (le worker) : même fichier, nouvelle instance
+        other = ResultCache(os.environ["RESULT_CACHE_PATH"])
+        key = analysis_key(url, None, args.seconds, api.analyzer.analysis_signature(),
+                           analyze_motion=False, analyze_flashes=True)
+        shared = other.get(key)
+        stats = api.result_cache.stats()
+        server.shutdown()
+    finally:
+        shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+    print("=" * 60)
+    print(f"Vidéo synthétique de {args.seconds}s, {args.repeats} appels répétés")
+    print(f"  premier appel      : {first_time:.2f}s (cached={first.get('cached', False)})")
+    print(f"  appels répétés     : moyenne {sum(repeat_times) / len(repeat_times) * 1000:.1f}ms "
+          f"(x{first_time / (sum(repeat_times) / len(repeat_times)):.0f})")
+    print(f"  autres options     : {motion_time:.2f}s (cached={motion.get('cached', False)})")
+    print(f"  autre processus    : {'trouvé' if shared else 'absent'}")
+    print(f"  compteurs API      : {stats}")
+
+    def comparable(result):
+        return {field: value for field, value in (result or {}).items() if field != "cached"}
+
+    failures = []
+    if not first.get("success") or first.get("cached"):
+        failures.append(f"premier appel : {first.get('error', 'servi depuis le cache')}")
+    if any(not result.get("cached") or comparable(result) != comparable(first) for result in repeats):
+        failures.append("appel répété non servi ou différent du résultat calculé")
+    if motion.get("cached"):
+        failures.append("options différentes servies depuis le cache")
+    if comparable(shared) != comparable(first):
+        failures.append("résultat absent ou différent pour un autre processus")
+    if failures:
+        print("ÉCHEC : " + " ; ".join(failures))
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
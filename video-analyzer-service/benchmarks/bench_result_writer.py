@@ -0,0 +1,138 @@
+"""
+Benchmark : écriture des résultats, appel par tâche vs écriture groupée
+
+Lance un remplaçant local de PostgREST (SQLite) avec N tâches en
+'processing', puis K threads "d'analyse" terminent ces tâches (80 % de
+scores, 20 % d'échecs) :
+- appels directs (upsert du score puis mark_task_completed / mark_task_failed) ;
+- ResultWriter (upserts et PATCH groupés, voir result_writer.py) ;
+- ResultWriter avec une part des upserts de scores en échec (503).
+
+Un thread vérifie en continu qu'aucune tâche 'completed' n'existe sans
+son score, puis le bilan final : chaque tâche terminée, échouée ou
+remise en pending, jamais terminée sans score.
+
+Usage :
+    python benchmarks/bench_result_writer.py [--tasks 300] [--threads 8] [--failure-rate 0.3]
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from postgrest_sqlite import TaskStore, serve
+
+store = TaskStore()
+server = serve(store)
+os.environ["SUPABASE_URL"] = f"http://127.0.0.1:{server.server_address[1]}"
+os.environ["SUPABASE_KEY"] = "bench"
+# Les échecs injectés doivent atteindre ResultWriter (pas de nouvelle tentative HTTP)
+os.environ["SUPABASE_MAX_RETRIES"] = "0"
+
+from supabase_manager import SupabaseManager
+from result_writer import ResultWriter
+
+ORPHANS_SQL = ("SELECT COUNT(*) AS n FROM analysis_tasks WHERE status = 'completed'"
+               " AND tmdb_id NOT IN (SELECT tmdb_id FROM mollo_scores)")
+
+
+def score_row(manager: SupabaseManager, tmdb_id: str):
+    return manager.mollo_score_row(tmdb_id=tmdb_id, real_score=random.uniform(0, 100), asl=random.uniform(1, 8),
+                                   video_url=f"https://example.com/{tmdb_id}", scene_details=[],
+                                   source="Dailymotion", video_type="episode", cuts_per_minute=12.0,
+                                   video_duration=120.0, motion_intensity=0.5)
+
+
+def run_mode(mode: str, tasks: int, threads: int, failure_rate: float):
+    store.execute("DELETE FROM analysis_tasks")
+    store.execute("DELETE FROM mollo_scores")
+    store.add_tasks(tasks, status="processing")
+    rows = store.execute("SELECT id, tmdb_id FROM analysis_tasks")
+    random.seed(0)
+    outcomes = {row["id"]: random.random() < 0.8 for row in rows}
+    store.score_failure_rate = failure_rate
+    manager = SupabaseManager()
+    writer = ResultWriter(manager) if mode != "direct" else None
+    work = list(rows)
+    work_lock = threading.Lock()
+    orphans_seen = []
+    checking = threading.Event()
+
+    def analysis_thread():
+        while True:
+            with work_lock:
+                if not work:
+                    return
+                row = work.pop()
+            time.sleep(random.uniform(0, 0.01))  # fin d'analyse étalée
+            if outcomes[row["id"]]:
+                data = score_row(manager, row["tmdb_id"])
+                if writer is not None:
+                    writer.complete(row["id"], data)
+                elif manager.save_mollo_scores([data]):
+                    manager.mark_task_completed(row["id"])
+            elif writer is not None:
+                writer.fail(row["id"], "Aucun candidat vidéo valide")
+            else:
+                manager.mark_task_failed(row["id"], "Aucun candidat vidéo valide")
+
+    def checker():
+        while not checking.is_set():
+            orphans_seen.append(store.execute(ORPHANS_SQL)[0]["n"])
+            time.sleep(0.005)
+
+    check_thread = threading.Thread(target=checker)
+    check_thread.start()
+    requests_before = store.http_requests
+    started = time.perf_counter()
+    workers = [threading.Thread(target=analysis_thread) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    if writer is not None:
+        writer.close()
+    elapsed = time.perf_counter() - started
+    http_requests = store.http_requests - requests_before
+    checking.set()
+    check_thread.join()
+    store.score_failure_rate = 0.0
+
+    statuses = {status: store.count(status) for status in ("completed", "failed", "pending", "processing")}
+    return elapsed, http_requests, max(orphans_seen + [store.execute(ORPHANS_SQL)[0]["n"]]), statuses
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=300, help="Tâches à terminer")
+    parser.add_argument("--threads", type=int, default=8, help="Threads d'analyse simulés")
+    parser.add_argument("--failure-rate", type=float, default=0.3, help="Part des upserts de scores en échec")
+    args = parser.parse_args()
+    results = []
+    for label, mode, failure_rate in [("appels directs", "direct", 0.0),
+                                      ("écriture groupée", "writer", 0.0),
+                                      (f"groupée, {args.failure_rate:.0%} d'échecs", "writer", args.failure_rate)]:
+        results.append((label,) + run_mode(mode, args.tasks, args.threads, failure_rate))
+
+    failures = 0
+    print("=" * 60)
+    print(f"{args.tasks} tâches, {args.threads} threads d'analyse")
+    for label, elapsed, http_requests, orphans, statuses in results:
+        print(f"  {label:<24}: {elapsed:.2f}s, {http_requests} requêtes HTTP, "
+              f"terminées sans score {orphans} ; statuts {statuses}")
+        if orphans or statuses["processing"]:
+            failures += 1
+    server.shutdown()
+    if failures:
+        print("ÉCHEC : tâche terminée sans score ou restée en processing")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark : coût d'analyse d'un segment tardif vs un segment précoce
+
+Génère une vidéo synthétique (cuts, flashs, mouvement), puis analyse deux
+segments de même longueur, l'un au début, l'autre à la fin. Avec le seek par
+keyframe, les deux doivent coûter à peu près le même temps.
+
+Usage :
+    python benchmarks/bench_segment_seek.py [--minutes 10] [--segment 30] [--max-ratio 1.5]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analyzer import VideoAnalyzer
+
+
+def generate_video(path: str, seconds: int, fps: int = 25, width: int = 320, height: int = 180):
+    """Vidéo synthétique : plans de couleur unie avec un disque en mouvement"""
+    rng = np.random.default_rng(0)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+    scene_left = 0
+    color = (0, 0, 0)
+    x = 0
+    for index in range(seconds * fps):
+        if scene_left <= 0:
+            scene_left = int(rng.integers(fps, 4 * fps))
+            color = tuple(int(c) for c in rng.integers(0, 255, 3))
+            x = 0
+        frame = np.full((height, width, 3), color, np.uint8)
+        cv2.circle(frame, (x % width, height // 2), 20, (255 - color[0], 255 - color[1], 255 - color[2]), -1)
+        if index % 250 == 0:
+            frame[:] = 255
+        writer.write(frame)
+        x += 5
+        scene_left -= 1
+    writer.release()
+
+
+def time_segment(analyzer: VideoAnalyzer, path: str, start: float, duration: float):
+    started = time.perf_counter()
+    result = analyzer.analyze_video(path, analyze_motion=True, analyze_flashes=True,
+                                    start_time=start, end_time=start + duration)
+    elapsed = time.perf_counter() - started
+    if not result.get("success"):
+        raise RuntimeError(result.get("error"))
+    return elapsed, result["engine_stats"].get("frames_decoded", 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--minutes", type=int, default=10, help="Durée de la vidéo synthétique")
+    parser.add_argument("--segment", type=float, default=30.0, help="Durée des segments analysés (s)")
+    parser.add_argument("--max-ratio", type=float, default=1.5, help="Ratio tardif/précoce toléré")
+    parser.add_argument("--frame-source", default=None, help="Source de frames (cv2, ffmpeg-gray)")
+    args = parser.parse_args()
+
+    analyzer = VideoAnalyzer(frame_source=args.frame_source)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "synthetic.mp4")
+        print(f"Génération d'une vidéo de {args.minutes} min...")
+        generate_video(path, args.minutes * 60)
+
+        early_start = 5.0
+        late_start = args.minutes * 60 - args.segment - 5.0
+        early, early_frames = time_segment(analyzer, path, early_start, args.segment)
+        late, late_frames = time_segment(analyzer, path, late_start, args.segment)
+
+    ratio = late / early if early > 0 else float("inf")
+    print("=" * 60)
+    print(f"Segment précoce ({early_start:.0f}s) : {early:.2f}s, {early_frames} frames décodées")
+    print(f"Segment tardif  ({late_start:.0f}s) : {late:.2f}s, {late_frames} frames décodées")
+    print(f"Ratio tardif/précoce : {ratio:.2f} (max {args.max_ratio})")
+    if ratio > args.max_ratio:
+        print("ÉCHEC : le segment tardif coûte beaucoup plus cher que le segment précoce")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
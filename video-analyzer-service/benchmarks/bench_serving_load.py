@@ -0,0 +1,258 @@
+"""
+Benchmark : charge HTTP sur l'API, serveur de développement vs serve.py
+
+Génère une vidéo synthétique et place son segment dans le cache des
+téléchargements (DOWNLOAD_CACHE_DIR) : chaque POST /analyze-from-trailer
+est alors une analyse CPU sans téléchargement (cache des résultats
+désactivé, pas d'écriture Supabase). Pour
+chaque mode :
+- `python api.py` (Flask, debug, un processus) ;
+- `python serve.py` (SERVER_WORKERS processus Waitress) ;
+lance le serveur, attend /health, puis envoie --requests analyses
+depuis --clients clients simultanés, pendant qu'un client sonde /health.
+Rapporte requêtes/s et latences p50/p95, vérifie des résultats identiques
+entre les modes. Avec serve.py, suit aussi une tâche "async": true sur
+GET /jobs/<id> (une connexion par requête, donc des processus différents :
+jamais de 404), puis envoie SIGTERM pendant une analyse : elle doit se
+terminer (200) et le serveur s'arrêter proprement.
+
+Sur une machine à un seul cœur, plusieurs processus n'apportent rien aux
+analyses (CPU) : le gain attendu croît avec le nombre de cœurs.
+
+Nécessite ffmpeg (segment téléchargé par yt-dlp).
+
+Usage :
+    python benchmarks/bench_serving_load.py [--clients 8] [--requests 48] [--workers 4] [--seconds 20]
+"""
+
+import os
+import sys
+import time
+import shutil
+import signal
+import argparse
+import tempfile
+import threading
+import subprocess
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVICE_DIR)
+
+# Avant l'import de l'analyseur (configuration lue à l'import)
+WORK_DIR = tempfile.mkdtemp(prefix="bench_serving_load_")
+os.environ.update({
+    "RESULT_CACHE_PATH": "",
+    "DOWNLOAD_CACHE_DIR": os.path.join(WORK_DIR, "segments"),
+    "JOB_STORE_PATH": os.path.join(WORK_DIR, "jobs.sqlite"),
+    "TEMP_DIR": os.path.join(WORK_DIR, "videos"),
+    # Pas de Supabase en benchmark (load_dotenv ne remplace pas ces valeurs)
+    "SUPABASE_URL": "",
+    "SUPABASE_KEY": "",
+    "SUPABASE_SERVICE_ROLE_KEY": "",
+    "SUPABASE_ANON_KEY": ""
+})
+
+from bench_segment_seek import generate_video
+from bench_ytdlp_engine import serve_directory
+
+# Analyse sans écriture Supabase ; segment de la bande-annonce (secondes) fixé par la route
+ENDPOINT = "/analyze-from-trailer"
+TRAILER_DURATION = 120
+
+
+def percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def start_server(script: str, port: int, env: dict, log_path: str) -> subprocess.Popen:
+    log = open(log_path, "w")
+    process = subprocess.Popen([sys.executable, "-u", script], cwd=SERVICE_DIR, stdout=log, stderr=subprocess.STDOUT,
+                               env=dict(os.environ, FLASK_PORT=str(port), FLASK_HOST="127.0.0.1", **env))
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(f"http://127.0.0.1:{port}/health", timeout=1).status_code == 200:
+                return process
+        except requests.RequestException:
+            pass
+        if process.poll() is not None:
+            break
+        time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"{script} n'a pas démarré (voir {log_path})")
+
+
+def load(port: int, payload: dict, clients: int, total: int):
+    """(requêtes/s, latences des analyses, latences /health, codes HTTP, résultat)"""
+    base = f"http://127.0.0.1:{port}"
+    analyze_latencies, health_latencies, statuses, results = [], [], [], []
+    done = threading.Event()
+
+    def analyze(_):
+        started = time.perf_counter()
+        try:
+            response = requests.post(f"{base}{ENDPOINT}", json=payload, timeout=600)
+            statuses.append(response.status_code)
+            results.append(response.json())
+        except (requests.RequestException, ValueError) as e:
+            statuses.append(type(e).__name__)
+        analyze_latencies.append(time.perf_counter() - started)
+
+    def probe():
+        while not done.is_set():
+            started = time.perf_counter()
+            try:
+                requests.get(f"{base}/health", timeout=60)
+            except requests.RequestException:
+                pass
+            health_latencies.append(time.perf_counter() - started)
+            time.sleep(0.1)
+
+    prober = threading.Thread(target=probe, daemon=True)
+    prober.start()
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=clients) as executor:
+            list(executor.map(analyze, range(total)))
+    finally:
+        done.set()
+    elapsed = time.perf_counter() - started
+    prober.join()
+    return total / elapsed, analyze_latencies, health_latencies, statuses, results[0] if results else {}
+
+
+def follow_job(port: int, payload: dict):
+    """Tâche asynchrone suivie jusqu'à la fin : (statut final, codes HTTP des GET /jobs/<id>)"""
+    base = f"http://127.0.0.1:{port}"
+    status_url = requests.post(f"{base}{ENDPOINT}", json=dict(payload, **{"async": True}),
+                               timeout=60).json()["status_url"]
+    codes = []
+    deadline = time.monotonic() + 600
+    while time.monotonic() < deadline:
+        # Nouvelle connexion à chaque fois : le noyau répartit entre les processus
+        response = requests.get(f"{base}{status_url}", headers={"Connection": "close"}, timeout=60)
+        codes.append(response.status_code)
+        if response.status_code == 200 and response.json()["status"] in ("completed", "failed"):
+            return response.json()["status"], codes
+        time.sleep(0.1)
+    return "timeout", codes
+
+
+def graceful_stop(process: subprocess.Popen, port: int, payload: dict):
+    """SIGTERM pendant une analyse : (code HTTP de l'analyse, durée de l'arrêt, code de sortie)"""
+    outcome = {}
+
+    def analyze():
+        try:
+            outcome["status"] = requests.post(f"http://127.0.0.1:{port}{ENDPOINT}", json=payload,
+                                              timeout=120).status_code
+        except requests.RequestException as e:
+            outcome["status"] = str(e)
+
+    thread = threading.Thread(target=analyze, daemon=True)
+    thread.start()
+    time.sleep(0.5)  # analyse en cours
+    started = time.perf_counter()
+    process.send_signal(signal.SIGTERM)
+    exit_code = process.wait(timeout=120)
+    thread.join()
+    return outcome.get("status"), time.perf_counter() - started, exit_code
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=8, help="Clients simultanés")
+    parser.add_argument("--requests", type=int, default=48, help="Analyses par mode")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="SERVER_WORKERS de serve.py")
+    parser.add_argument("--seconds", type=int, default=20, help="Durée de la vidéo synthétique")
+    parser.add_argument("--port", type=int, default=5097, help="Port des serveurs testés")
+    args = parser.parse_args()
+
+    failures = []
+    reports = {}
+    try:
+        generate_video(os.path.join(WORK_DIR, "raw.mp4"), args.seconds)
+        # moov en tête : ffmpeg peut lire le segment en HTTP sans tout télécharger
+        subprocess.run(["ffmpeg", "-y", "-loglevel", "error", "-i", os.path.join(WORK_DIR, "raw.mp4"),
+                        "-c", "copy", "-movflags", "+faststart", os.path.join(WORK_DIR, "synthetic.mp4")], check=True)
+        server = serve_directory(WORK_DIR)
+        url = f"http://127.0.0.1:{server.server_address[1]}/synthetic.mp4"
+        payload = {"trailer_url": url, "series_title": "Benchmark"}
+
+        import analyzer as analyzer_module
+        from download_cache import create_download_cache
+        # Extracteur générique : aucun format "<= 480p" annoncé pour un fichier brut
+        analyzer_module.DOWNLOAD_FORMAT = "best"
+        # Segment en cache, partagé par les processus des serveurs testés
+        segment = analyzer_module.VideoAnalyzer.download_segment(url, TRAILER_DURATION,
+                                                                 download_cache=create_download_cache())
+        segment.release()
+        server.shutdown()
+
+        # Toutes les requêtes attendent leur créneau d'analyse (pas de 503)
+        common = {"ANALYSIS_SLOT_TIMEOUT": "600", "MAX_CONCURRENT_ANALYSES": "2"}
+        modes = (("api.py (développement)", "api.py", {}),
+                 (f"serve.py ({args.workers} processus)", "serve.py",
+                  {"SERVER_WORKERS": str(args.workers), "SHUTDOWN_TIMEOUT": "60"}))
+        for label, script, env in modes:
+            process = start_server(script, args.port, dict(common, **env), os.path.join(WORK_DIR, f"{script}.log"))
+            try:
+                requests.post(f"http://127.0.0.1:{args.port}{ENDPOINT}", json=payload, timeout=600)  # préchauffage
+                reports[label] = load(args.port, payload, args.clients, args.requests)
+                if script == "serve.py":
+                    reports["tâche"] = follow_job(args.port, payload)
+                    reports["arrêt"] = graceful_stop(process, args.port, payload)
+            finally:
+                if process.poll() is None:
+                    # SIGTERM d'abord : tuer serve.py laisserait ses processus orphelins
+                    process.terminate()
+                    try:
+                        process.wait(timeout=90)
+                    except subprocess.TimeoutExpired:
+                        process.kill()
+                        process.wait()
+    finally:
+        shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+    def comparable(result):
+        return {field: value for field, value in result.items() if field not in ("cached", "engine_stats")}
+
+    print("=" * 60)
+    print(f"{args.requests} POST {ENDPOINT} (vidéo de {args.seconds}s, segment en cache), {args.clients} clients, "
+          f"{os.cpu_count()} CPU")
+    for label, (throughput, analyze_latencies, health_latencies, statuses, _) in (
+            (label, reports[label]) for label, _, _ in modes):
+        print(f"  {label:<26}: {throughput:.2f} req/s ; analyse p50 {statistics.median(analyze_latencies):.2f}s "
+              f"p95 {percentile(analyze_latencies, 0.95):.2f}s ; /health p95 "
+              f"{percentile(health_latencies, 0.95) * 1000:.0f}ms")
+        if set(statuses) != {200}:
+            failures.append(f"{label} : codes HTTP {sorted(set(map(str, statuses)))}")
+    (dev_label, _, _), (prod_label, _, _) = modes
+    dev, prod = reports[dev_label], reports[prod_label]
+    print(f"  débit x{prod[0] / dev[0]:.2f}, p95 des analyses x{percentile(prod[1], 0.95) / percentile(dev[1], 0.95):.2f}")
+    job_status, job_codes = reports["tâche"]
+    print(f"  tâche asynchrone : {job_status}, {len(job_codes)} GET /jobs/<id>, codes {sorted(set(job_codes))}")
+    status, stop_time, exit_code = reports["arrêt"]
+    print(f"  SIGTERM pendant une analyse : réponse {status}, arrêt en {stop_time:.1f}s, code de sortie {exit_code}")
+
+    if comparable(prod[4]) != comparable(dev[4]):
+        failures.append("résultats différents entre les modes")
+    if job_status != "completed" or set(job_codes) != {200}:
+        failures.append("tâche asynchrone non suivie entre les processus")
+    if status != 200 or exit_code != 0:
+        failures.append("arrêt non gracieux")
+    if args.workers > 1 and (os.cpu_count() or 1) > 1 and prod[0] <= dev[0]:
+        failures.append("aucun gain de débit")
+    if failures:
+        print("ÉCHEC : " + " ; ".join(failures))
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
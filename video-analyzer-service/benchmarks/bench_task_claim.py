@@ -0,0 +1,117 @@
+"""
+Benchmark : réservation concurrente des tâches analysis_tasks
+
+Lance un remplaçant local de PostgREST (SQLite), y crée N tâches pending,
+puis fait réserver toutes les tâches par K workers concurrents, avec :
+- l'ancienne méthode (GET de la plus ancienne tâche puis PATCH sur son id) ;
+- le PATCH conditionnel (status=eq.pending, return=representation), par lot ;
+- le RPC claim_analysis_tasks (FOR UPDATE SKIP LOCKED), par lot.
+
+Vérifie que chaque tâche est réservée exactement une fois (sauf ancienne
+méthode, dont les doublons sont comptés) et affiche le débit.
+
+Usage :
+    python benchmarks/bench_task_claim.py [--tasks 500] [--claimers 16] [--batch 4]
+"""
+
+import os
+import sys
+import time
+import argparse
+import threading
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from postgrest_sqlite import TaskStore, serve
+
+store = TaskStore()
+server = serve(store)
+os.environ["SUPABASE_URL"] = f"http://127.0.0.1:{server.server_address[1]}"
+os.environ["SUPABASE_KEY"] = "bench"
+
+import supabase_manager as supabase_module
+from supabase_manager import SupabaseManager
+
+
+def legacy_claim(manager: SupabaseManager, limit: int):
+    """Ancienne réservation : GET puis PATCH inconditionnel"""
+    params = {"status": "eq.pending", "order": "created_at.asc", "limit": "1", "select": "*"}
+    response = manager._request("GET", "analysis_tasks", params=params)
+    tasks = response.json() if response is not None else []
+    if not tasks:
+        return []
+    patch = manager._request("PATCH", "analysis_tasks", json={"status": "processing"},
+                             params={"id": f"eq.{tasks[0]['id']}"})
+    return tasks if patch is not None else []
+
+
+def run_claimers(mode: str, tasks: int, claimers: int, batch: int):
+    store.execute("DELETE FROM analysis_tasks")
+    store.add_tasks(tasks)
+    supabase_module.TASK_CLAIM_RPC = mode == "rpc"
+    claimed = []
+    claimed_lock = threading.Lock()
+    statements_before = store.statements
+
+    def claimer():
+        manager = SupabaseManager()
+        while True:
+            if mode == "legacy":
+                got = legacy_claim(manager, batch)
+            else:
+                got = manager.claim_pending_tasks(batch)
+            if not got:
+                if store.count("pending") == 0:
+                    return
+                continue
+            with claimed_lock:
+                claimed.extend(task["id"] for task in got)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=claimer) for _ in range(claimers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    counts = Counter(claimed)
+    duplicates = sum(count - 1 for count in counts.values() if count > 1)
+    missing = tasks - len(counts)
+    return elapsed, duplicates, missing, store.statements - statements_before
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=500, help="Tâches pending à réserver")
+    parser.add_argument("--claimers", type=int, default=16, help="Workers concurrents")
+    parser.add_argument("--batch", type=int, default=4, help="Tâches par réservation (lot)")
+    args = parser.parse_args()
+    # Les messages "Task ... claimed" de SupabaseManager masqueraient le rapport
+    sys.stdout = open(os.devnull, "w")
+    results = []
+    for label, mode, batch in [("ancienne (GET + PATCH)", "legacy", 1),
+                               ("PATCH conditionnel, lot 1", "patch", 1),
+                               (f"PATCH conditionnel, lot {args.batch}", "patch", args.batch),
+                               (f"RPC SKIP LOCKED, lot {args.batch}", "rpc", args.batch)]:
+        results.append((label, mode) + run_claimers(mode, args.tasks, args.claimers, batch))
+    sys.stdout = sys.__stdout__
+
+    failures = 0
+    print("=" * 60)
+    print(f"{args.tasks} tâches, {args.claimers} workers concurrents")
+    for label, mode, elapsed, duplicates, missing, statements in results:
+        print(f"  {label:<28}: {elapsed:.2f}s ({args.tasks / elapsed:.0f} tâches/s, {statements} requêtes SQL), "
+              f"doublons {duplicates}, manquantes {missing}")
+        if mode != "legacy" and (duplicates or missing):
+            failures += 1
+    server.shutdown()
+    if failures:
+        print("ÉCHEC : une tâche a été réservée deux fois ou jamais")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
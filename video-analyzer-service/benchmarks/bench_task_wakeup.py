@@ -0,0 +1,112 @@
+"""
+Benchmark : délai de prise en charge des tâches et polls à vide
+
+Lance un remplaçant local de PostgREST (SQLite) et une boucle de
+réservation identique à celle du worker (claim, puis attente si rien),
+avec trois modes d'attente :
+- poll fixe (ancien comportement, 5 s) ;
+- polling adaptatif (TaskWakeup sans notifier, POLL_MIN/POLL_IDLE_MAX_INTERVAL) ;
+- notification (TaskWakeup + LocalNotifier, équivalent du trigger NOTIFY).
+
+Phase 1 : des tâches arrivent une par une à intervalles aléatoires, on
+mesure le délai entre insertion et réservation (p50, p95, max).
+Phase 2 : aucune tâche pendant --idle secondes, on compte les requêtes
+HTTP envoyées à vide.
+
+Usage :
+    python benchmarks/bench_task_wakeup.py [--tasks 15] [--gap 0.2 3] [--idle 60]
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import threading
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from postgrest_sqlite import TaskStore, serve
+
+store = TaskStore()
+server = serve(store)
+os.environ["SUPABASE_URL"] = f"http://127.0.0.1:{server.server_address[1]}"
+os.environ["SUPABASE_KEY"] = "bench"
+
+from supabase_manager import SupabaseManager
+from task_wakeup import TaskWakeup, LocalNotifier, POLL_MIN_INTERVAL, POLL_IDLE_MAX_INTERVAL
+
+
+def run_mode(wakeup: TaskWakeup, notifier, tasks: int, gap, idle: float):
+    store.execute("DELETE FROM analysis_tasks")
+    store.on_pending = notifier.notify if notifier is not None else None
+    manager = SupabaseManager()
+    inserted = {}
+    latencies = []
+    stop = threading.Event()
+
+    def claimer():
+        # Même boucle que WorkerPipeline.run / main_loop
+        while not stop.is_set():
+            got = manager.claim_pending_tasks(4)
+            now = time.monotonic()
+            for task in got:
+                latencies.append(now - inserted[task["id"]])
+            if got:
+                wakeup.task_found()
+            else:
+                wakeup.wait()
+
+    thread = threading.Thread(target=claimer, daemon=True)
+    thread.start()
+    time.sleep(1)  # le claimer atteint son régime d'attente
+
+    for index in range(tasks):
+        time.sleep(random.uniform(*gap))
+        inserted[f"task-{index:06d}"] = time.monotonic()
+        store.add_tasks(1)
+    while len(latencies) < tasks:
+        time.sleep(0.05)
+
+    requests_before = store.http_requests
+    time.sleep(idle)
+    idle_requests = store.http_requests - requests_before
+
+    stop.set()
+    wakeup._event.set()
+    thread.join()
+    store.on_pending = None
+    latencies.sort()
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    return statistics.median(latencies), p95, latencies[-1], idle_requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=15, help="Tâches insérées une par une")
+    parser.add_argument("--gap", type=float, nargs=2, default=(0.2, 3.0), help="Intervalle entre insertions (s)")
+    parser.add_argument("--idle", type=float, default=60, help="Durée de la phase sans tâche (s)")
+    args = parser.parse_args()
+    random.seed(0)
+    # Les messages "Task ... claimed" de SupabaseManager masqueraient le rapport
+    sys.stdout = open(os.devnull, "w")
+    results = []
+    notifier = LocalNotifier()
+    for label, wakeup, mode_notifier in [
+            ("poll fixe 5s", TaskWakeup(None, 5, 5), None),
+            (f"adaptatif {POLL_MIN_INTERVAL}-{POLL_IDLE_MAX_INTERVAL:.0f}s", TaskWakeup(None), None),
+            ("notification", TaskWakeup(notifier), notifier)]:
+        results.append((label,) + run_mode(wakeup, mode_notifier, args.tasks, args.gap, args.idle))
+    sys.stdout = sys.__stdout__
+
+    print("=" * 60)
+    print(f"{args.tasks} tâches (écart {args.gap[0]}-{args.gap[1]}s), {args.idle:.0f}s sans tâche")
+    for label, p50, p95, worst, idle_requests in results:
+        print(f"  {label:<18}: prise en charge p50 {p50 * 1000:.0f}ms, p95 {p95 * 1000:.0f}ms, "
+              f"max {worst * 1000:.0f}ms ; {idle_requests} requêtes à vide")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Benchmark : probes yt-dlp en processus vs sous-processus `python -m yt_dlp`
+
+Sert une vidéo synthétique en HTTP local (ou utilise --url), puis mesure le
+débit de probes (métadonnées sans téléchargement) des deux chemins avec les
+mêmes options que get_video_info, et vérifie qu'ils extraient la même durée
+et le même titre.
+
+Usage :
+    python benchmarks/bench_ytdlp_engine.py [--probes 20] [--concurrency 4] [--url URL]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
+import subprocess
+import http.server
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analyzer import DOWNLOAD_USER_AGENT
+from ytdlp_engine import YtDlpEngine
+from bench_segment_seek import generate_video
+
+
+PROBE_OPTIONS = {
+    "quiet": True,
+    "no_warnings": True,
+    "ignoreerrors": True,
+    "nocheckcertificate": True,
+    "geo_bypass": True,
+    "http_headers": {"User-Agent": DOWNLOAD_USER_AGENT},
+}
+
+
+def probe_subprocess(url: str):
+    cmd = [
+        sys.executable, "-m", "yt_dlp", url,
+        "--dump-single-json", "--no-download", "--quiet", "--no-warnings", "--ignore-errors",
+        "--no-check-certificate", "--geo-bypass", "--user-agent", DOWNLOAD_USER_AGENT,
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
+    return json.loads(result.stdout) if result.returncode == 0 and result.stdout.strip() else None
+
+
+def run_probes(probe, url: str, probes: int, concurrency: int):
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        infos = list(executor.map(lambda _: probe(url), range(probes)))
+    return infos, time.perf_counter() - started
+
+
+class QuietHandler(http.server.SimpleHTTPRequestHandler):
+    def __init__(self, *args, latency: float = 0.0, **kwargs):
+        # Attente avant chaque réponse : serveur distant simulé
+        self.latency = latency
+        super().__init__(*args, **kwargs)
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        super().do_GET()
+
+    def do_HEAD(self):
+        time.sleep(self.latency)
+        super().do_HEAD()
+
+    def log_message(self, *args):
+        pass
+
+
+def serve_directory(directory: str, latency: float = 0.0) -> http.server.ThreadingHTTPServer:
+    handler = partial(QuietHandler, directory=directory, latency=latency)
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--probes", type=int, default=20, help="Probes par chemin")
+    parser.add_argument("--concurrency", type=int, default=4, help="Probes simultanés")
+    parser.add_argument("--url", default=None, help="URL à prober (défaut: vidéo synthétique locale)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        server = None
+        url = args.url
+        if url is None:
+            generate_video(os.path.join(tmp, "synthetic.mp4"), 10)
+            server = serve_directory(tmp)
+            url = f"http://127.0.0.1:{server.server_address[1]}/synthetic.mp4"
+
+        engine = YtDlpEngine(workers=args.concurrency, probe_workers=args.concurrency)
+        # Premier appel hors mesure : import et initialisation des extracteurs
+        engine.extract_info(url, PROBE_OPTIONS)
+
+        subprocess_infos, subprocess_time = run_probes(probe_subprocess, url, args.probes, args.concurrency)
+        engine_infos, engine_time = run_probes(partial(engine.extract_info, options=PROBE_OPTIONS),
+                                               url, args.probes, args.concurrency)
+        engine.close()
+        if server is not None:
+            server.shutdown()
+
+    print("=" * 60)
+    print(f"{args.probes} probes de {url} ({args.concurrency} simultanés)")
+    print(f"  sous-processus : {subprocess_time:.2f}s ({args.probes / subprocess_time:.1f} probes/s)")
+    print(f"  en processus   : {engine_time:.2f}s ({args.probes / engine_time:.1f} probes/s, "
+          f"x{subprocess_time / engine_time:.1f})")
+
+    def summary(info):
+        return None if info is None else (info.get("duration"), info.get("title"), len(info.get("formats") or []))
+
+    expected = summary(subprocess_infos[0])
+    mismatched = [summary(info) for info in subprocess_infos + engine_infos if summary(info) != expected]
+    if expected is None or mismatched:
+        print(f"ÉCHEC : métadonnées différentes ({expected} vs {mismatched[:2]})")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Remplaçant local de PostgREST adossé à SQLite (benchmarks uniquement)
+
+Implémente le sous-ensemble de l'API REST utilisé par SupabaseManager sur
+la table analysis_tasks :
+- GET    /rest/v1/analysis_tasks?status=eq.X&order=created_at.asc&limit=N&select=...
+- PATCH  /rest/v1/analysis_tasks?id=eq.X|id=in.(...)&status=eq.Y  (Prefer: return=representation)
+- POST   /rest/v1/rpc/claim_analysis_tasks {"batch_size": N}
+- POST   /rest/v1/mollo_scores?on_conflict=tmdb_id  (upsert, objet ou liste)
+
+Chaque requête SQL s'exécute sous un verrou unique : comme dans PostgreSQL,
+une instruction UPDATE conditionnelle est atomique, mais un GET suivi d'un
+PATCH ne l'est pas.
+
+`TaskStore.on_pending` joue le rôle du trigger NOTIFY
+(database/notify_analysis_tasks.sql) : appelé à chaque tâche ajoutée en attente.
+`TaskStore.score_failure_rate` fait échouer (503) une part des upserts de scores.
+"""
+
+import json
+import random
+import sqlite3
+import threading
+import http.server
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit, parse_qsl
+
+
+class TaskStore:
+    """Table analysis_tasks en mémoire"""
+
+    def __init__(self):
+        self.connection = sqlite3.connect(":memory:", check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute(
+            "CREATE TABLE analysis_tasks (id TEXT PRIMARY KEY, tmdb_id TEXT, media_type TEXT,"
+            " status TEXT, created_at TEXT, error_message TEXT, metadata TEXT)"
+        )
+        self.connection.execute("CREATE TABLE mollo_scores (tmdb_id TEXT PRIMARY KEY, data TEXT)")
+        self.lock = threading.Lock()
+        self.statements = 0
+        self.http_requests = 0
+        self.on_pending: Optional[Callable[[], None]] = None
+        self.score_failure_rate = 0.0
+
+    def add_tasks(self, count: int, status: str = "pending"):
+        with self.lock:
+            start = self.connection.execute("SELECT COUNT(*) FROM analysis_tasks").fetchone()[0]
+            self.connection.executemany(
+                "INSERT INTO analysis_tasks VALUES (?, ?, 'tv', ?, ?, NULL, ?)",
+                [(f"task-{i:06d}", str(1000 + i), status, f"2026-01-01T00:00:{i:06d}",
+                  json.dumps({"title": f"Série {i}"})) for i in range(start, start + count)]
+            )
+            self.connection.commit()
+        if status == "pending" and self.on_pending is not None:
+            self.on_pending()
+
+    def execute(self, sql: str, args: Tuple = ()) -> List[Dict]:
+        with self.lock:
+            self.statements += 1
+            rows = [dict(row) for row in self.connection.execute(sql, args).fetchall()]
+            self.connection.commit()
+        for row in rows:
+            if row.get("metadata"):
+                row["metadata"] = json.loads(row["metadata"])
+        return rows
+
+    def execute_many(self, sql: str, rows: List[Tuple]):
+        with self.lock:
+            self.statements += 1
+            self.connection.executemany(sql, rows)
+            self.connection.commit()
+
+    def count(self, status: str) -> int:
+        return self.execute("SELECT COUNT(*) AS n FROM analysis_tasks WHERE status = ?", (status,))[0]["n"]
+
+
+def parse_filters(query: str) -> Tuple[str, List]:
+    """Filtres PostgREST (eq, in) -> clause WHERE"""
+    clauses, args = [], []
+    for key, value in parse_qsl(query):
+        if key in ("order", "limit", "select", "on_conflict"):
+            continue
+        operator, _, operand = value.partition(".")
+        if operator == "eq":
+            clauses.append(f"{key} = ?")
+            args.append(operand)
+        elif operator == "in":
+            values = operand.strip("()").split(",")
+            clauses.append(f"{key} IN ({','.join('?' * len(values))})")
+            args.extend(values)
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", args
+
+
+class PostgrestHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    store: TaskStore = None
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status: int, payload=None):
+        body = json.dumps(payload).encode() if payload is not None else b""
+        with self.store.lock:
+            self.store.http_requests += 1
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _body(self) -> Dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path != "/rest/v1/analysis_tasks":
+            return self._reply(404, {"message": "not found"})
+        params = dict(parse_qsl(url.query))
+        where, args = parse_filters(url.query)
+        columns = params.get("select", "*")
+        sql = f"SELECT {columns} FROM analysis_tasks{where}"
+        if params.get("order"):
+            column, _, direction = params["order"].partition(".")
+            sql += f" ORDER BY {column} {'DESC' if direction == 'desc' else 'ASC'}"
+        if params.get("limit"):
+            sql += f" LIMIT {int(params['limit'])}"
+        self._reply(200, self.store.execute(sql, tuple(args)))
+
+    def do_PATCH(self):
+        url = urlsplit(self.path)
+        body = self._body()
+        if url.path != "/rest/v1/analysis_tasks":
+            return self._reply(404, {"message": "not found"})
+        where, args = parse_filters(url.query)
+        assignments = ", ".join(f"{column} = ?" for column in body)
+        rows = self.store.execute(f"UPDATE analysis_tasks SET {assignments}{where} RETURNING *",
+                                  tuple(body.values()) + tuple(args))
+        if "return=representation" in (self.headers.get("Prefer") or ""):
+            return self._reply(200, rows)
+        self._reply(204)
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        body = self._body()
+        if url.path == "/rest/v1/mollo_scores":
+            if random.random() < self.store.score_failure_rate:
+                return self._reply(503, {"message": "service unavailable"})
+            rows = body if isinstance(body, list) else [body]
+            self.store.execute_many("INSERT OR REPLACE INTO mollo_scores VALUES (?, ?)",
+                                    [(row["tmdb_id"], json.dumps(row)) for row in rows])
+            return self._reply(201)
+        if url.path != "/rest/v1/rpc/claim_analysis_tasks":
+            return self._reply(404, {"message": "not found"})
+        # Équivalent de database/claim_analysis_tasks.sql (une seule instruction atomique)
+        rows = self.store.execute(
+            "UPDATE analysis_tasks SET status = 'processing' WHERE id IN ("
+            " SELECT id FROM analysis_tasks WHERE status = 'pending' ORDER BY created_at LIMIT ?)"
+            " RETURNING *", (int(body.get("batch_size", 1)),)
+        )
+        self._reply(200, rows)
+
+
+def serve(store: TaskStore, port: int = 0) -> http.server.ThreadingHTTPServer:
+    """Démarre le serveur dans un thread ; URL : http://127.0.0.1:<server.server_address[1]>"""
+    handler = type("Handler", (PostgrestHandler,), {"store": store})
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
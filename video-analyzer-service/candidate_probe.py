@@ -0,0 +1,136 @@
+"""
+Probe et classement des candidats vidéo avant téléchargement
+
+Les métadonnées de tous les candidats d'une recherche sont récupérées en
+parallèle (pool borné, délai global), puis les candidats sont classés sur
+ces informations réelles :
+- correspondance du titre de la vidéo avec le titre recherché ;
+- durée réelle dans la plage attendue (liens morts et vidéos hors plage écartés) ;
+- présence d'un format vidéo téléchargeable (<= 480p, comme le téléchargement).
+
+Les candidats non probés avant le délai restent en fin de liste et seront
+probés à leur tour, un par un.
+"""
+
+import os
+import re
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Tuple
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+PROBE_WORKERS = int(os.getenv("CANDIDATE_PROBE_WORKERS", 4))
+PROBE_DEADLINE = float(os.getenv("CANDIDATE_PROBE_DEADLINE", 45))  # secondes pour l'ensemble des probes
+# Hauteur maximale du format téléchargé (voir YouTubeDownloader)
+DOWNLOAD_MAX_HEIGHT = 480
+
+
+def normalize_words(text: str) -> List[str]:
+    """Mots en minuscules, sans accents ni ponctuation"""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    return [word for word in re.split(r"[^a-z0-9]+", text) if len(word) > 1]
+
+
+def title_match(title: str, video_title: str) -> float:
+    """Part des mots du titre recherché présents dans le titre de la vidéo (0-1)"""
+    wanted = set(normalize_words(title))
+    if not wanted:
+        return 0.0
+    found = wanted & set(normalize_words(video_title))
+    return len(found) / len(wanted)
+
+
+def has_downloadable_format(info: Dict) -> Optional[bool]:
+    """
+    True si un format vidéo <= 480p existe, False si aucun format vidéo,
+    None si yt-dlp n'a pas listé les formats.
+    """
+    formats = info.get("formats")
+    if not formats:
+        return None
+    video_formats = [f for f in formats if f.get("vcodec") not in (None, "none")]
+    if not video_formats:
+        # Formats combinés sans codec déclaré (ex. HLS) : à considérer comme vidéo
+        video_formats = [f for f in formats if f.get("height")]
+    if not video_formats:
+        return False
+    return any((f.get("height") or 0) <= DOWNLOAD_MAX_HEIGHT for f in video_formats)
+
+
+def probe_candidates(candidates: List[Dict], probe: Callable[[str], Optional[Dict]],
+                     workers: int = PROBE_WORKERS, deadline: float = PROBE_DEADLINE) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Probe tous les candidats en parallèle.
+
+    Les métadonnées sont stockées dans candidate['info'] (None = lien mort).
+    Retourne (candidats probés, candidats non probés avant le délai).
+    """
+    if not candidates:
+        return [], []
+    started = time.monotonic()
+    executor = ThreadPoolExecutor(max_workers=max(1, min(workers, len(candidates))),
+                                  thread_name_prefix="candidate-probe")
+    futures = {executor.submit(probe, candidate["url"]): candidate for candidate in candidates}
+    done, not_done = wait(futures, timeout=deadline)
+    # Ne pas attendre les probes en retard (leur propre timeout les terminera)
+    executor.shutdown(wait=False, cancel_futures=True)
+
+    probed = []
+    for future, candidate in futures.items():
+        if future not in done:
+            continue
+        try:
+            candidate["info"] = future.result()
+        except Exception as e:
+            logger.debug(f"Probe en erreur pour {candidate['url']}: {e}")
+            candidate["info"] = None
+        probed.append(candidate)
+    late = [candidate for future, candidate in futures.items() if future in not_done]
+    logger.info(f"🔎 {len(probed)}/{len(candidates)} candidats probés en {time.monotonic() - started:.1f}s"
+                + (f" ({len(late)} hors délai)" if late else ""))
+    return probed, late
+
+
+def rank_candidates(probed: List[Dict], title: str, min_duration: float, max_duration: float) -> List[Dict]:
+    """
+    Écarte les candidats inutilisables (lien mort, durée réelle hors plage,
+    aucun format vidéo) et classe les autres : titre, format, durée.
+    """
+    ranked = []
+    for candidate in probed:
+        info = candidate.get("info")
+        if not info:
+            logger.info(f"✗ Lien mort: {candidate.get('title', '?')[:80]}")
+            continue
+        duration = info.get("duration") or 0
+        if not (min_duration <= duration <= max_duration):
+            logger.info(f"✗ Durée réelle hors plage ({duration}s): {candidate.get('title', '?')[:80]}")
+            continue
+        downloadable = has_downloadable_format(info)
+        if downloadable is False:
+            logger.info(f"✗ Aucun format vidéo <= {DOWNLOAD_MAX_HEIGHT}p: {candidate.get('title', '?')[:80]}")
+            continue
+        candidate["duration"] = duration
+        candidate["title_match"] = round(title_match(title, info.get("title") or candidate.get("title", "")), 2)
+        candidate["downloadable"] = downloadable
+        ranked.append(candidate)
+
+    # Formats non listés (None) gardés, après un format confirmé : le téléchargement tranchera
+    ranked.sort(key=lambda c: (c["title_match"], c["downloadable"] is True, c["duration"]), reverse=True)
+    return ranked
+
+
+def probe_and_rank(candidates: List[Dict], title: str, probe: Callable[[str], Optional[Dict]],
+                   min_duration: float, max_duration: float,
+                   workers: int = PROBE_WORKERS, deadline: float = PROBE_DEADLINE) -> List[Dict]:
+    """Candidats classés, suivis des candidats non probés (ordre d'origine)"""
+    probed, late = probe_candidates(candidates, probe, workers=workers, deadline=deadline)
+    ranked = rank_candidates(probed, title, min_duration, max_duration)
+    for candidate in ranked:
+        logger.info(f"🏅 {candidate.get('title', '?')[:80]} ({candidate['duration']}s, titre {candidate['title_match']:.0%})")
+    return ranked + late
@@ -0,0 +1,157 @@
+"""
+Client de recherche Dailymotion pour PacingScore
+
+Un seul client pour les recherches d'épisodes et de films :
+- session HTTP keep-alive partagée (pool de connexions) ;
+- cache des pages de résultats par (requête, page), avec TTL et taille bornée ;
+- générateur paresseux : la page suivante n'est demandée que lorsque les
+  candidats des pages précédentes ont été épuisés ;
+- plage de durée et mots-clés exclus en paramètres.
+"""
+
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+DAILYMOTION_API_URL = "https://api.dailymotion.com/videos"
+DAILYMOTION_PAGE_SIZE = int(os.getenv("DAILYMOTION_PAGE_SIZE", 10))
+DAILYMOTION_MAX_PAGES = int(os.getenv("DAILYMOTION_MAX_PAGES", 5))
+DAILYMOTION_CACHE_TTL = int(os.getenv("DAILYMOTION_CACHE_TTL", 3600))  # secondes
+DAILYMOTION_CACHE_MAX_ENTRIES = int(os.getenv("DAILYMOTION_CACHE_MAX_ENTRIES", 500))
+
+
+class DailymotionClient:
+    """Recherche paginée et mise en cache sur l'API publique (sans clé)"""
+
+    def __init__(self, page_size: int = DAILYMOTION_PAGE_SIZE, max_pages: int = DAILYMOTION_MAX_PAGES,
+                 cache_ttl: int = DAILYMOTION_CACHE_TTL, cache_max_entries: int = DAILYMOTION_CACHE_MAX_ENTRIES,
+                 timeout: float = 30):
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.cache_ttl = cache_ttl
+        self.cache_max_entries = cache_max_entries
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=8))
+        # (requête, page) -> (expiration, vidéos, has_more), ordre LRU
+        self._cache: "OrderedDict[Tuple[str, int], Tuple[float, List[Dict], bool]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    # ---- Pages de résultats ----
+
+    def _cached_page(self, key: Tuple[str, int]) -> Optional[Tuple[List[Dict], bool]]:
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self._cache.pop(key, None)
+                self.misses += 1
+                return None
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return entry[1], entry[2]
+
+    def _store_page(self, key: Tuple[str, int], videos: List[Dict], has_more: bool):
+        with self._lock:
+            self._cache[key] = (time.monotonic() + self.cache_ttl, videos, has_more)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_max_entries:
+                self._cache.popitem(last=False)
+
+    def fetch_page(self, query: str, page: int = 1) -> Tuple[List[Dict], bool]:
+        """
+        Une page de résultats bruts (id, title, duration, url).
+        Retourne (vidéos, has_more) ; lève une exception si l'API échoue.
+        """
+        key = (query.strip().lower(), page)
+        cached = self._cached_page(key)
+        if cached is not None:
+            logger.debug(f"Recherche Dailymotion en cache: '{query}' page {page}")
+            return cached
+
+        params = {
+            "search": query,
+            "limit": str(self.page_size),
+            "page": str(page),
+            "fields": "id,title,duration,url"
+        }
+        resp = self.session.get(DAILYMOTION_API_URL, params=params, timeout=self.timeout)
+        if resp.status_code != 200:
+            raise Exception(f"Dailymotion API error {resp.status_code}")
+        data = resp.json()
+        videos = data.get("list", [])
+        has_more = bool(data.get("has_more")) and bool(videos)
+        self._store_page(key, videos, has_more)
+        return videos, has_more
+
+    # ---- Candidats ----
+
+    def search(self, query: str, min_duration: float, max_duration: float,
+               excluded_keywords: Iterable[str] = (), max_pages: int = None) -> Iterator[List[Dict]]:
+        """
+        Générateur paresseux : pour chaque page, la liste des candidats
+        admissibles (durée dans la plage, aucun mot-clé exclu dans le titre),
+        triés par durée décroissante. Une page sans candidat admissible donne
+        une liste vide ; la page suivante n'est demandée qu'au `next()` suivant.
+        """
+        excluded_keywords = [keyword.lower() for keyword in excluded_keywords]
+        max_pages = max_pages or self.max_pages
+        logger.info(f"Recherche Dailymotion: '{query}'")
+        for page in range(1, max_pages + 1):
+            try:
+                videos, has_more = self.fetch_page(query, page)
+            except Exception as e:
+                logger.error(f"Erreur lors de la recherche Dailymotion pour '{query}' (page {page}): {e}")
+                return
+            if not videos:
+                logger.debug(f"Aucun résultat Dailymotion pour '{query}' (page {page})")
+                return
+
+            candidates = []
+            for video in videos:
+                video_duration = video.get("duration", 0)
+                video_title = video.get("title", "").lower()
+
+                # Exclure trailers/teasers
+                if any(keyword in video_title for keyword in excluded_keywords):
+                    logger.debug(f"Exclu (trailer): {video_title[:50]}")
+                    continue
+
+                if not (min_duration <= video_duration <= max_duration):
+                    logger.debug(f"Durée hors plage ({video_duration}s): {video_title[:50]}")
+                    continue
+
+                candidates.append({
+                    'url': video.get("url"),
+                    'title': video.get("title", ""),
+                    'duration': video_duration,
+                    'source': 'Dailymotion'
+                })
+                logger.info(f"✅ Candidat Dailymotion: {video.get('title', '')[:80]} ({video_duration}s)")
+
+            candidates.sort(key=lambda x: x['duration'], reverse=True)
+            if candidates:
+                logger.info(f"🎯 {len(candidates)} vidéos candidates page {page} (max {candidates[0]['duration']}s)")
+            else:
+                logger.warning(f"Aucune vidéo Dailymotion admissible page {page} pour: {query}")
+            yield candidates
+
+            if not has_more:
+                return
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "pages": len(self._cache)}
+
+
+dailymotion_client = DailymotionClient()
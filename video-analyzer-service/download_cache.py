@@ -0,0 +1,335 @@
+"""
+Cache disque des segments vidéo téléchargés
+
+Un même segment (URL, début, durée) est souvent redemandé : requêtes API
+répétées, tâches relancées, comparaisons. Plutôt que de supprimer chaque
+téléchargement après usage, les segments sont conservés dans
+DOWNLOAD_CACHE_DIR (sous CACHE_DIR, voir result_cache.py) :
+- un fichier par segment (seg_<clé>.mp4), clé = URL normalisée + début + durée ;
+- verrous fcntl par segment (fichier .lock) : un seul processus télécharge,
+  les autres attendent puis lisent le même fichier ; un segment en cours
+  d'utilisation (verrou partagé) n'est jamais supprimé. Un verrou obtenu
+  sur un fichier .lock supprimé entre-temps (éviction) ne protège rien :
+  il est vérifié (inode) et repris sur le fichier en place ;
+- budget disque (DOWNLOAD_CACHE_MAX_MB), éviction des segments les moins
+  récemment utilisés (date de modification mise à jour à chaque lecture) ;
+- nettoyage périodique des fichiers orphelins (téléchargements interrompus,
+  vidéos laissées par un processus arrêté brutalement).
+
+Plusieurs processus d'un même hôte (API, workers) partagent le dossier.
+Les compteurs (octets économisés, etc.) sont propres au processus.
+"""
+
+import os
+import time
+import fcntl
+import shutil
+import hashlib
+import tempfile
+import threading
+from typing import Callable, Dict, Iterable, Optional
+
+from metadata_cache import normalize_url
+from result_cache import CACHE_DIR
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+DOWNLOAD_CACHE_DIR = os.getenv("DOWNLOAD_CACHE_DIR", os.path.join(CACHE_DIR, "segments"))
+DOWNLOAD_CACHE_MAX_MB = int(os.getenv("DOWNLOAD_CACHE_MAX_MB", 2048))
+DOWNLOAD_CACHE_ORPHAN_AGE = int(os.getenv("DOWNLOAD_CACHE_ORPHAN_AGE", 3600))  # secondes sans modification
+DOWNLOAD_CACHE_JANITOR_INTERVAL = 600  # secondes entre deux nettoyages des orphelins
+
+SEGMENT_PREFIX = "seg_"
+INCOMING_DIR = ".incoming"
+# Fichiers vidéo (ou partiels) qu'un processus arrêté a pu laisser derrière lui
+ORPHAN_SUFFIXES = (".mp4", ".webm", ".mkv", ".part", ".ytdl", ".temp")
+
+
+def segment_key(video_url: str, start_time: Optional[float], duration: Optional[float]) -> str:
+    payload = f"{normalize_url(video_url)}|{round(float(start_time or 0), 3)}|" \
+              f"{round(float(duration), 3) if duration is not None else ''}"
+    return hashlib.sha256(payload.encode()).hexdigest()[:24]
+
+
+class SegmentLease:
+    """
+    Segment en cache réservé en lecture (verrou partagé) : il ne peut pas
+    être évincé avant `release()`. Utilisable comme context manager.
+    """
+
+    def __init__(self, cache: "DownloadCache", path: str, lock_fd: int, hit: bool):
+        self.cache = cache
+        self.path = path
+        self.hit = hit
+        self._lock_fd: Optional[int] = lock_fd
+
+    def release(self):
+        fd, self._lock_fd = self._lock_fd, None
+        if fd is None:
+            return
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+        self.cache.enforce_budget()
+
+    def __enter__(self) -> str:
+        return self.path
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class DownloadCache:
+    """Segments vidéo téléchargés, partagés entre processus, dans un budget disque"""
+
+    def __init__(self, directory: str, max_mb: float = DOWNLOAD_CACHE_MAX_MB,
+                 orphan_age: int = DOWNLOAD_CACHE_ORPHAN_AGE, sweep_dirs: Iterable[str] = ()):
+        """
+        Args:
+            directory: Dossier des segments (créé si besoin)
+            max_mb: Budget disque des segments
+            orphan_age: Âge (sans modification) à partir duquel un fichier
+                        temporaire est considéré comme orphelin
+            sweep_dirs: Dossiers de téléchargement hors cache où supprimer
+                        aussi les vidéos orphelines (ex. TEMP_DIR de l'API)
+        """
+        self.directory = directory
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.orphan_age = orphan_age
+        self.sweep_dirs = [d for d in sweep_dirs if d]
+        self.incoming = os.path.join(directory, INCOMING_DIR)
+        os.makedirs(self.incoming, exist_ok=True)
+        self._lock = threading.Lock()
+        self._next_janitor = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.bytes_downloaded = 0
+        self.evictions = 0
+        self.orphans_removed = 0
+        self.clean_orphans()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{SEGMENT_PREFIX}{key}.mp4")
+
+    def _count(self, **increments):
+        with self._lock:
+            for counter, value in increments.items():
+                setattr(self, counter, getattr(self, counter) + value)
+
+    def acquire(self, video_url: str, start_time: Optional[float], duration: Optional[float],
+                download: Callable[[str], Optional[str]]) -> Optional[SegmentLease]:
+        """
+        Segment en cache, ou téléchargé par `download(dossier)` (qui retourne
+        le chemin du fichier produit dans ce dossier, ou None). Un appel
+        concurrent pour le même segment attend la fin du téléchargement.
+        Retourne None si le téléchargement échoue ; ses exceptions sont propagées.
+        """
+        path = self._path(segment_key(video_url, start_time, duration))
+        lock_path = path + ".lock"
+        while True:
+            fd = self._open_lock(lock_path, fcntl.LOCK_SH)
+            try:
+                if os.path.exists(path):
+                    hit = True
+                    size = os.path.getsize(path)
+                    os.utime(path)
+                    self._count(hits=1, bytes_saved=size)
+                    logger.info(f"[CACHE] Segment déjà téléchargé ({size / 1e6:.1f} Mo économisés): {video_url}")
+                    break
+                # Verrou exclusif : un seul téléchargement, les autres attendent ici.
+                # La conversion de verrou n'est pas atomique : le segment a pu être
+                # évincé (et son verrou supprimé) entre-temps, d'où les vérifications
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                if not self._is_current(fd, lock_path):
+                    os.close(fd)
+                    continue
+                if not os.path.exists(path) and not self._download(path, download):
+                    os.close(fd)
+                    return None
+                fcntl.flock(fd, fcntl.LOCK_SH)
+                if not self._is_current(fd, lock_path) or not os.path.exists(path):
+                    os.close(fd)
+                    continue
+                hit = False
+                break
+            except BaseException:
+                os.close(fd)
+                raise
+        self._maybe_clean_orphans()
+        return SegmentLease(self, path, fd, hit)
+
+    def _open_lock(self, lock_path: str, operation: int) -> int:
+        """Descripteur du fichier verrou en place, verrouillé (`operation` de flock)"""
+        while True:
+            fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, operation)
+            except BaseException:
+                os.close(fd)
+                raise
+            if self._is_current(fd, lock_path):
+                return fd
+            # Fichier supprimé pendant l'attente du verrou : reprendre sur le nouveau
+            os.close(fd)
+
+    @staticmethod
+    def _is_current(fd: int, lock_path: str) -> bool:
+        """`fd` désigne-t-il encore le fichier verrou en place (ni supprimé, ni recréé) ?"""
+        try:
+            current = os.stat(lock_path)
+        except FileNotFoundError:
+            return False
+        opened = os.fstat(fd)
+        return (opened.st_ino, opened.st_dev) == (current.st_ino, current.st_dev)
+
+    def _download(self, path: str, download: Callable[[str], Optional[str]]) -> bool:
+        workdir = tempfile.mkdtemp(dir=self.incoming)
+        try:
+            produced = download(workdir)
+            if not produced or not os.path.exists(produced):
+                return False
+            size = os.path.getsize(produced)
+            os.replace(produced, path)
+            self._count(misses=1, bytes_downloaded=size)
+            return True
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    # ---- Budget disque ----
+
+    def _segments(self):
+        """(date d'accès, taille, chemin) des segments présents"""
+        segments = []
+        try:
+            entries = list(os.scandir(self.directory))
+        except OSError:
+            return segments
+        for entry in entries:
+            if entry.name.startswith(SEGMENT_PREFIX) and entry.name.endswith(".mp4"):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                segments.append((stat.st_mtime, stat.st_size, entry.path))
+        return segments
+
+    def used_bytes(self) -> int:
+        return sum(size for _, size, _ in self._segments())
+
+    def enforce_budget(self):
+        """Évince les segments les moins récemment utilisés et non réservés jusqu'au budget"""
+        segments = sorted(self._segments())
+        total = sum(size for _, size, _ in segments)
+        for _, size, path in segments:
+            if total <= self.max_bytes:
+                break
+            if self._remove_unused(path):
+                total -= size
+                self._count(evictions=1)
+
+    def _remove_unused(self, path: str) -> bool:
+        """
+        Supprime un segment (et son verrou) si personne ne le lit ni ne le
+        télécharge. Un processus qui attendait ce verrou le constate
+        (_is_current) et reprend sur un nouveau fichier verrou.
+        """
+        try:
+            fd = self._open_lock(path + ".lock", fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return False
+        try:
+            if os.path.exists(path):
+                os.remove(path)
+            os.remove(path + ".lock")
+            return True
+        except OSError:
+            return False
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    # ---- Orphelins ----
+
+    def _maybe_clean_orphans(self):
+        with self._lock:
+            if time.monotonic() < self._next_janitor:
+                return
+            self._next_janitor = time.monotonic() + DOWNLOAD_CACHE_JANITOR_INTERVAL
+        self.clean_orphans()
+
+    def clean_orphans(self) -> int:
+        """
+        Supprime les restes de processus interrompus, non modifiés depuis
+        `orphan_age` : dossiers de téléchargement du cache, fichiers vidéo et
+        partiels des dossiers `sweep_dirs` (récursivement), verrous sans segment.
+        """
+        cutoff = time.time() - self.orphan_age
+        removed = 0
+        try:
+            entries = list(os.scandir(self.incoming))
+        except OSError:
+            entries = []
+        for entry in entries:
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    shutil.rmtree(entry.path) if entry.is_dir() else os.remove(entry.path)
+                    removed += 1
+            except OSError:
+                pass
+
+        for directory in self.sweep_dirs:
+            for root, dirs, files in os.walk(directory):
+                if os.path.abspath(root).startswith(os.path.abspath(self.directory)):
+                    dirs[:] = []
+                    continue
+                for name in files:
+                    if not name.endswith(ORPHAN_SUFFIXES):
+                        continue
+                    path = os.path.join(root, name)
+                    try:
+                        if os.path.getmtime(path) < cutoff:
+                            os.remove(path)
+                            removed += 1
+                    except OSError:
+                        pass
+
+        try:
+            locks = [entry.path for entry in os.scandir(self.directory) if entry.name.endswith(".mp4.lock")]
+        except OSError:
+            locks = []
+        for lock_path in locks:
+            segment = lock_path[:-len(".lock")]
+            try:
+                if not os.path.exists(segment) and os.path.getmtime(lock_path) < cutoff:
+                    self._remove_unused(segment)
+            except OSError:
+                pass
+
+        if removed:
+            logger.info(f"[CACHE] {removed} fichier(s) orphelin(s) supprimé(s)")
+            self._count(orphans_removed=removed)
+        return removed
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            hits, misses = self.hits, self.misses
+            saved, downloaded = self.bytes_saved, self.bytes_downloaded
+            evictions, orphans = self.evictions, self.orphans_removed
+        return {
+            "hits": hits,
+            "misses": misses,
+            "saved_mb": round(saved / 1e6, 1),
+            "downloaded_mb": round(downloaded / 1e6, 1),
+            "size_mb": round(self.used_bytes() / 1e6, 1),
+            "evictions": evictions,
+            "orphans_removed": orphans
+        }
+
+
+def create_download_cache(sweep_dirs: Iterable[str] = ()) -> Optional[DownloadCache]:
+    """Cache configuré par l'environnement (DOWNLOAD_CACHE_DIR vide = désactivé)"""
+    if not DOWNLOAD_CACHE_DIR:
+        return None
+    return DownloadCache(DOWNLOAD_CACHE_DIR, sweep_dirs=sweep_dirs)
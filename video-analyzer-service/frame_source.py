@@ -0,0 +1,460 @@
+"""
+Sources de frames interchangeables pour l'analyseur PacingScore
+
+Toutes les sources sont des VideoStream PySceneDetect : elles peuvent être
+passées directement au SceneManager, et redistribuent chaque frame décodée
+aux consommateurs branchés (FrameTap) du moteur d'analyse.
+
+Backends disponibles :
+- "cv2"         : lecteur OpenCV historique (frames BGR pleine résolution)
+- "ffmpeg-gray" : pipe ffmpeg produisant des frames 8 bits en niveaux de gris,
+                  déjà réduites à la résolution d'analyse (ex: 160 px de large)
+
+Un flux réseau (StreamInput) est lu par un pipe ffmpeg pendant son
+téléchargement, dans le format du backend choisi.
+"""
+
+import os
+import subprocess
+from fractions import Fraction
+from typing import Dict, List, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+from scenedetect.backends.opencv import VideoStreamCv2
+from scenedetect.frame_timecode import FrameTimecode
+from scenedetect.video_stream import VideoStream, VideoOpenFailure, SeekError
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_BACKEND = os.getenv("ANALYZER_FRAME_SOURCE", "cv2")
+DEFAULT_ANALYSIS_WIDTH = int(os.getenv("ANALYZER_ANALYSIS_WIDTH", 160))
+FFMPEG_BIN = os.getenv("FFMPEG_BIN", "ffmpeg")
+# Délai max sans données sur un flux réseau avant abandon (secondes)
+STREAM_READ_TIMEOUT = int(os.getenv("STREAM_READ_TIMEOUT", 30))
+
+
+def probe_video(path: str) -> Tuple[float, int, Tuple[int, int]]:
+    """
+    Métadonnées du conteneur (fps, nombre de frames, taille), sans décoder de frame.
+    """
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise VideoOpenFailure(f"Impossible d'ouvrir la vidéo: {path}")
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    size = (
+        int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    )
+    cap.release()
+    if fps <= 0 or size[0] <= 0:
+        raise VideoOpenFailure(f"Métadonnées vidéo invalides: {path}")
+    return fps, frame_count, size
+
+
+class FrameSource:
+    """
+    Comportement commun aux sources de frames.
+
+    Les sous-classes appellent `_dispatch()` pour chaque frame décodée et
+    `_mark_eof()` quand le flux est épuisé.
+    """
+
+    #: True si les frames produites sont déjà en niveaux de gris (2D)
+    is_gray = False
+
+    def _init_source(self):
+        self.taps: List = []
+        self.frames_decoded = 0
+        self.reached_eof = False
+
+    def _dispatch(self, index: int, frame: np.ndarray):
+        self.frames_decoded += 1
+        for tap in self.taps:
+            tap.feed(index, frame)
+
+    def _mark_eof(self):
+        self.reached_eof = True
+
+    @property
+    def native_fps(self) -> float:
+        """FPS déclaré par le conteneur (CAP_PROP_FPS)"""
+        raise NotImplementedError
+
+    @property
+    def native_frame_count(self) -> int:
+        """Nombre de frames déclaré par le conteneur (CAP_PROP_FRAME_COUNT)"""
+        raise NotImplementedError
+
+    @property
+    def native_width(self) -> int:
+        """Largeur de la vidéo source, avant toute réduction"""
+        raise NotImplementedError
+
+    @property
+    def output_width(self) -> int:
+        """Largeur des frames effectivement produites"""
+        return self.frame_size[0]
+
+
+class Cv2FrameSource(FrameSource, VideoStreamCv2):
+    """Lecteur OpenCV historique : frames BGR pleine résolution"""
+
+    BACKEND_NAME = "cv2"
+
+    def __init__(self, path: str):
+        VideoStreamCv2.__init__(self, path)
+        self._init_source()
+
+    @property
+    def native_fps(self) -> float:
+        return self.capture.get(cv2.CAP_PROP_FPS)
+
+    @property
+    def native_frame_count(self) -> int:
+        return int(self.capture.get(cv2.CAP_PROP_FRAME_COUNT))
+
+    @property
+    def native_width(self) -> int:
+        return self.frame_size[0]
+
+    def read(self, decode: bool = True, *args, **kwargs):
+        frame = super().read(decode, *args, **kwargs)
+        if frame is False:
+            self._mark_eof()
+        elif isinstance(frame, np.ndarray) and kwargs.get("advance", True) and (not args or args[0]):
+            self._dispatch(self.frame_number - 1, frame)
+        return frame
+
+
+class FfmpegGrayFrameSource(FrameSource, VideoStream):
+    """
+    Pipe ffmpeg -> frames 8 bits niveaux de gris réduites à `analysis_width`.
+
+    ffmpeg décode, convertit et réduit la vidéo ; chaque frame est lue
+    directement dans un buffer NumPy (h, w) uint8, sans passer par une image
+    BGR pleine résolution.
+    """
+
+    BACKEND_NAME = "ffmpeg-gray"
+    is_gray = True
+
+    def __init__(self, path: str, analysis_width: int = DEFAULT_ANALYSIS_WIDTH, ffmpeg_bin: str = FFMPEG_BIN):
+        super().__init__()
+        self._init_source()
+        self._path = path
+        self._ffmpeg_bin = ffmpeg_bin
+
+        self._fps, self._frame_count, self._native_size = probe_video(path)
+        self._configure(self._scaled_size(self._native_size, analysis_width))
+        self._spawn(0)
+
+    def _configure(self, size: Tuple[int, int], channels: int = 1):
+        self._frame_rate = Fraction(self._fps).limit_denominator(100000)
+        self._size = size
+        self._frame_shape = (size[1], size[0], channels) if channels > 1 else (size[1], size[0])
+        self._frame_bytes = size[0] * size[1] * channels
+        self._process: Optional[subprocess.Popen] = None
+        self._frame_number = 0
+
+    @staticmethod
+    def _scaled_size(native_size: Tuple[int, int], analysis_width: int) -> Tuple[int, int]:
+        width, height = native_size
+        if not analysis_width or analysis_width >= width:
+            return width, height
+        # Dimensions paires (contrainte des filtres ffmpeg)
+        scaled_width = max(2, analysis_width - analysis_width % 2)
+        scaled_height = max(2, int(round(height * scaled_width / width / 2.0)) * 2)
+        return scaled_width, scaled_height
+
+    def _input_args(self, start_frame: int) -> List[str]:
+        args = []
+        if start_frame > 0:
+            # Seek en entrée : ffmpeg saute à la keyframe précédente puis
+            # décode jusqu'au timestamp demandé
+            args += ['-ss', f'{start_frame / self._fps:.6f}']
+        return args + ['-i', self._path]
+
+    def _output_args(self) -> List[str]:
+        return [
+            '-an', '-sn',
+            '-vsync', '0',
+            '-vf', f'scale={self._size[0]}:{self._size[1]}:flags=area',
+            '-pix_fmt', 'gray',
+            '-f', 'rawvideo',
+            'pipe:1'
+        ]
+
+    def _spawn(self, start_frame: int):
+        self._close()
+        cmd = [self._ffmpeg_bin, '-v', 'error', '-nostdin']
+        cmd += self._input_args(start_frame) + self._output_args()
+        try:
+            self._process = subprocess.Popen(
+                cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                bufsize=self._frame_bytes * 4
+            )
+        except OSError as e:
+            raise VideoOpenFailure(f"Impossible de lancer ffmpeg: {e}")
+        self._frame_number = start_frame
+        self.reached_eof = False
+
+    def _close(self):
+        if self._process is not None:
+            try:
+                self._process.stdout.close()
+                self._process.kill()
+                self._process.wait(timeout=5)
+            except Exception:
+                pass
+            self._process = None
+
+    def __del__(self):
+        self._close()
+
+    # ---- Métadonnées ----
+
+    @property
+    def native_fps(self) -> float:
+        return self._fps
+
+    @property
+    def native_frame_count(self) -> int:
+        return self._frame_count
+
+    @property
+    def native_width(self) -> int:
+        return self._native_size[0]
+
+    # ---- Interface VideoStream ----
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @property
+    def name(self) -> str:
+        return os.path.splitext(os.path.basename(self._path))[0]
+
+    @property
+    def is_seekable(self) -> bool:
+        return True
+
+    @property
+    def frame_rate(self) -> Fraction:
+        return self._frame_rate
+
+    @property
+    def duration(self) -> Optional[FrameTimecode]:
+        return self.base_timecode + self._frame_count
+
+    @property
+    def frame_size(self) -> Tuple[int, int]:
+        return self._size
+
+    @property
+    def aspect_ratio(self) -> float:
+        return 1.0
+
+    @property
+    def position(self) -> FrameTimecode:
+        return self.base_timecode + max(0, self._frame_number - 1)
+
+    @property
+    def position_ms(self) -> float:
+        return max(0, self._frame_number - 1) * 1000.0 / self._fps
+
+    @property
+    def frame_number(self) -> int:
+        return self._frame_number
+
+    def read(self, decode: bool = True, advance: bool = True):
+        if self._process is None or self.reached_eof:
+            return False
+        frame = np.empty(self._frame_shape, dtype=np.uint8)
+        view = memoryview(frame).cast('B')
+        received = 0
+        while received < self._frame_bytes:
+            count = self._process.stdout.readinto(view[received:])
+            if not count:
+                self._end_of_stream()
+                return False
+            received += count
+        self._frame_number += 1
+        if not decode:
+            return True
+        self._dispatch(self._frame_number - 1, frame)
+        return frame
+
+    def _end_of_stream(self):
+        self._mark_eof()
+        self._close()
+
+    def reset(self):
+        self._spawn(0)
+
+    def seek(self, target):
+        if not isinstance(target, FrameTimecode):
+            target = FrameTimecode(target, self.frame_rate)
+        self._spawn(max(0, target.frame_num))
+
+
+class StreamInput:
+    """
+    Flux réseau à analyser pendant son téléchargement (voir
+    YouTubeDownloader.open_video_stream) : URL média résolue, métadonnées
+    du format et segment à lire.
+
+    Peut être passé au moteur d'analyse à la place d'un chemin de fichier ;
+    chaque ouverture relance la lecture du flux.
+    """
+
+    def __init__(self, url: str, fps: float, width: int, height: int, duration: float,
+                 start_time: float = None, http_headers: Dict[str, str] = None,
+                 tee_path: str = None, source_url: str = None):
+        """
+        Args:
+            url: URL média directe (HTTP, HLS...) lisible par ffmpeg
+            fps, width, height: Métadonnées du format sélectionné
+            duration: Durée du segment à lire (secondes)
+            start_time: Début du segment dans la vidéo (secondes)
+            http_headers: En-têtes HTTP à transmettre (User-Agent, cookies...)
+            tee_path: Si défini, copie du flux vidéo écrite sur disque (cache)
+            source_url: URL de la page d'origine, pour les logs
+        """
+        self.url = url
+        self.fps = fps
+        self.width = width
+        self.height = height
+        self.duration = duration
+        self.start_time = start_time
+        self.http_headers = http_headers or {}
+        self.tee_path = tee_path
+        self.source_url = source_url
+
+    def __str__(self) -> str:
+        return f"flux {self.source_url or self.url}"
+
+
+class FfmpegStreamFrameSource(FfmpegGrayFrameSource):
+    """
+    Pipe ffmpeg lisant directement un flux réseau : le décodage et l'analyse
+    avancent au rythme du téléchargement, sans fichier intermédiaire.
+
+    Produit des frames en niveaux de gris réduites (comme "ffmpeg-gray") ou
+    des frames BGR pleine résolution (comme "cv2"). Si `tee_path` est
+    défini, ffmpeg écrit en parallèle une copie du flux vidéo sur disque.
+    Le flux n'est lisible que vers l'avant.
+    """
+
+    BACKEND_NAME = "ffmpeg-stream"
+
+    def __init__(self, stream: StreamInput, analysis_width: int = None, gray: bool = True,
+                 ffmpeg_bin: str = FFMPEG_BIN):
+        VideoStream.__init__(self)
+        self._init_source()
+        self._stream = stream
+        self._path = stream.url
+        self._ffmpeg_bin = ffmpeg_bin
+        self.is_gray = gray
+        self._fps = stream.fps
+        self._frame_count = int(stream.duration * stream.fps)
+        self._native_size = (stream.width, stream.height)
+        if gray:
+            self._configure(self._scaled_size(self._native_size, analysis_width or DEFAULT_ANALYSIS_WIDTH))
+        else:
+            self._configure(self._native_size, channels=3)
+        self._spawn(0)
+
+    def _input_args(self, start_frame: int) -> List[str]:
+        args = []
+        if self._stream.url.startswith(('http://', 'https://')):
+            # Coupure réseau : erreur au bout de STREAM_READ_TIMEOUT au lieu d'un blocage
+            args += ['-rw_timeout', str(STREAM_READ_TIMEOUT * 1000000)]
+            if self._stream.http_headers:
+                headers = ''.join(f'{key}: {value}\r\n' for key, value in self._stream.http_headers.items())
+                args += ['-headers', headers]
+        if self._stream.start_time:
+            args += ['-ss', f'{self._stream.start_time:.3f}']
+        return args + ['-t', f'{self._stream.duration:.3f}', '-i', self._stream.url]
+
+    def _output_args(self) -> List[str]:
+        if self.is_gray:
+            args = [
+                '-map', '0:v:0', '-vsync', '0',
+                '-vf', f'scale={self._size[0]}:{self._size[1]}:flags=area',
+                '-pix_fmt', 'gray'
+            ]
+        else:
+            args = ['-map', '0:v:0', '-vsync', '0', '-pix_fmt', 'bgr24']
+        args += ['-f', 'rawvideo', 'pipe:1']
+        if self._stream.tee_path:
+            args += ['-map', '0:v:0', '-c', 'copy', '-y', self._stream.tee_path]
+        return args
+
+    def _end_of_stream(self):
+        self._mark_eof()
+        process = self._process
+        self._process = None
+        if process is None:
+            return
+        process.stdout.close()
+        try:
+            returncode = process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            returncode = process.wait()
+        if returncode != 0:
+            # Téléchargement interrompu : l'analyse partielle ne doit pas
+            # passer pour complète
+            raise IOError(f"ffmpeg: lecture du flux interrompue (code {returncode}) après "
+                          f"{self._frame_number} frames: {self._stream}")
+
+    @property
+    def name(self) -> str:
+        return str(self._stream)
+
+    @property
+    def is_seekable(self) -> bool:
+        return False
+
+    def seek(self, target):
+        if not isinstance(target, FrameTimecode):
+            target = FrameTimecode(target, self.frame_rate)
+        if target.frame_num < self._frame_number:
+            raise SeekError("Flux réseau : retour en arrière impossible")
+        # Avance sans conversion jusqu'à la frame demandée
+        while self._frame_number < target.frame_num:
+            if self.read(decode=False) is False:
+                break
+
+
+FRAME_SOURCES = {
+    Cv2FrameSource.BACKEND_NAME: Cv2FrameSource,
+    FfmpegGrayFrameSource.BACKEND_NAME: FfmpegGrayFrameSource,
+}
+
+
+def open_frame_source(path: Union[str, StreamInput], backend: str = None, analysis_width: int = None) -> FrameSource:
+    """
+    Ouvre une source de frames.
+
+    Args:
+        path: Chemin de la vidéo, ou flux réseau (StreamInput) lu par ffmpeg
+        backend: "cv2" ou "ffmpeg-gray" (défaut: ANALYZER_FRAME_SOURCE) ; pour
+                 un flux, choisit entre frames BGR pleine résolution et
+                 niveaux de gris réduits
+        analysis_width: Largeur d'analyse des backends réduits (défaut: ANALYZER_ANALYSIS_WIDTH)
+    """
+    backend = backend or DEFAULT_BACKEND
+    if backend not in FRAME_SOURCES:
+        raise ValueError(f"Source de frames inconnue: {backend} (disponibles: {', '.join(FRAME_SOURCES)})")
+    if isinstance(path, StreamInput):
+        return FfmpegStreamFrameSource(path, analysis_width=analysis_width,
+                                       gray=backend == FfmpegGrayFrameSource.BACKEND_NAME)
+    if backend == FfmpegGrayFrameSource.BACKEND_NAME:
+        return FfmpegGrayFrameSource(path, analysis_width=analysis_width or DEFAULT_ANALYSIS_WIDTH)
+    return Cv2FrameSource(path)
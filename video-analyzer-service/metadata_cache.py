@@ -0,0 +1,147 @@
+"""
+Cache persistant des métadonnées vidéo (probes yt-dlp)
+
+Les mêmes URL Dailymotion reviennent d'une tâche à l'autre : leurs
+métadonnées sont conservées dans une base SQLite, par URL normalisée :
+- seuls les champs utilisés sont stockés (durée, titre, formats réduits) ;
+- durée de vie (TTL) et nombre d'entrées bornés, éviction LRU ;
+- base en mode WAL avec attente sur verrou : plusieurs conteneurs d'un même
+  hôte peuvent partager le fichier (volume commun).
+
+Les compteurs hits / misses sont propres au processus.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+METADATA_CACHE_TTL = int(os.getenv("METADATA_CACHE_TTL", 24 * 3600))  # secondes
+METADATA_CACHE_MAX_ENTRIES = int(os.getenv("METADATA_CACHE_MAX_ENTRIES", 5000))
+
+# Champs conservés (voir candidate_probe et worker.probe_next_candidate)
+INFO_FIELDS = ("duration", "title")
+FORMAT_FIELDS = ("format_id", "ext", "vcodec", "width", "height", "fps")
+# Paramètres de suivi sans effet sur la vidéo
+IGNORED_QUERY_PREFIXES = ("utm_",)
+
+
+def normalize_url(url: str) -> str:
+    """Schéma et hôte en minuscules, sans fragment, '/' final ni paramètres de suivi"""
+    parts = urlsplit(url.strip())
+    netloc = parts.netloc.lower()
+    if netloc.startswith("www."):
+        netloc = netloc[4:]
+    query = sorted((key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+                   if not key.startswith(IGNORED_QUERY_PREFIXES))
+    return urlunsplit((parts.scheme.lower(), netloc, parts.path.rstrip("/"), urlencode(query), ""))
+
+
+def reduce_info(info: Dict[str, Any]) -> Dict[str, Any]:
+    """Sous-ensemble des métadonnées yt-dlp conservé en cache"""
+    reduced = {field: info.get(field) for field in INFO_FIELDS}
+    formats = info.get("formats")
+    if formats is not None:
+        reduced["formats"] = [{field: f.get(field) for field in FORMAT_FIELDS if f.get(field) is not None}
+                              for f in formats]
+    return reduced
+
+
+class MetadataCache:
+    """Cache SQLite clé URL normalisée -> métadonnées réduites"""
+
+    def __init__(self, path: str, ttl: int = METADATA_CACHE_TTL, max_entries: int = METADATA_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS video_metadata ("
+                " url TEXT PRIMARY KEY, info TEXT NOT NULL,"
+                " stored_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS video_metadata_accessed ON video_metadata (accessed_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        """Une connexion par thread (sqlite3 ne partage pas les connexions entre threads)"""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=10)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def _count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        """Métadonnées en cache et encore valides, sinon None"""
+        key = normalize_url(url)
+        now = time.time()
+        try:
+            with self._connection() as connection:
+                row = connection.execute(
+                    "SELECT info FROM video_metadata WHERE url = ? AND stored_at >= ?", (key, now - self.ttl)
+                ).fetchone()
+                if row is not None:
+                    connection.execute("UPDATE video_metadata SET accessed_at = ? WHERE url = ?", (now, key))
+        except sqlite3.Error as e:
+            logger.warning(f"Cache métadonnées indisponible ({e})")
+            row = None
+        if row is None:
+            self._count("misses")
+            return None
+        self._count("hits")
+        return json.loads(row[0])
+
+    def put(self, url: str, info: Dict[str, Any]) -> Dict[str, Any]:
+        """Stocke les métadonnées réduites et les retourne"""
+        reduced = reduce_info(info)
+        now = time.time()
+        try:
+            with self._connection() as connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO video_metadata (url, info, stored_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (normalize_url(url), json.dumps(reduced), now, now)
+                )
+                self._evict(connection, now)
+            self._count("stores")
+        except sqlite3.Error as e:
+            logger.warning(f"Cache métadonnées indisponible ({e})")
+        return reduced
+
+    def _evict(self, connection: sqlite3.Connection, now: float):
+        connection.execute("DELETE FROM video_metadata WHERE stored_at < ?", (now - self.ttl,))
+        connection.execute(
+            "DELETE FROM video_metadata WHERE url IN ("
+            " SELECT url FROM video_metadata ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits, misses, stores = self.hits, self.misses, self.stores
+        lookups = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "stores": stores,
+            "hit_rate": round(100.0 * hits / lookups, 1) if lookups else 0.0
+        }
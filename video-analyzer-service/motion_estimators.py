@@ -0,0 +1,165 @@
+"""
+Estimateurs de mouvement pour l'analyse PacingScore
+
+Tous les estimateurs partagent la même interface : ils comparent deux frames
+en niveaux de gris et renvoient un score de mouvement sur l'échelle
+historique 0-100 (celle du flux optique Farneback pleine résolution).
+
+Du plus cher au moins cher (mesuré sur des frames 640x360) :
+- "farneback"          : flux optique dense Farneback (référence historique, ~80 ms/paire)
+- "lucas-kanade"       : flux optique épars Lucas-Kanade sur des coins suivis (~8 ms)
+- "farneback-pyramid"  : Farneback sur un niveau réduit de la pyramide (~5 ms)
+- "frame-diff"         : énergie de la différence entre frames (< 1 ms)
+
+Les facteurs de calibration ramènent chaque mesure brute sur l'échelle de
+Farneback ; ils sont produits par benchmarks/bench_motion_calibration.py.
+"""
+
+import os
+from typing import Dict
+
+import cv2
+import numpy as np
+
+
+DEFAULT_MOTION_ESTIMATOR = os.getenv("ANALYZER_MOTION_ESTIMATOR", "farneback")
+
+
+class MotionEstimator:
+    """
+    Interface commune des estimateurs de mouvement.
+
+    `measure()` renvoie une mesure brute ; `score()` l'applique sur
+    l'échelle 0-100 via le facteur de calibration `calibration`.
+    """
+
+    name = "base"
+    #: Rang de coût relatif (1 = le moins cher)
+    cost_tier = 0
+    #: Facteur mesure brute -> score 0-100
+    calibration = 1.0
+    #: True si la mesure est un déplacement en pixels (dépend de la résolution)
+    resolution_dependent = True
+
+    def measure(self, prev_gray: np.ndarray, gray: np.ndarray) -> float:
+        raise NotImplementedError
+
+    def score(self, prev_gray: np.ndarray, gray: np.ndarray, scale: float = 1.0) -> float:
+        """
+        Args:
+            prev_gray, gray: Frames consécutives échantillonnées (niveaux de gris)
+            scale: Rapport résolution d'origine / résolution des frames, pour
+                   les mesures exprimées en pixels
+        """
+        raw = self.measure(prev_gray, gray)
+        if self.resolution_dependent and scale != 1.0:
+            raw *= scale
+        return min(100, raw * self.calibration)
+
+
+class FarnebackEstimator(MotionEstimator):
+    """Flux optique dense Farneback à la résolution des frames (référence)"""
+
+    name = "farneback"
+    cost_tier = 4
+    calibration = 10
+
+    def measure(self, prev_gray: np.ndarray, gray: np.ndarray) -> float:
+        flow = cv2.calcOpticalFlowFarneback(
+            prev_gray, gray, None, 0.5, 3, 15, 3, 5, 1.2, 0
+        )
+        magnitude = np.sqrt(flow[..., 0]**2 + flow[..., 1]**2)
+        return np.mean(magnitude)
+
+
+class PyramidFarnebackEstimator(MotionEstimator):
+    """
+    Farneback sur un niveau réduit de la pyramide gaussienne.
+
+    Chaque niveau divise la résolution par 2 (et le coût par ~4) ; les
+    déplacements sont remis à l'échelle du niveau 0.
+    """
+
+    name = "farneback-pyramid"
+    cost_tier = 2
+    calibration = 10.0
+
+    def __init__(self, level: int = 2):
+        self.level = level
+
+    def measure(self, prev_gray: np.ndarray, gray: np.ndarray) -> float:
+        for _ in range(self.level):
+            prev_gray = cv2.pyrDown(prev_gray)
+            gray = cv2.pyrDown(gray)
+        flow = cv2.calcOpticalFlowFarneback(
+            prev_gray, gray, None, 0.5, 2, 9, 3, 5, 1.1, 0
+        )
+        magnitude = np.sqrt(flow[..., 0]**2 + flow[..., 1]**2)
+        return float(np.mean(magnitude)) * (2 ** self.level)
+
+
+class LucasKanadeEstimator(MotionEstimator):
+    """
+    Flux optique épars Lucas-Kanade sur des coins (Shi-Tomasi) suivis.
+
+    Le déplacement moyen des points suivis approxime la magnitude moyenne du
+    flux dense ; une frame sans coin exploitable compte comme immobile.
+    """
+
+    name = "lucas-kanade"
+    cost_tier = 3
+    calibration = 9.7
+
+    def __init__(self, max_corners: int = 200):
+        self.max_corners = max_corners
+
+    def measure(self, prev_gray: np.ndarray, gray: np.ndarray) -> float:
+        points = cv2.goodFeaturesToTrack(prev_gray, maxCorners=self.max_corners,
+                                         qualityLevel=0.01, minDistance=7, blockSize=7)
+        if points is None or len(points) == 0:
+            return 0.0
+        next_points, status, _ = cv2.calcOpticalFlowPyrLK(
+            prev_gray, gray, points, None, winSize=(15, 15), maxLevel=3
+        )
+        if next_points is None:
+            return 0.0
+        tracked = status.reshape(-1) == 1
+        if not np.any(tracked):
+            return 0.0
+        displacement = np.linalg.norm((next_points - points).reshape(-1, 2)[tracked], axis=1)
+        return float(np.mean(displacement))
+
+
+class FrameDifferenceEstimator(MotionEstimator):
+    """
+    Énergie de la différence absolue entre frames (moyenne en niveaux de gris).
+
+    Ne mesure pas un déplacement : la valeur dépend du contraste de l'image
+    plus que de sa résolution.
+    """
+
+    name = "frame-diff"
+    cost_tier = 1
+    calibration = 1.5
+    resolution_dependent = False
+
+    def measure(self, prev_gray: np.ndarray, gray: np.ndarray) -> float:
+        return float(np.mean(cv2.absdiff(prev_gray, gray)))
+
+
+MOTION_ESTIMATORS: Dict[str, type] = {
+    FarnebackEstimator.name: FarnebackEstimator,
+    PyramidFarnebackEstimator.name: PyramidFarnebackEstimator,
+    LucasKanadeEstimator.name: LucasKanadeEstimator,
+    FrameDifferenceEstimator.name: FrameDifferenceEstimator,
+}
+
+
+def get_motion_estimator(name: str = None) -> MotionEstimator:
+    """
+    Instancie un estimateur par son nom (défaut: ANALYZER_MOTION_ESTIMATOR).
+    """
+    name = name or DEFAULT_MOTION_ESTIMATOR
+    if name not in MOTION_ESTIMATORS:
+        raise ValueError(f"Estimateur de mouvement inconnu: {name} (disponibles: {', '.join(MOTION_ESTIMATORS)})")
+    return MOTION_ESTIMATORS[name]()
@@ -0,0 +1,190 @@
+"""
+Analyse parallèle par tranches temporelles pour PacingScore
+
+La fenêtre analysée est découpée en N tranches consécutives, analysées
+chacune dans un processus séparé (ProcessPoolExecutor) par le moteur
+single-pass, puis fusionnées :
+- chaque tranche commence à décoder un peu avant sa fenêtre propre (une
+  frame pour le score de cut, jusqu'à MOTION_FRAME_STEP frames pour le
+  mouvement) ; ce recouvrement est écarté à la fusion ;
+- les tranches renvoient le score de cut de chaque frame de leur fenêtre
+  propre, et le filtre de longueur minimale de scène est rejoué en série
+  sur la série complète : un cut vu à une frontière n'est compté qu'une
+  fois, et num_scenes / ASL sont ceux d'une analyse en série ;
+- séries de luminosité et scores de mouvement sont concaténés dans l'ordre.
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+from scenedetect.frame_timecode import FrameTimecode
+
+from analysis_engine import (
+    FusedAnalysisEngine, frame_window, segment_duration, replay_cuts, summarize_luminance,
+    MOTION_FRAME_STEP, MOTION_MAX_SECONDS
+)
+from frame_source import probe_video
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_WORKERS = int(os.getenv("ANALYZER_WORKERS", 1))
+# En dessous, le lancement des processus coûte plus que le parallélisme ne rapporte
+MIN_CHUNK_SECONDS = float(os.getenv("ANALYZER_MIN_CHUNK_SECONDS", 20))
+
+
+def plan_chunks(start_frame: int, end_frame: int, chunks: int,
+                motion_window: Tuple[int, int] = None) -> List[Tuple[int, int, int]]:
+    """
+    Découpe [start_frame, end_frame) en tranches contiguës.
+
+    Retourne une liste de (decode_start, own_start, own_end) ; les fenêtres
+    propres [own_start, own_end) forment une partition de la fenêtre.
+    """
+    total = end_frame - start_frame
+    plan = []
+    for i in range(chunks):
+        own_start = start_frame + total * i // chunks
+        own_end = start_frame + total * (i + 1) // chunks
+        decode_start = own_start
+        if i > 0:
+            # Frame précédente : score de cut de la première frame de la tranche
+            decode_start = own_start - 1
+            if motion_window is not None and motion_window[0] < own_start < motion_window[1]:
+                # Dernière frame échantillonnée avant la tranche
+                seed = max(motion_window[0], (own_start - 1) // MOTION_FRAME_STEP * MOTION_FRAME_STEP)
+                decode_start = min(decode_start, seed)
+        plan.append((decode_start, own_start, own_end))
+    return plan
+
+
+def merge_frame_scores(plan: List[Tuple[int, int, int]], outputs: List[Dict[str, Any]]) -> Optional[np.ndarray]:
+    """
+    Concatène les scores de cut des tranches, après avoir vérifié qu'ils se
+    suivent sans trou ni doublon. Retourne None sinon.
+    """
+    parts = []
+    expected = plan[0][1]
+    for (_, own_start, _), output in zip(plan, outputs):
+        scores = output["frame_scores"]
+        if not len(scores):
+            continue
+        if output["first_scored_frame"] != expected or own_start != expected:
+            return None
+        parts.append(scores)
+        expected += len(scores)
+    if not parts:
+        return np.empty(0, dtype=np.float64)
+    return np.concatenate(parts)
+
+
+class ParallelAnalysisEngine:
+    """
+    Exécute FusedAnalysisEngine sur N tranches en parallèle et renvoie un
+    résultat au même format que FusedAnalysisEngine.run().
+    """
+
+    def __init__(self, engine: FusedAnalysisEngine, min_chunk_seconds: float = MIN_CHUNK_SECONDS):
+        self.engine = engine
+        self.min_chunk_seconds = min_chunk_seconds
+
+    def run(self, video_path: str, analyze_motion: bool = True, analyze_flashes: bool = True,
+            start_time: float = 0, end_time: float = None, workers: int = None) -> Dict[str, Any]:
+        """
+        Args:
+            workers: Nombre de processus (défaut: ANALYZER_WORKERS) ; la
+                     fenêtre n'est découpée que si chaque tranche dure au
+                     moins `min_chunk_seconds`, sinon l'analyse reste en série
+        """
+        workers = workers or DEFAULT_WORKERS
+        # Un flux réseau (StreamInput) ne se lit que dans l'ordre
+        if workers < 2 or not isinstance(video_path, str):
+            return self.engine.run(video_path, analyze_motion=analyze_motion, analyze_flashes=analyze_flashes,
+                                   start_time=start_time, end_time=end_time)
+        started = time.perf_counter()
+        fps, total_frames, _ = probe_video(video_path)
+        total_duration = total_frames / fps if fps > 0 else 0
+
+        analyzed_duration = segment_duration(total_duration, start_time, end_time)
+
+        start_frame, end_frame = frame_window(fps, total_frames, start_time, end_time)
+        chunks = min(workers, int((end_frame - start_frame) / (self.min_chunk_seconds * fps)))
+        if chunks < 2:
+            return self.engine.run(video_path, analyze_motion=analyze_motion, analyze_flashes=analyze_flashes,
+                                   start_time=start_time, end_time=end_time)
+
+        motion_window = None
+        if analyze_motion and total_duration > 0:
+            motion_end = start_time + min(MOTION_MAX_SECONDS, analyzed_duration)
+            motion_window = frame_window(fps, total_frames, start_time, motion_end)
+
+        plan = plan_chunks(start_frame, end_frame, chunks, motion_window)
+        try:
+            with ProcessPoolExecutor(max_workers=chunks) as executor:
+                futures = [
+                    executor.submit(
+                        self.engine.run_chunk, video_path, decode_start, own_start, own_end,
+                        analyze_flashes, motion_window, i == chunks - 1, end_time
+                    )
+                    for i, (decode_start, own_start, own_end) in enumerate(plan)
+                ]
+                outputs = [future.result() for future in futures]
+        except Exception as e:
+            logger.warning(f"Analyse parallèle impossible ({e}), analyse en série")
+            return self.engine.run(video_path, analyze_motion=analyze_motion, analyze_flashes=analyze_flashes,
+                                   start_time=start_time, end_time=end_time)
+
+        frame_scores = merge_frame_scores(plan, outputs)
+        if frame_scores is None:
+            logger.warning("Scores de cut discontinus entre tranches, analyse en série")
+            return self.engine.run(video_path, analyze_motion=analyze_motion, analyze_flashes=analyze_flashes,
+                                   start_time=start_time, end_time=end_time)
+
+        # Cuts -> liste de scènes, comme SceneManager.get_scene_list()
+        frame_rate = float(fps)
+        cuts = replay_cuts(frame_scores, start_frame, frame_rate, self.engine.threshold, self.engine.min_scene_len)
+        scene_list = []
+        if cuts:
+            boundaries = [start_frame] + cuts + [outputs[-1]["end_frame"]]
+            scene_list = [
+                (FrameTimecode(scene_start, frame_rate), FrameTimecode(scene_end, frame_rate))
+                for scene_start, scene_end in zip(boundaries[:-1], boundaries[1:])
+            ]
+
+        flash_analysis = None
+        luminance = None
+        if analyze_flashes and all(output["luminance"] is not None for output in outputs):
+            luminance = np.concatenate([output["luminance"] for output in outputs])
+            flash_analysis = summarize_luminance(luminance, fps, first_frame=start_frame)
+
+        motion_intensity = None
+        if motion_window is not None and all(output["motion_scores"] is not None for output in outputs):
+            motion_scores = [score for output in outputs for score in output["motion_scores"]]
+            motion_intensity = round(np.mean(motion_scores), 2) if motion_scores else 0.0
+
+        elapsed = time.perf_counter() - started
+        frames_decoded = sum(output["frames_decoded"] for output in outputs)
+        stats = {
+            "frames_decoded": frames_decoded,
+            "decode_seconds": round(elapsed, 3),
+            "frames_per_second": round(frames_decoded / elapsed, 1) if elapsed > 0 else 0.0,
+            "frame_source": outputs[0]["frame_source"],
+            "frame_size": outputs[0]["frame_size"],
+            "chunks": chunks
+        }
+
+        return {
+            "scene_list": scene_list,
+            "fps": fps,
+            "total_duration": total_duration,
+            "analyzed_duration": analyzed_duration,
+            "flash_analysis": flash_analysis,
+            "luminance": luminance,
+            "luminance_first_frame": start_frame,
+            "motion_intensity": motion_intensity,
+            "stats": stats
+        }
@@ -0,0 +1,241 @@
+"""
+Pipeline à étages pour le worker PacingScore
+
+Chaque étage (recherche / probe, téléchargement, analyse...) dispose de son
+propre pool de threads et d'une file d'entrée bornée : un étage saturé
+bloque l'étage précédent au lieu d'accumuler du travail (et des fichiers).
+
+Les renvois vers un étage amont (candidat suivant après un échec) passent
+par une file de reprise non bornée, prioritaire : deux étages pleins ne
+peuvent pas se bloquer mutuellement.
+"""
+
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class Stage:
+    """
+    Étage du pipeline : `workers` threads qui appellent `handler(item)` sur
+    les éléments de la file d'entrée.
+
+    Le handler transmet lui-même ses résultats à l'étage suivant
+    (submit) ou à un étage amont (resubmit). `on_error(item, exc)` est
+    appelé si le handler lève une exception (l'élément est sinon perdu).
+    """
+
+    def __init__(self, name: str, handler: Callable[[Any], None], workers: int = 1, queue_size: int = 2,
+                 on_error: Callable[[Any, Exception], None] = None):
+        self.name = name
+        self.handler = handler
+        self.on_error = on_error
+        self.workers = max(1, workers)
+        self.inbox: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, queue_size))
+        self.retries: "queue.Queue[Any]" = queue.Queue()
+        self._threads: List[threading.Thread] = []
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._busy = 0
+        self._busy_seconds = 0.0
+        self._busy_since: Dict[int, float] = {}
+        self._processed = 0
+        self._errors = 0
+
+    # ---- Entrées ----
+
+    def submit(self, item: Any, timeout: float = None) -> bool:
+        """Ajoute un élément ; bloque tant que la file est pleine (ou jusqu'au timeout)"""
+        while not self._stop.is_set():
+            try:
+                self.inbox.put(item, timeout=0.5 if timeout is None else timeout)
+                return True
+            except queue.Full:
+                if timeout is not None:
+                    return False
+        return False
+
+    def resubmit(self, item: Any):
+        """Renvoi depuis un étage aval : file prioritaire, jamais bloquante"""
+        self.retries.put(item)
+
+    def has_capacity(self) -> bool:
+        return not self.inbox.full()
+
+    def pending(self) -> int:
+        return self.inbox.qsize() + self.retries.qsize()
+
+    # ---- Exécution ----
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"{self.name}-{i + 1}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        self._stop.set()
+
+    def join(self, timeout: float = None):
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _next_item(self) -> Optional[Any]:
+        try:
+            return self.retries.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            return self.inbox.get(timeout=0.5)
+        except queue.Empty:
+            return None
+
+    def _run(self):
+        ident = threading.get_ident()
+        while not self._stop.is_set():
+            item = self._next_item()
+            if item is None:
+                continue
+            with self._lock:
+                self._busy += 1
+                self._busy_since[ident] = time.monotonic()
+            try:
+                self.handler(item)
+            except Exception as e:
+                with self._lock:
+                    self._errors += 1
+                logger.error(f"[{self.name}] Erreur non gérée: {e}", exc_info=True)
+                if self.on_error:
+                    try:
+                        self.on_error(item, e)
+                    except Exception as callback_error:
+                        logger.error(f"[{self.name}] Échec du traitement d'erreur: {callback_error}")
+            finally:
+                with self._lock:
+                    self._busy -= 1
+                    self._busy_seconds += time.monotonic() - self._busy_since.pop(ident)
+                    self._processed += 1
+
+    # ---- Statistiques ----
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Compteurs cumulés (temps occupé inclus pour les traitements en cours)"""
+        now = time.monotonic()
+        with self._lock:
+            busy_seconds = self._busy_seconds + sum(now - since for since in self._busy_since.values())
+            return {
+                "busy_seconds": busy_seconds,
+                "busy": self._busy,
+                "processed": self._processed,
+                "errors": self._errors,
+                "pending": self.pending()
+            }
+
+
+class DiskBudget:
+    """
+    Espace disque occupé par les vidéos téléchargées en attente d'analyse.
+
+    Un téléchargement attend (`wait_for_room`) tant que le budget est
+    dépassé ; un fichier est toujours autorisé quand aucun n'est en attente.
+    La taille n'étant connue qu'après coup, le budget peut être dépassé d'un
+    fichier par téléchargement simultané. Un fichier partagé par plusieurs
+    tâches (même segment) compte une fois, jusqu'au dernier `remove`.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._files: Dict[str, int] = {}
+        self._refs: Dict[str, int] = {}
+        self._condition = threading.Condition()
+
+    @property
+    def used_bytes(self) -> int:
+        with self._condition:
+            return sum(self._files.values())
+
+    def wait_for_room(self, stop: threading.Event = None) -> bool:
+        """Bloque jusqu'à ce qu'un fichier puisse être ajouté ; False si `stop` est levé"""
+        with self._condition:
+            while self._files and sum(self._files.values()) >= self.max_bytes:
+                if stop is not None and stop.is_set():
+                    return False
+                self._condition.wait(timeout=0.5)
+            return True
+
+    def add(self, path: str):
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return
+        with self._condition:
+            self._files[path] = size
+            self._refs[path] = self._refs.get(path, 0) + 1
+
+    def remove(self, path: str):
+        with self._condition:
+            refs = self._refs.get(path, 0) - 1
+            if refs > 0:
+                self._refs[path] = refs
+                return
+            self._refs.pop(path, None)
+            if self._files.pop(path, None) is not None:
+                self._condition.notify_all()
+
+
+class StageMonitor:
+    """
+    Journalise périodiquement l'occupation de chaque étage, ainsi que des
+    compteurs annexes (`counters` : nom -> fonction retournant un dict).
+    """
+
+    def __init__(self, stages: List[Stage], interval: float = 60.0,
+                 counters: Dict[str, Callable[[], Dict[str, Any]]] = None):
+        self.stages = stages
+        self.interval = interval
+        self.counters = counters or {}
+        self._stop = threading.Event()
+        self._previous = {stage.name: stage.snapshot() for stage in stages}
+        self._previous_time = time.monotonic()
+
+    def start(self):
+        threading.Thread(target=self._run, name="stage-monitor", daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+    def report(self) -> Dict[str, Dict[str, Any]]:
+        """Occupation de chaque étage depuis le dernier rapport"""
+        now = time.monotonic()
+        elapsed = max(1e-6, now - self._previous_time)
+        report = {}
+        for stage in self.stages:
+            current = stage.snapshot()
+            previous = self._previous[stage.name]
+            busy = current["busy_seconds"] - previous["busy_seconds"]
+            report[stage.name] = {
+                "utilization": round(100.0 * busy / (elapsed * stage.workers), 1),
+                "workers": stage.workers,
+                "busy": current["busy"],
+                "pending": current["pending"],
+                "processed": current["processed"] - previous["processed"],
+                "errors": current["errors"] - previous["errors"]
+            }
+            self._previous[stage.name] = current
+        self._previous_time = now
+        return report
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            for name, stats in self.report().items():
+                logger.info(f"📈 [{name}] occupation {stats['utilization']:.0f}% "
+                            f"({stats['busy']}/{stats['workers']} actifs), "
+                            f"file {stats['pending']}, traités {stats['processed']}, erreurs {stats['errors']}")
+            for name, counter in self.counters.items():
+                values = ", ".join(f"{key} {value}" for key, value in counter().items())
+                logger.info(f"📈 [{name}] {values}")
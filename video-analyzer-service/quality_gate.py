@@ -0,0 +1,73 @@
+"""
+Contrôle qualité progressif des candidats PacingScore
+
+Pendant l'analyse, le moteur transmet au "gate" le nombre de cuts déjà
+détectés et l'avancement du décodage. Le gate peut :
+- accepter le candidat : les étapes coûteuses différées (mouvement) sont
+  alors calculées ;
+- l'abandonner : le décodage s'arrête immédiatement, sans flux optique ;
+- laisser l'analyse continuer.
+"""
+
+from typing import Optional
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class QualityGate:
+    """
+    Interface des contrôles qualité progressifs.
+
+    `check()` est appelé pour chaque frame décodée de la fenêtre analysée ;
+    la première décision ACCEPT ou ABORT est définitive.
+    """
+
+    CONTINUE = "continue"
+    ACCEPT = "accept"
+    ABORT = "abort"
+
+    def check(self, cuts: int, frames_done: int, frames_total: int, fps: float) -> str:
+        """
+        Args:
+            cuts: Cuts détectés jusqu'ici
+            frames_done: Frames de la fenêtre déjà décodées
+            frames_total: Frames de la fenêtre (déclarées par le conteneur)
+            fps: Images par seconde
+        """
+        raise NotImplementedError
+
+
+class SceneCountGate(QualityGate):
+    """
+    Exige au moins `min_scenes` scènes sur la fenêtre analysée (règle
+    "quality check" du worker).
+
+    Accepte dès que le nombre de scènes est atteint. Abandonne dès que les
+    frames restantes ne peuvent plus suffire : au plus une scène toutes les
+    `min_scene_len` frames (borne exacte du détecteur), ou au plus
+    `max_cuts_per_second` cuts par seconde si défini (borne empirique, plus
+    agressive).
+    """
+
+    def __init__(self, min_scenes: int = 15, min_scene_len: int = 15,
+                 max_cuts_per_second: Optional[float] = None):
+        self.min_scenes = min_scenes
+        self.min_scene_len = min_scene_len
+        self.max_cuts_per_second = max_cuts_per_second
+
+    def max_remaining_cuts(self, frames_left: int, fps: float) -> int:
+        """Nombre maximal de cuts encore possibles sur `frames_left` frames"""
+        bound = frames_left // max(1, self.min_scene_len)
+        if self.max_cuts_per_second is not None and fps > 0:
+            bound = min(bound, int(frames_left / fps * self.max_cuts_per_second))
+        return bound
+
+    def check(self, cuts: int, frames_done: int, frames_total: int, fps: float) -> str:
+        # Une vidéo avec N cuts compte N + 1 scènes
+        if cuts + 1 >= self.min_scenes:
+            return self.ACCEPT
+        frames_left = max(0, frames_total - frames_done)
+        if cuts + 1 + self.max_remaining_cuts(frames_left, fps) < self.min_scenes:
+            return self.ABORT
+        return self.CONTINUE
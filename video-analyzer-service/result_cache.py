@@ -0,0 +1,186 @@
+"""
+Cache des résultats d'analyse, partagé par l'API et le worker
+
+Une même vidéo (même URL, même segment) est souvent redemandée : le
+résultat d'analyze_video est conservé sous une clé qui couvre tout ce dont
+il dépend :
+- URL normalisée (voir metadata_cache.normalize_url) ;
+- segment analysé (début, durée) ;
+- options (analyze_motion, analyze_flashes) ;
+- configuration de l'analyseur (seuil, min_scene_len, source de frames,
+  estimateur de mouvement, unité des segments, ANALYZER_VERSION : voir
+  VideoAnalyzer.analysis_signature).
+
+Stockage local SQLite (mode WAL, fichier partageable entre processus),
+taille totale bornée avec éviction LRU et TTL. Optionnellement, une table
+Supabase (database/analysis_result_cache.sql) sert de second niveau commun
+à toutes les machines. Seuls les résultats réussis sont conservés.
+"""
+
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from typing import Any, Dict, Optional
+
+from metadata_cache import normalize_url
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+# Dossier des caches partagés par l'API et le worker : un seul réglage, indépendant
+# de TEMP_DIR (dossier de travail propre à chaque service), pour qu'ils ouvrent les mêmes fichiers
+CACHE_DIR = os.getenv("CACHE_DIR", "/tmp/videos")
+RESULT_CACHE_PATH = os.getenv("RESULT_CACHE_PATH", os.path.join(CACHE_DIR, "result_cache.sqlite"))
+RESULT_CACHE_TTL = int(os.getenv("RESULT_CACHE_TTL", 7 * 24 * 3600))  # secondes
+RESULT_CACHE_MAX_MB = int(os.getenv("RESULT_CACHE_MAX_MB", 256))
+RESULT_CACHE_SUPABASE = os.getenv("RESULT_CACHE_SUPABASE", "false").lower() in ("1", "true", "yes")
+
+
+def analysis_key(video_url: str, start_time: Optional[float], duration: Optional[float],
+                 signature: Dict[str, Any], analyze_motion: bool = True, analyze_flashes: bool = True) -> str:
+    """Clé SHA-256 d'une analyse (segment d'une URL avec une configuration donnée)"""
+    payload = {
+        "url": normalize_url(video_url),
+        "start": round(float(start_time or 0), 3),
+        "duration": round(float(duration), 3) if duration is not None else None,
+        "analyze_motion": bool(analyze_motion),
+        "analyze_flashes": bool(analyze_flashes),
+        "analyzer": signature
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+class ResultCache:
+    """Cache SQLite clé d'analyse -> résultat d'analyze_video, avec second niveau Supabase optionnel"""
+
+    def __init__(self, path: str, ttl: int = RESULT_CACHE_TTL, max_mb: int = RESULT_CACHE_MAX_MB,
+                 remote=None):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_mb * 1024 * 1024
+        # Objet avec get_cached_analysis(key) / save_cached_analysis(key, result) (SupabaseManager)
+        self.remote = remote
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.remote_hits = 0
+        self.misses = 0
+        self.stores = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS analysis_results ("
+                " key TEXT PRIMARY KEY, result TEXT NOT NULL, size INTEGER NOT NULL,"
+                " stored_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS analysis_results_accessed ON analysis_results (accessed_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        """Une connexion par thread (sqlite3 ne partage pas les connexions entre threads)"""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=10)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def _count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Résultat en cache (local, puis Supabase), marqué "cached": True ; sinon None"""
+        now = time.time()
+        try:
+            with self._connection() as connection:
+                row = connection.execute(
+                    "SELECT result FROM analysis_results WHERE key = ? AND stored_at >= ?", (key, now - self.ttl)
+                ).fetchone()
+                if row is not None:
+                    connection.execute("UPDATE analysis_results SET accessed_at = ? WHERE key = ?", (now, key))
+        except sqlite3.Error as e:
+            logger.warning(f"Cache des résultats indisponible ({e})")
+            row = None
+        if row is not None:
+            self._count("hits")
+            return dict(json.loads(row[0]), cached=True)
+
+        if self.remote is not None:
+            try:
+                result = self.remote.get_cached_analysis(key)
+            except Exception as e:
+                logger.warning(f"Cache des résultats Supabase indisponible ({e})")
+                result = None
+            if result:
+                self._count("remote_hits")
+                self._store_local(key, result)
+                return dict(result, cached=True)
+
+        self._count("misses")
+        return None
+
+    def put(self, key: str, result: Dict[str, Any]):
+        """Conserve un résultat réussi (localement et dans Supabase si configuré)"""
+        if not result.get("success"):
+            return
+        result = {field: value for field, value in result.items() if field != "cached"}
+        self._store_local(key, result)
+        self._count("stores")
+        if self.remote is not None:
+            try:
+                self.remote.save_cached_analysis(key, result)
+            except Exception as e:
+                logger.warning(f"Cache des résultats Supabase indisponible ({e})")
+
+    def _store_local(self, key: str, result: Dict[str, Any]):
+        encoded = json.dumps(result)
+        now = time.time()
+        try:
+            with self._connection() as connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO analysis_results (key, result, size, stored_at, accessed_at)"
+                    " VALUES (?, ?, ?, ?, ?)", (key, encoded, len(encoded), now, now)
+                )
+                self._evict(connection, now)
+        except sqlite3.Error as e:
+            logger.warning(f"Cache des résultats indisponible ({e})")
+
+    def _evict(self, connection: sqlite3.Connection, now: float):
+        connection.execute("DELETE FROM analysis_results WHERE stored_at < ?", (now - self.ttl,))
+        # Les plus récemment utilisés d'abord : au-delà du budget, suppression
+        connection.execute(
+            "DELETE FROM analysis_results WHERE key IN ("
+            " SELECT key FROM (SELECT key, SUM(size) OVER (ORDER BY accessed_at DESC, key) AS total"
+            " FROM analysis_results) WHERE total > ?)",
+            (self.max_bytes,)
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits, remote_hits, misses, stores = self.hits, self.remote_hits, self.misses, self.stores
+        lookups = hits + remote_hits + misses
+        return {
+            "hits": hits,
+            "remote_hits": remote_hits,
+            "misses": misses,
+            "stores": stores,
+            "hit_rate": round(100.0 * (hits + remote_hits) / lookups, 1) if lookups else 0.0
+        }
+
+
+def create_result_cache() -> Optional[ResultCache]:
+    """Cache configuré par l'environnement (RESULT_CACHE_PATH vide = désactivé)"""
+    if not RESULT_CACHE_PATH:
+        return None
+    remote = None
+    if RESULT_CACHE_SUPABASE:
+        from supabase_manager import supabase_manager
+        remote = supabase_manager
+    return ResultCache(RESULT_CACHE_PATH, remote=remote)
@@ -0,0 +1,166 @@
+"""
+Écriture différée (write-behind) des résultats du worker
+
+Les threads d'analyse ne font plus d'appel Supabase par tâche terminée :
+scores et changements de statut sont mis en tampon puis écrits par lots
+(une requête d'upsert mollo_scores, un PATCH analysis_tasks par statut),
+dès que RESULT_BATCH_SIZE résultats attendent ou toutes les
+RESULT_FLUSH_INTERVAL secondes.
+
+Garantie : une tâche n'est marquée 'completed' qu'après l'écriture réussie
+de son score. Un lot de scores en échec est retenté aux flushs suivants ;
+après RESULT_MAX_ATTEMPTS essais la tâche passe en 'failed'. À l'arrêt, les
+tâches dont le score n'a pas pu être écrit sont remises en 'pending'.
+"""
+
+import os
+import threading
+from typing import Any, Dict, List, Tuple
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+RESULT_BATCH_SIZE = int(os.getenv("RESULT_BATCH_SIZE", 20))
+RESULT_FLUSH_INTERVAL = float(os.getenv("RESULT_FLUSH_INTERVAL", 2))  # secondes
+RESULT_MAX_ATTEMPTS = int(os.getenv("RESULT_MAX_ATTEMPTS", 3))
+# Métadonnées de la tâche recopiées dans mollo_scores (déjà dans analysis_tasks / metadata_estimations)
+RESULT_INCLUDE_METADATA = os.getenv("RESULT_INCLUDE_METADATA", "false").lower() in ("1", "true", "yes")
+
+
+class ResultWriter:
+    """Tampon des scores et statuts de tâches, vidé par un thread dédié"""
+
+    def __init__(self, manager, batch_size: int = RESULT_BATCH_SIZE,
+                 flush_interval: float = RESULT_FLUSH_INTERVAL, max_attempts: int = RESULT_MAX_ATTEMPTS):
+        self.manager = manager
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.max_attempts = max(1, max_attempts)
+        # task_id -> (ligne mollo_scores, essais déjà faits)
+        self._scores: Dict[Any, Tuple[Dict, int]] = {}
+        # Scores écrits, passage en 'completed' à (re)faire
+        self._completed: List[Any] = []
+        # task_id -> message d'erreur
+        self._failed: Dict[Any, str] = {}
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._closed = False
+        self.writes = 0
+        self.scores_saved = 0
+        self._thread = threading.Thread(target=self._run, name="result-writer", daemon=True)
+        self._thread.start()
+
+    # ---- Entrées (threads du pipeline) ----
+
+    def complete(self, task_id, score_row: Dict):
+        """Score à écrire, puis tâche à passer en 'completed'"""
+        self._add(lambda: self._scores.__setitem__(task_id, (score_row, 0)))
+
+    def fail(self, task_id, error_message: str):
+        """Tâche à passer en 'failed'"""
+        self._add(lambda: self._failed.__setitem__(task_id, error_message))
+
+    def _add(self, update):
+        with self._condition:
+            update()
+            closed = self._closed
+            if self._pending_locked() >= self.batch_size:
+                self._condition.notify()
+        if closed:
+            # Arrivée tardive (analyse terminée pendant l'arrêt) : écriture immédiate
+            self.flush()
+            self._release_unsaved()
+
+    def _pending_locked(self) -> int:
+        return len(self._scores) + len(self._completed) + len(self._failed)
+
+    def pending(self) -> int:
+        with self._condition:
+            return self._pending_locked()
+
+    # ---- Écriture ----
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if self._closed:
+                    return
+                if self._pending_locked() < self.batch_size:
+                    self._condition.wait(self.flush_interval)
+                if self._closed:
+                    return
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Erreur d'écriture des résultats: {e}", exc_info=True)
+
+    def flush(self):
+        """Écrit tout le tampon : scores, puis 'completed' des scores écrits, puis 'failed'"""
+        with self._flush_lock:
+            with self._condition:
+                scores, self._scores = self._scores, {}
+                completed, self._completed = self._completed, []
+                failed, self._failed = self._failed, {}
+            if not (scores or completed or failed):
+                return
+
+            if scores:
+                self.writes += 1
+                if self.manager.save_mollo_scores([row for row, _ in scores.values()]):
+                    self.scores_saved += len(scores)
+                    completed.extend(scores)
+                else:
+                    self._retry_scores(scores, failed)
+
+            if completed:
+                self.writes += 1
+                if not self.manager.update_tasks_status(completed, "completed"):
+                    # Scores durables : seul le statut reste à écrire
+                    with self._condition:
+                        self._completed.extend(completed)
+                else:
+                    logger.info(f"✅ {len(completed)} tâche(s) terminée(s) (écriture groupée)")
+
+            by_message: Dict[str, List[Any]] = {}
+            for task_id, message in failed.items():
+                by_message.setdefault(message, []).append(task_id)
+            for message, task_ids in by_message.items():
+                self.writes += 1
+                if not self.manager.update_tasks_status(task_ids, "failed", error_message=message):
+                    with self._condition:
+                        for task_id in task_ids:
+                            self._failed.setdefault(task_id, message)
+
+    def _retry_scores(self, scores: Dict[Any, Tuple[Dict, int]], failed: Dict[Any, str]):
+        """Lot de scores refusé : nouvel essai au prochain flush, ou tâche en échec"""
+        with self._condition:
+            for task_id, (row, attempts) in scores.items():
+                if attempts + 1 < self.max_attempts:
+                    # Un score plus récent pour la même tâche reste prioritaire
+                    self._scores.setdefault(task_id, (row, attempts + 1))
+                else:
+                    logger.error(f"Score de la tâche {task_id} non sauvegardé après {self.max_attempts} essais")
+                    failed[task_id] = "Échec de la sauvegarde du score Mollo"
+
+    def close(self):
+        """Dernier flush ; les tâches au score non écrit sont remises en 'pending'"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
+        self.flush()
+        self._release_unsaved()
+
+    def _release_unsaved(self):
+        with self._condition:
+            unsaved, self._scores = list(self._scores), {}
+            left = len(self._completed) + len(self._failed)
+        for task_id in unsaved:
+            if self.manager.release_task(task_id):
+                logger.warning(f"↩️  Score de la tâche {task_id} non sauvegardé, tâche remise en pending")
+        if left:
+            logger.error(f"{left} changement(s) de statut non écrit(s) à l'arrêt")
+
+    def stats(self) -> Dict[str, int]:
+        return {"écritures": self.writes, "scores": self.scores_saved, "en attente": self.pending()}
@@ -0,0 +1,204 @@
+"""
+Serveur de production de l'API (plusieurs processus)
+
+`python api.py` lance le serveur de développement Flask : un seul
+processus (GIL) et le mode debug. Ici :
+- le superviseur ouvre le port une fois et lance SERVER_WORKERS processus
+  (spawn : Windows comme Linux) qui se partagent ce socket ;
+- chaque processus importe l'API (VideoAnalyzer, caches, moteur yt-dlp
+  créés avant la première requête) et la sert avec Waitress
+  (SERVER_THREADS threads) ; MAX_CONCURRENT_ANALYSES borne ses analyses
+  (chaque vidéo analysée compte, voir analyzer.AnalysisSlots), les autres
+  attendent un créneau en occupant un thread : garder
+  SERVER_THREADS nettement au-dessus pour que /health et les requêtes
+  légères restent servies ;
+- un processus qui meurt est relancé ;
+- SIGTERM (ou Ctrl+C) : chaque processus refuse les nouvelles requêtes
+  (503, Retry-After), termine les requêtes et tâches en cours (au plus
+  SHUTDOWN_TIMEOUT secondes), puis arrête Waitress (server.run()
+  interrompu, server.close()).
+
+Une tâche asynchrone s'exécute dans le processus qui l'a reçue ; son état
+est partagé par JOB_STORE_PATH (voir analysis_jobs.py), si bien que
+GET /jobs/<id> répond depuis n'importe quel processus. Sans ce stockage,
+un seul processus est lancé.
+
+Usage :
+    python serve.py
+"""
+
+import os
+import time
+import signal
+import _thread
+import socket
+import threading
+import multiprocessing
+from typing import Callable, List
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", os.cpu_count() or 1))
+SERVER_THREADS = int(os.getenv("SERVER_THREADS", 16))
+SHUTDOWN_TIMEOUT = int(os.getenv("SHUTDOWN_TIMEOUT", 30))  # secondes
+HOST = os.getenv("FLASK_HOST", "0.0.0.0")
+PORT = int(os.getenv("FLASK_PORT", 5000))
+
+
+class InFlight:
+    """
+    Middleware WSGI : compte les requêtes en cours (jusqu'à la fermeture
+    de la réponse, streaming compris) et répond 503 pendant l'arrêt.
+    """
+
+    def __init__(self, app: Callable):
+        self.app = app
+        self.active = 0
+        self.draining = False
+        self._lock = threading.Lock()
+
+    def __call__(self, environ, start_response):
+        if self.draining:
+            start_response("503 Service Unavailable", [("Content-Type", "application/json"),
+                                                       ("Retry-After", "5"), ("Connection", "close")])
+            return [b'{"success": false, "error": "Serveur en cours d\'arr\\u00eat"}']
+        with self._lock:
+            self.active += 1
+        try:
+            body = self.app(environ, start_response)
+        except BaseException:
+            self._done()
+            raise
+        return _ClosingBody(body, self._done)
+
+    def _done(self):
+        with self._lock:
+            self.active -= 1
+
+
+class _ClosingBody:
+    """Corps de réponse qui signale sa fermeture par le serveur"""
+
+    def __init__(self, body, on_close: Callable[[], None]):
+        self.body = body
+        self.on_close = on_close
+
+    def __iter__(self):
+        return iter(self.body)
+
+    def close(self):
+        try:
+            if hasattr(self.body, "close"):
+                self.body.close()
+        finally:
+            self.on_close()
+
+
+def serve_worker(sock: socket.socket, stop: "multiprocessing.synchronize.Event", threads: int):
+    """Processus de service : précharge l'API puis sert `sock` jusqu'à `stop`"""
+    import waitress
+    import api
+    from analyzer import comparison_pool
+    from ytdlp_engine import get_engine
+
+    # Préchargement : rien de coûteux à construire pendant la première requête
+    get_engine()
+    comparison_pool()
+
+    app = InFlight(api.app)
+    server = waitress.create_server(app, sockets=[sock], threads=threads)
+    stopping = threading.Event()
+    drained = threading.Event()
+
+    def on_signal(*_):
+        if drained.is_set():
+            raise KeyboardInterrupt  # fin de server.run()
+        stopping.set()
+
+    signal.signal(signal.SIGTERM, on_signal)
+    signal.signal(signal.SIGINT, on_signal)
+    # Arrêt demandé par le superviseur (sous Windows, pas de SIGTERM entre processus)
+    threading.Thread(target=lambda: (stop.wait(), stopping.set()), daemon=True).start()
+
+    def drain():
+        """Requêtes et tâches en cours terminées, puis fin de server.run()"""
+        stopping.wait()
+        app.draining = True
+        deadline = time.monotonic() + SHUTDOWN_TIMEOUT
+        while time.monotonic() < deadline:
+            jobs = api.jobs.stats()
+            if app.active == 0 and jobs["queued"] == 0 and jobs["running"] == 0:
+                break
+            time.sleep(0.1)
+        else:
+            print(f"[SERVEUR] Processus {os.getpid()} : {app.active} requête(s) interrompue(s) après {SHUTDOWN_TIMEOUT}s")
+        # Réponses déjà produites envoyées par la boucle Waitress avant la fermeture
+        time.sleep(0.5)
+        drained.set()
+        _thread.interrupt_main(signal.SIGINT)
+        server.pull_trigger()  # réveille la boucle pour traiter l'interruption
+
+    threading.Thread(target=drain, daemon=True).start()
+
+    print(f"[SERVEUR] Processus {os.getpid()} prêt ({threads} threads)")
+    server.run()
+    server.close()
+    api.jobs.shutdown(wait=False)
+    print(f"[SERVEUR] Processus {os.getpid()} arrêté")
+    # Threads encore bloqués (tâche au-delà de SHUTDOWN_TIMEOUT) : ne pas les attendre
+    os._exit(0)
+
+
+def main():
+    from analysis_jobs import JOB_STORE_PATH
+
+    workers = SERVER_WORKERS
+    if workers > 1 and not JOB_STORE_PATH:
+        # GET /jobs/<id> atteindrait un processus qui ne connaît pas la tâche (404)
+        print(f"[SERVEUR] JOB_STORE_PATH vide : tâches en mémoire, 1 processus au lieu de {workers}")
+        workers = 1
+    context = multiprocessing.get_context("spawn")
+    sock = socket.create_server((HOST, PORT), backlog=1024)
+    sock.setblocking(False)
+    stop = context.Event()
+
+    def start_worker() -> multiprocessing.Process:
+        process = context.Process(target=serve_worker, args=(sock, stop, SERVER_THREADS),
+                                  name="api-worker", daemon=False)
+        process.start()
+        return process
+
+    # Pas de stop.set() dans le gestionnaire : il interromprait un stop.wait() en cours (interblocage)
+    stopping = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stopping.set())
+    signal.signal(signal.SIGINT, lambda *_: stopping.set())
+
+    print("=" * 60)
+    print(f"[SERVEUR] Production : {workers} processus x {SERVER_THREADS} threads (Waitress)")
+    print(f"[SERVEUR] URL: http://{HOST}:{PORT}")
+    print("=" * 60)
+    processes: List[multiprocessing.Process] = [start_worker() for _ in range(workers)]
+
+    while not stopping.wait(1):
+        for index, process in enumerate(processes):
+            if not process.is_alive() and not stopping.is_set():
+                print(f"[SERVEUR] Processus {process.pid} terminé (code {process.exitcode}), relance")
+                processes[index] = start_worker()
+
+    stop.set()
+    print(f"[SERVEUR] Arrêt : requêtes en cours terminées (au plus {SHUTDOWN_TIMEOUT}s)")
+    sock.close()
+    deadline = time.monotonic() + SHUTDOWN_TIMEOUT + 10
+    for process in processes:
+        process.join(max(0.0, deadline - time.monotonic()))
+        if process.is_alive():
+            print(f"[SERVEUR] Processus {process.pid} bloqué, arrêt forcé")
+            process.kill()
+            process.join()
+    print("[SERVEUR] Arrêté")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,21 +3,90 @@ Supabase Manager for PacingScore - Direct HTTP implementation
 Avoids supabase-py client issues and mirrors backend's SupabaseService.
 """
 import os
+import time
+import random
 import logging
+import threading
 import requests
+from collections import deque
 from datetime import datetime
 from typing import Dict, Any, Optional, List
+from requests.adapters import HTTPAdapter
 
 from dotenv import load_dotenv
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+# HTTP transport: pooled keep-alive connections, retries for idempotent calls
+SUPABASE_POOL_SIZE = int(os.getenv("SUPABASE_POOL_SIZE", 10))
+SUPABASE_TIMEOUT = float(os.getenv("SUPABASE_TIMEOUT", 30))
+SUPABASE_MAX_RETRIES = int(os.getenv("SUPABASE_MAX_RETRIES", 3))
+SUPABASE_BACKOFF_BASE = float(os.getenv("SUPABASE_BACKOFF_BASE", 0.5))  # seconds, doubled per attempt
+SUPABASE_BACKOFF_MAX = float(os.getenv("SUPABASE_BACKOFF_MAX", 8))
+RETRYABLE_STATUS = (429, 500, 502, 503, 504)
+# Task claiming: RPC with FOR UPDATE SKIP LOCKED (database/claim_analysis_tasks.sql) or conditional PATCH
+TASK_CLAIM_RPC = os.getenv("TASK_CLAIM_RPC", "false").lower() in ("1", "true", "yes")
+TASK_CLAIM_OVERFETCH = 2  # pending ids fetched per wanted task (conditional PATCH)
+# PATCH is not listed: a conditional PATCH (claim, release) that succeeded but whose
+# response was lost matches no row when repeated; safe PATCHes pass idempotent=True
+IDEMPOTENT_METHODS = ("GET", "HEAD", "PUT", "DELETE")
+# Shared analysis results (database/analysis_result_cache.sql)
+RESULT_CACHE_TABLE = os.getenv("RESULT_CACHE_TABLE", "analysis_result_cache")
+
+
+class RequestMetrics:
+    """Per-endpoint call latency (count, errors, retries, mean, p95 over recent calls)"""
+    
+    def __init__(self, window: int = 200):
+        self.window = window
+        self._lock = threading.Lock()
+        self._endpoints: Dict[str, Dict[str, Any]] = {}
+    
+    def record(self, key: str, seconds: float, ok: bool, retries: int):
+        with self._lock:
+            entry = self._endpoints.setdefault(key, {
+                "calls": 0, "errors": 0, "retries": 0, "total_seconds": 0.0,
+                "recent": deque(maxlen=self.window)
+            })
+            entry["calls"] += 1
+            entry["errors"] += 0 if ok else 1
+            entry["retries"] += retries
+            entry["total_seconds"] += seconds
+            entry["recent"].append(seconds)
+    
+    @staticmethod
+    def _summary(calls: int, errors: int, retries: int, total_seconds: float, recent: List[float]) -> Dict[str, Any]:
+        ordered = sorted(recent)
+        p95 = ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))] if ordered else 0.0
+        return {
+            "calls": calls,
+            "errors": errors,
+            "retries": retries,
+            "avg_ms": round(1000 * total_seconds / calls, 1) if calls else 0.0,
+            "p95_ms": round(1000 * p95, 1)
+        }
+    
+    def endpoints(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {key: self._summary(e["calls"], e["errors"], e["retries"], e["total_seconds"], list(e["recent"]))
+                    for key, e in self._endpoints.items()}
+    
+    def totals(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = list(self._endpoints.values())
+            return self._summary(
+                sum(e["calls"] for e in entries), sum(e["errors"] for e in entries),
+                sum(e["retries"] for e in entries), sum(e["total_seconds"] for e in entries),
+                [seconds for e in entries for seconds in e["recent"]]
+            )
+
 class SupabaseManager:
     """Manages Supabase database operations for PacingScore via REST API"""
     
     def __init__(self):
         """Initialize Supabase connection parameters"""
+        self.metrics = RequestMetrics()
         self.url = os.getenv("SUPABASE_URL")
         # Prefer service role key for bypassing RLS; fallback to anon/publishable
         self.key = os.getenv("SUPABASE_SERVICE_ROLE_KEY") or os.getenv("SUPABASE_KEY") or os.getenv("SUPABASE_ANON_KEY")
@@ -37,9 +106,22 @@ class SupabaseManager:
             "Content-Type": "application/json",
             "Prefer": "return=minimal"
         }
+        
+        # Shared keep-alive session: no TCP+TLS setup per call
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=SUPABASE_POOL_SIZE, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
     
-    def _request(self, method: str, endpoint: str, json: Dict = None, params: Dict = None, headers: Dict = None) -> Optional[requests.Response]:
-        """Internal helper to make authenticated requests to Supabase REST API"""
+    def _request(self, method: str, endpoint: str, json: Dict = None, params: Dict = None, headers: Dict = None,
+                 idempotent: bool = None) -> Optional[requests.Response]:
+        """
+        Internal helper to make authenticated requests to Supabase REST API.
+        
+        Idempotent calls (by default GET/HEAD/PUT/DELETE, or
+        idempotent=True) are retried on timeouts, connection errors and
+        429/5xx, with jittered exponential backoff.
+        """
         if not self.initialized:
             logger.error("Supabase manager not initialized")
             return None
@@ -48,16 +130,44 @@ class SupabaseManager:
         req_headers = self.headers.copy()
         if headers:
             req_headers.update(headers)
+        if idempotent is None:
+            idempotent = method.upper() in IDEMPOTENT_METHODS
+        attempts = 1 + (SUPABASE_MAX_RETRIES if idempotent else 0)
+        metric_key = f"{method.upper()} {endpoint.split('?', 1)[0]}"
         
-        try:
-            response = requests.request(method, url, json=json, params=params, headers=req_headers, timeout=30)
-            if response.status_code >= 400:
-                logger.error(f"Supabase error {response.status_code} on {method} {endpoint}: {response.text[:300]}")
-                return None
-            return response
-        except requests.RequestException as e:
-            logger.error(f"Supabase request failed for {method} {endpoint}: {e}")
+        started = time.perf_counter()
+        response = None
+        for attempt in range(attempts):
+            if attempt:
+                # Full jitter: spread retries of concurrent workers
+                time.sleep(random.uniform(0, min(SUPABASE_BACKOFF_MAX, SUPABASE_BACKOFF_BASE * 2 ** attempt)))
+            try:
+                response = self.session.request(method, url, json=json, params=params, headers=req_headers,
+                                                timeout=SUPABASE_TIMEOUT)
+            except requests.RequestException as e:
+                response = None
+                if attempt + 1 < attempts:
+                    logger.warning(f"Supabase request failed for {method} {endpoint}: {e}, retrying ({attempt + 1}/{attempts - 1})")
+                    continue
+                logger.error(f"Supabase request failed for {method} {endpoint}: {e}")
+                break
+            if response.status_code in RETRYABLE_STATUS and attempt + 1 < attempts:
+                logger.warning(f"Supabase error {response.status_code} on {method} {endpoint}, retrying ({attempt + 1}/{attempts - 1})")
+                continue
+            break
+        
+        ok = response is not None and response.status_code < 400
+        self.metrics.record(metric_key, time.perf_counter() - started, ok, attempt)
+        if response is None:
+            return None
+        if response.status_code >= 400:
+            logger.error(f"Supabase error {response.status_code} on {method} {endpoint}: {response.text[:300]}")
             return None
+        return response
+    
+    def stats(self) -> Dict[str, Any]:
+        """Call latency across all endpoints (see metrics.endpoints() for details)"""
+        return self.metrics.totals()
 
     # ============ NEW METHODS (Gemini Architecture) ============
     
@@ -70,41 +180,67 @@ class SupabaseManager:
     
     def get_next_pending_task(self) -> Optional[Dict]:
         """
-        Retrieve the next pending task and atomically mark it as 'processing'.
-        Orders by created_at (oldest first) to ensure FIFO.
+        Claim the oldest pending task (marked 'processing').
         Returns the task dict or None.
         """
-        # 1. Fetch first pending task (ordered by creation)
+        tasks = self.claim_pending_tasks(1)
+        return tasks[0] if tasks else None
+    
+    def claim_pending_tasks(self, limit: int = 1) -> List[Dict]:
+        """
+        Atomically claim up to `limit` pending tasks, oldest first (FIFO).
+        
+        Either through the claim_analysis_tasks RPC (FOR UPDATE SKIP LOCKED,
+        see database/claim_analysis_tasks.sql) when TASK_CLAIM_RPC is set, or
+        through a PATCH conditioned on status=eq.pending that returns only the
+        rows this worker actually switched to 'processing'. A task is never
+        claimed twice; rows lost to another worker are simply not returned.
+        
+        Claims are not retried: a lost response may hide a successful claim.
+        """
+        if TASK_CLAIM_RPC:
+            response = self._request("POST", "rpc/claim_analysis_tasks", json={"batch_size": limit})
+            tasks = response.json() if response is not None and response.status_code == 200 else []
+        else:
+            tasks = self._claim_with_conditional_patch(limit)
+        
+        tasks.sort(key=lambda task: task.get("created_at") or "")
+        for task in tasks:
+            print(f"Task {task.get('id')} claimed for processing")
+        return tasks
+    
+    def _claim_with_conditional_patch(self, limit: int) -> List[Dict]:
+        # 1. Oldest pending ids (a few extra: some may be taken concurrently)
         params = {
             "status": "eq.pending",
             "order": "created_at.asc",
-            "limit": "1",
-            "select": "*"
+            "limit": str(limit * TASK_CLAIM_OVERFETCH),
+            "select": "id"
         }
         response = self._request("GET", "analysis_tasks", params=params)
         if not response or response.status_code != 200:
-            return None
+            return []
+        ids = [row["id"] for row in response.json() if row.get("id") is not None]
+        if not ids:
+            return []
         
-        tasks = response.json()
-        if not tasks:
-            return None
-        
-        task = tasks[0]
-        task_id = task.get("id")
-        
-        # 2. Atomically mark it as processing
-        if task_id:
-            update_params = {"id": f"eq.{task_id}"}
-            update_data = {"status": "processing"}
-            patch_response = self._request("PATCH", "analysis_tasks", json=update_data, params=update_params)
-            if patch_response and patch_response.status_code in (200, 204):
-                print(f"Task {task_id} claimed for processing")
-                return task
-            else:
-                print(f"Failed to claim task {task_id}, another worker may have claimed it")
-                return None
-        
-        return task
+        # 2. Claim them only if still pending; PostgreSQL re-checks the filter row by row
+        claimed: List[Dict] = []
+        position = 0
+        while len(claimed) < limit and position < len(ids):
+            batch = ids[position:position + limit - len(claimed)]
+            position += len(batch)
+            update_params = {
+                "id": f"in.({','.join(str(task_id) for task_id in batch)})",
+                "status": "eq.pending"
+            }
+            patch_response = self._request("PATCH", "analysis_tasks", json={"status": "processing"},
+                                           params=update_params, headers={"Prefer": "return=representation"},
+                                           idempotent=False)
+            if not patch_response or patch_response.status_code != 200:
+                break
+            claimed.extend(patch_response.json())
+        return claimed
     
     def update_analysis_task_status(self, task_id: str, status: str, error_message: str = None) -> bool:
         """Update task status (processing -> completed/failed)"""
@@ -113,14 +249,16 @@ class SupabaseManager:
         if error_message:
             data["error_message"] = error_message
         # updated_at column may not exist in the schema; skip it
-        response = self._request("PATCH", endpoint, json=data)
+        # Unconditional (same final state if repeated): safe to retry
+        response = self._request("PATCH", endpoint, json=data, idempotent=True)
         return response is not None and response.status_code in (200, 204)
     
-    def save_mollo_score(self, tmdb_id: str, real_score: float, asl: float, video_url: str, scene_details: List[Dict],
-                         source: str = None, video_type: str = None,
-                         cuts_per_minute: float = None, video_duration: float = None, motion_intensity: float = None,
-                         metadata: Dict = None) -> bool:
-        """Save the actual Mollo score to mollo_scores table (upsert on tmdb_id)"""
+    @staticmethod
+    def mollo_score_row(tmdb_id: str, real_score: float, asl: float, video_url: str, scene_details: List[Dict],
+                        source: str = None, video_type: str = None,
+                        cuts_per_minute: float = None, video_duration: float = None, motion_intensity: float = None,
+                        metadata: Dict = None) -> Dict[str, Any]:
+        """Build a mollo_scores row (optional fields only when provided)"""
         data = {
             "tmdb_id": tmdb_id,
             "real_score": real_score,
@@ -142,12 +280,24 @@ class SupabaseManager:
             data["motion_intensity"] = motion_intensity
         if metadata is not None:
             data["metadata"] = metadata
+        return data
+    
+    def save_mollo_score(self, tmdb_id: str, real_score: float, asl: float, video_url: str, scene_details: List[Dict],
+                         source: str = None, video_type: str = None,
+                         cuts_per_minute: float = None, video_duration: float = None, motion_intensity: float = None,
+                         metadata: Dict = None) -> bool:
+        """Save the actual Mollo score to mollo_scores table (upsert on tmdb_id)"""
+        data = self.mollo_score_row(tmdb_id, real_score, asl, video_url, scene_details, source=source,
+                                    video_type=video_type, cuts_per_minute=cuts_per_minute,
+                                    video_duration=video_duration, motion_intensity=motion_intensity,
+                                    metadata=metadata)
         
         logger.info(f"[DEBUG] Saving mollo_score: tmdb_id={tmdb_id}, data_keys={list(data.keys())}")
         # Use merge-duplicates to perform upsert
         params = {"on_conflict": "tmdb_id"}
         headers = {"Prefer": "resolution=merge-duplicates"}
-        response = self._request("POST", "mollo_scores", json=data, params=params, headers=headers)
+        # Upsert on tmdb_id: safe to retry
+        response = self._request("POST", "mollo_scores", json=data, params=params, headers=headers, idempotent=True)
         logger.info(f"[DEBUG] Response status: {response.status_code if response else 'None'}, text: {response.text[:200] if response else 'None'}")
         if response and response.status_code in (200, 201):
             logger.info(f"Mollo score saved for TMDB ID {tmdb_id} (score: {real_score:.1f}, ASL: {asl:.2f}s)")
@@ -158,12 +308,126 @@ class SupabaseManager:
             logger.error(f"Failed to save mollo_score for TMDB ID {tmdb_id}. Status: {status}, Response: {text[:300]}")
             return False
     
+    def save_mollo_scores(self, rows: List[Dict]) -> bool:
+        """
+        Upsert several mollo_scores rows, one request per key set.
+        
+        PostgREST bulk inserts need identical keys in every row, and one
+        statement cannot update the same tmdb_id twice: rows are deduplicated
+        (last wins) and grouped by key set (missing keys are not filled with
+        nulls, which would overwrite stored values). Each request is atomic,
+        the call is not: on failure, groups already sent stay written and
+        False is returned. Upserts, so retrying the whole call is safe.
+        """
+        latest = {row["tmdb_id"]: row for row in rows}
+        groups: Dict[tuple, List[Dict]] = {}
+        for row in latest.values():
+            groups.setdefault(tuple(sorted(row)), []).append(row)
+        
+        params = {"on_conflict": "tmdb_id"}
+        headers = {"Prefer": "resolution=merge-duplicates"}
+        for group in groups.values():
+            response = self._request("POST", "mollo_scores", json=group, params=params, headers=headers,
+                                     idempotent=True)
+            if not response or response.status_code not in (200, 201):
+                logger.error(f"Failed to save {len(group)} mollo_scores rows")
+                return False
+        logger.info(f"{len(latest)} Mollo scores saved")
+        return True
+    
+    def update_tasks_status(self, task_ids: List[str], status: str, error_message: str = None) -> bool:
+        """Same status (and error message) for several tasks in one PATCH"""
+        if not task_ids:
+            return True
+        data = {"status": status}
+        if error_message:
+            data["error_message"] = error_message
+        params = {"id": f"in.({','.join(str(task_id) for task_id in task_ids)})"}
+        # Unconditional (same final state if repeated): safe to retry
+        response = self._request("PATCH", "analysis_tasks", json=data, params=params, idempotent=True)
+        return response is not None and response.status_code in (200, 204)
+    
+    def get_cached_analysis(self, key: str) -> Optional[Dict]:
+        """Stored analyze_video result for a result cache key (see result_cache.py), or None"""
+        params = {"key": f"eq.{key}", "select": "result", "limit": "1"}
+        response = self._request("GET", RESULT_CACHE_TABLE, params=params)
+        rows = response.json() if response is not None and response.status_code == 200 else []
+        return rows[0]["result"] if rows else None
+    
+    def save_cached_analysis(self, key: str, result: Dict) -> bool:
+        """Upsert an analyze_video result under its result cache key"""
+        data = {"key": key, "result": result, "stored_at": datetime.now().isoformat()}
+        response = self._request("POST", RESULT_CACHE_TABLE, json=data, params={"on_conflict": "key"},
+                                 headers={"Prefer": "resolution=merge-duplicates"}, idempotent=True)
+        return response is not None and response.status_code in (200, 201)
+    
+    @staticmethod
+    def _without_details(data: Dict) -> Dict:
+        """Copy of a result without scene lists and luminance curves (kept out of the history table)"""
+        return {k: SupabaseManager._without_details(v) if isinstance(v, dict) else v
+                for k, v in data.items() if k not in ("scene_details", "scenes", "luminance")}
+    
+    @staticmethod
+    def analysis_row(result: Dict, video_url: str, title: str = None) -> Dict:
+        """video_analyses row (database/video_analyses.sql) for an analyze_video, compare or trailer result"""
+        analysis = result.get("trailer_analysis") or result
+        asl = analysis.get("average_shot_length", analysis.get("asl"))
+        evaluation = analysis.get("evaluation") or {}
+        return {
+            "video_path": video_url,
+            "title": title,
+            "series_title": title,
+            "pacing_score": analysis.get("pacing_score"),
+            "composite_score": analysis.get("composite_score"),
+            "average_shot_length": asl,
+            "cuts_per_minute": round(60 / asl, 2) if asl else None,
+            "evaluation_label": evaluation.get("label"),
+            "metadata": SupabaseManager._without_details(result),
+            "created_at": datetime.now().isoformat()
+        }
+    
+    def save_analysis_result(self, result: Dict, video_url: str, title: str = None) -> bool:
+        """
+        Record an on-demand analysis in video_analyses (history).
+        Best effort: a failure is logged and returns False, the analysis
+        result is still returned to the caller.
+        """
+        try:
+            data = self.analysis_row(result, video_url, title)
+        except (AttributeError, TypeError, ZeroDivisionError) as e:
+            logger.error(f"Cannot build video_analyses row for {video_url}: {e}")
+            return False
+        response = self._request("POST", "video_analyses", json=data)
+        return response is not None and response.status_code in (200, 201)
+    
+    def get_analysis_history(self, limit: int = 10) -> List[Dict]:
+        """Most recent video_analyses rows, newest first ([] if unavailable)"""
+        params = {
+            "select": "title,series_title,video_path,pacing_score,composite_score,average_shot_length,"
+                      "cuts_per_minute,evaluation_label,created_at",
+            "order": "created_at.desc",
+            "limit": str(limit)
+        }
+        response = self._request("GET", "video_analyses", params=params)
+        return response.json() if response is not None and response.status_code == 200 else []
+    
     def mark_task_completed(self, task_id: str) -> bool:
         return self.update_analysis_task_status(task_id, "completed")
     
     def mark_task_failed(self, task_id: str, error: str) -> bool:
         return self.update_analysis_task_status(task_id, "failed", error_message=error)
 
+    def release_task(self, task_id: str) -> bool:
+        """
+        Return a claimed task to 'pending' (only if it is still 'processing').
+        True only if a row was actually released: a filtered PATCH matching
+        no row still answers 204, hence return=representation.
+        """
+        endpoint = f"analysis_tasks?id=eq.{task_id}&status=eq.processing"
+        response = self._request("PATCH", endpoint, json={"status": "pending"},
+                                 headers={"Prefer": "return=representation"})
+        return response is not None and response.status_code == 200 and bool(response.json())
+
 
 # Global instance
 supabase_manager = SupabaseManager()
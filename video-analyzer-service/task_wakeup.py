@@ -0,0 +1,157 @@
+"""
+Réveil du worker à l'arrivée de nouvelles tâches
+
+Plutôt qu'un poll toutes les 5 secondes, le worker attend après un poll vide :
+- une notification (Postgres LISTEN/NOTIFY, voir database/notify_analysis_tasks.sql),
+  auquel cas la tâche est réservée immédiatement ; un poll de sécurité
+  espacé (intervalle max) couvre les notifications perdues ;
+- sans source de notifications, un délai adaptatif : court après une tâche
+  trouvée, doublé à chaque poll vide jusqu'à POLL_IDLE_MAX_INTERVAL (5 s,
+  l'ancien intervalle fixe : le délai de prise en charge n'est jamais pire
+  qu'avant). Au repos, autant de polls vides qu'avant : seules les
+  notifications réduisent ce trafic.
+
+LocalNotifier remplace Postgres pour les tests (notification en processus).
+"""
+
+import os
+import select
+import threading
+from typing import Callable, List, Optional
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+TASK_NOTIFY_DSN = os.getenv("TASK_NOTIFY_DSN") or None  # connexion Postgres directe (LISTEN)
+TASK_NOTIFY_CHANNEL = os.getenv("TASK_NOTIFY_CHANNEL", "analysis_tasks")
+POLL_MIN_INTERVAL = float(os.getenv("POLL_MIN_INTERVAL", 0.5))  # secondes
+POLL_MAX_INTERVAL = float(os.getenv("POLL_MAX_INTERVAL", 30))  # poll de sécurité avec notifications
+POLL_IDLE_MAX_INTERVAL = float(os.getenv("POLL_IDLE_MAX_INTERVAL", 5))  # plafond sans notifications
+
+
+class LocalNotifier:
+    """Source de notifications en processus (tests, remplaçant de Postgres)"""
+
+    def __init__(self):
+        self._callbacks: List[Callable[[], None]] = []
+
+    def subscribe(self, callback: Callable[[], None]):
+        self._callbacks.append(callback)
+
+    def notify(self):
+        for callback in self._callbacks:
+            callback()
+
+    def close(self):
+        self._callbacks = []
+
+
+class PostgresNotifier:
+    """
+    LISTEN sur un canal Postgres (psycopg2, dépendance optionnelle).
+    Reconnexion automatique ; un réveil est émis après chaque reconnexion,
+    les notifications pendant la coupure étant perdues.
+    """
+
+    def __init__(self, dsn: str, channel: str = TASK_NOTIFY_CHANNEL):
+        import psycopg2  # noqa: F401 (ImportError si absent : l'appelant revient au polling)
+        self.dsn = dsn
+        self.channel = channel
+        self._callbacks: List[Callable[[], None]] = []
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def subscribe(self, callback: Callable[[], None]):
+        self._callbacks.append(callback)
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="task-notify", daemon=True)
+            self._thread.start()
+
+    def _notify(self):
+        for callback in self._callbacks:
+            callback()
+
+    def _run(self):
+        import psycopg2
+        import psycopg2.extensions
+        while not self._stop.is_set():
+            connection = None
+            try:
+                connection = psycopg2.connect(self.dsn)
+                connection.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                with connection.cursor() as cursor:
+                    cursor.execute(f'LISTEN "{self.channel}"')
+                logger.info(f"🔔 Écoute des nouvelles tâches (canal {self.channel})")
+                self._notify()
+                while not self._stop.is_set():
+                    if select.select([connection], [], [], 5)[0]:
+                        connection.poll()
+                        if connection.notifies:
+                            connection.notifies.clear()
+                            self._notify()
+            except Exception as e:
+                logger.warning(f"Écoute Postgres interrompue ({e}), reconnexion dans 5s")
+                self._stop.wait(5)
+            finally:
+                if connection is not None:
+                    try:
+                        connection.close()
+                    except Exception:
+                        pass
+
+    def close(self):
+        self._stop.set()
+
+
+def create_notifier():
+    """Notifier Postgres si TASK_NOTIFY_DSN est défini et psycopg2 installé, sinon None"""
+    if not TASK_NOTIFY_DSN:
+        return None
+    try:
+        return PostgresNotifier(TASK_NOTIFY_DSN)
+    except ImportError:
+        logger.warning("TASK_NOTIFY_DSN défini mais psycopg2 absent : polling adaptatif")
+        return None
+
+
+class TaskWakeup:
+    """Attente entre deux polls vides : notification ou délai adaptatif"""
+
+    def __init__(self, notifier=None, min_interval: float = POLL_MIN_INTERVAL,
+                 max_interval: float = None):
+        """
+        Args:
+            max_interval: Attente max (défaut : POLL_MAX_INTERVAL avec notifier,
+                          POLL_IDLE_MAX_INTERVAL sans)
+        """
+        self.notifier = notifier
+        self.min_interval = min_interval
+        if max_interval is None:
+            max_interval = POLL_MAX_INTERVAL if notifier is not None else POLL_IDLE_MAX_INTERVAL
+        self.max_interval = max(min_interval, max_interval)
+        self._event = threading.Event()
+        if notifier is not None:
+            notifier.subscribe(self._event.set)
+        # Avec notifications, le poll n'est qu'un filet de sécurité
+        self.delay = self.max_interval if notifier is not None else self.min_interval
+
+    def task_found(self):
+        """Un poll a trouvé du travail : d'autres tâches suivent probablement"""
+        if self.notifier is None:
+            self.delay = self.min_interval
+
+    def wait(self) -> bool:
+        """
+        Attend après un poll vide. Retourne True si réveillé par une
+        notification, False à l'expiration du délai (alors allongé).
+        """
+        woken = self._event.wait(self.delay)
+        self._event.clear()
+        if not woken and self.notifier is None:
+            self.delay = min(self.max_interval, self.delay * 2)
+        return woken
+
+    def close(self):
+        if self.notifier is not None:
+            self.notifier.close()
@@ -10,13 +10,24 @@ import sys
 import time
 import json
 import logging
-import requests
-from typing import Dict, Any, Optional, List
+import threading
+import signal
+from typing import Dict, Any, Optional, List, Iterator
 
 # Ajouter le répertoire courant au path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from analyzer import VideoAnalyzer, YouTubeDownloader
+from analyzer import VideoAnalyzer, YouTubeDownloader, DOWNLOAD_USER_AGENT, snippet_filename
+from ytdlp_engine import get_engine
+from quality_gate import SceneCountGate
+from pipeline import Stage, StageMonitor, DiskBudget
+from candidate_probe import probe_and_rank
+from metadata_cache import MetadataCache
+from dailymotion_client import dailymotion_client
+from task_wakeup import TaskWakeup, create_notifier
+from result_writer import ResultWriter, RESULT_INCLUDE_METADATA
+from result_cache import create_result_cache, analysis_key
+from download_cache import create_download_cache
 from supabase_manager import supabase_manager
 import subprocess
 
@@ -29,8 +40,39 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # Paramètres
-POLL_INTERVAL = 5  # secondes entre chaque vérification de tâches
+POLL_INTERVAL = 5  # secondes d'attente après une erreur (tâches vides : voir task_wakeup.py)
 MAX_ANALYSIS_DURATION = 120  # secondes max d'analyse (trailer)
+# Films : segment plus long, analysé en parallèle par tranches (voir parallel_analysis.py)
+MOVIE_ANALYSIS_DURATION = int(os.getenv("MOVIE_ANALYSIS_DURATION", 600))
+MOVIE_ANALYSIS_WORKERS = int(os.getenv("MOVIE_ANALYSIS_WORKERS", os.cpu_count() or 1))
+# Streaming : analyse pendant le téléchargement (ffmpeg -> analyseur, sans fichier)
+STREAM_ANALYSIS = os.getenv("STREAM_ANALYSIS", "false").lower() in ("1", "true", "yes")
+# Cache disque optionnel : copie du segment écrite pendant le streaming
+STREAM_CACHE_DIR = os.getenv("STREAM_CACHE_DIR") or None
+# Quality check : nombre minimal de scènes d'un candidat, vérifié pendant l'analyse
+MIN_SCENES = int(os.getenv("QUALITY_MIN_SCENES", 15))
+# Borne empirique du rythme de cuts pour abandonner plus tôt (vide = borne exacte min_scene_len)
+_gate_max_cut_rate = os.getenv("QUALITY_GATE_MAX_CUTS_PER_SECOND")
+GATE_MAX_CUTS_PER_SECOND = float(_gate_max_cut_rate) if _gate_max_cut_rate else None
+# Plages de durée admissibles des candidats (secondes)
+EPISODE_DURATION_RANGE = (120, 1800)     # 2-30 min
+MOVIE_DURATION_RANGE = (1800, 10800)     # 30 min - 3 h
+# Titres exclus (bandes-annonces, extraits...)
+EPISODE_EXCLUDED_KEYWORDS = ('trailer', 'bande-annonce', 'teaser', 'preview', 'promo', 'official trailer')
+MOVIE_EXCLUDED_KEYWORDS = EPISODE_EXCLUDED_KEYWORDS + ('extrait',)
+# Pipeline à étages : concurrence de chaque étage (false = une tâche à la fois)
+WORKER_PIPELINE = os.getenv("WORKER_PIPELINE", "true").lower() in ("1", "true", "yes")
+PIPELINE_PROBE_WORKERS = int(os.getenv("PIPELINE_PROBE_WORKERS", 2))
+PIPELINE_DOWNLOAD_WORKERS = int(os.getenv("PIPELINE_DOWNLOAD_WORKERS", 2))
+PIPELINE_ANALYSIS_WORKERS = int(os.getenv("PIPELINE_ANALYSIS_WORKERS", 1))
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", 2))
+PIPELINE_STATS_INTERVAL = int(os.getenv("PIPELINE_STATS_INTERVAL", 60))  # secondes entre deux logs d'occupation
+# Prefetch : tâches réclamées d'avance pendant l'analyse en cours, et espace
+# disque maximal des vidéos téléchargées en attente d'analyse
+PREFETCH_DEPTH = int(os.getenv("WORKER_PREFETCH_DEPTH", 1))
+PREFETCH_DISK_BUDGET_MB = int(os.getenv("PREFETCH_DISK_BUDGET_MB", 2048))
+# Tâches réservées au plus par aller-retour vers Supabase
+TASK_CLAIM_BATCH = int(os.getenv("TASK_CLAIM_BATCH", 4))
 # Dossier temporaire : utiliser TEMP_DIR si défini, sinon un sous-dossier unique par conteneur
 base_temp = os.getenv("TEMP_DIR", "/tmp/videos")
 # Isoler par hostname de conteneur pour éviter les conflits entre workers scalés
@@ -38,16 +80,55 @@ container_id = os.uname().nodename if hasattr(os, 'uname') else os.getenv("HOSTN
 TEMP_DIR = os.path.join(base_temp, container_id)
 os.makedirs(TEMP_DIR, exist_ok=True)
 
+# Cache des métadonnées de probe, partagé entre conteneurs du même hôte (vide = désactivé)
+METADATA_CACHE_PATH = os.getenv("METADATA_CACHE_PATH", os.path.join(base_temp, "metadata_cache.sqlite"))
+
 # Services
 analyzer = VideoAnalyzer(threshold=27.0)
 downloader = YouTubeDownloader()
+metadata_cache = MetadataCache(METADATA_CACHE_PATH) if METADATA_CACHE_PATH else None
+# Résultats d'analyse déjà calculés, partagés avec l'API (voir result_cache.py)
+result_cache = create_result_cache()
+# Segments téléchargés conservés sur disque (budget, LRU) ; orphelins de base_temp nettoyés
+download_cache = create_download_cache(sweep_dirs=[base_temp])
 
 
 def get_video_info(video_url: str) -> Optional[Dict]:
     """
     Récupère les métadonnées d'une vidéo sans la télécharger.
-    Retourne un dict avec 'duration', 'title', etc.
+    Retourne un dict avec 'duration', 'title' et 'formats' (voir metadata_cache).
     """
+    if metadata_cache is None:
+        return _extract_video_info(video_url)
+    info = metadata_cache.get(video_url)
+    if info is not None:
+        logger.debug(f"Métadonnées en cache: {video_url}")
+        return info
+    info = _extract_video_info(video_url)
+    return metadata_cache.put(video_url, info) if info else None
+
+
+def _extract_video_info(video_url: str) -> Optional[Dict]:
+    """Extraction yt-dlp complète (réseau)"""
+    engine = get_engine()
+    if engine is not None:
+        options = {
+            'quiet': True,
+            'no_warnings': True,
+            'ignoreerrors': True,
+            'nocheckcertificate': True,
+            'geo_bypass': True,
+            'http_headers': {'User-Agent': DOWNLOAD_USER_AGENT},
+        }
+        try:
+            info = engine.extract_info(video_url, options, timeout=30)
+            if not info:
+                logger.debug(f"get_video_info failed for {video_url}: aucune information extraite")
+            return info
+        except Exception as e:
+            logger.error(f"Erreur get_video_info pour {video_url}: {e}")
+            return None
+    
     try:
         cmd = [
             sys.executable, '-m', 'yt_dlp',
@@ -59,7 +140,7 @@ def get_video_info(video_url: str) -> Optional[Dict]:
             '--ignore-errors',
             '--no-check-certificate',
             '--geo-bypass',
-            '--user-agent', 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+            '--user-agent', DOWNLOAD_USER_AGENT,
         ]
         result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
         if result.returncode == 0 and result.stdout.strip():
@@ -72,135 +153,28 @@ def get_video_info(video_url: str) -> Optional[Dict]:
     return None
 
 
-def search_episode_flexible(title: str) -> List[Dict]:
+def search_episode_flexible(title: str) -> Iterator[List[Dict]]:
     """
     Recherche un épisode réel via Dailymotion API (pas de clé nécessaire).
     Stratégie :
       - Recherche Dailymotion avec query large
       - Filtre de durée : 120–1800s (2–30 min)
       - Exclusion mots-clés publicitaires
-      - Retourne la liste des vidéos candidates triées par durée décroissante
+      - Générateur paresseux : une liste de candidats par page de résultats,
+        triés par durée décroissante
     """
-    try:
-        query = f"{title} episode"
-        logger.info(f"Recherche Dailymotion: '{query}'")
-        url = "https://api.dailymotion.com/videos"
-        params = {
-            "search": query,
-            "limit": "10",
-            "fields": "id,title,duration,url"
-        }
-        resp = requests.get(url, params=params, timeout=30)
-        if resp.status_code != 200:
-            logger.error(f"Dailymotion API error {resp.status_code}")
-            return []
-        data = resp.json()
-        items = data.get("list", [])
-        if not items:
-            logger.debug(f"Aucun résultat Dailymotion pour '{query}'")
-            return []
-
-        candidates = []
-
-        for video in items:
-            video_url = video.get("url")
-            video_duration = video.get("duration", 0)
-            video_title = video.get("title", "").lower()
-
-            # Exclure trailers/teasers
-            if any(kw in video_title for kw in ['trailer', 'bande-annonce', 'teaser', 'preview', 'promo', 'official trailer']):
-                logger.debug(f"Exclu (trailer): {video_title[:50]}")
-                continue
-
-            # Durée 2-30 min
-            if not (120 <= video_duration <= 1800):
-                logger.debug(f"Durée hors plage ({video_duration}s): {video_title[:50]}")
-                continue
+    return dailymotion_client.search(f"{title} episode", *EPISODE_DURATION_RANGE,
+                                     excluded_keywords=EPISODE_EXCLUDED_KEYWORDS)
 
-            candidates.append({
-                'url': video_url,
-                'title': video.get("title", ""),
-                'duration': video_duration,
-                'source': 'Dailymotion'
-            })
-            logger.info(f"✅ Candidat Dailymotion: {video.get('title','')[:80]} ({video_duration}s)")
-
-        # Trier par durée décroissante
-        candidates.sort(key=lambda x: x['duration'], reverse=True)
-        if candidates:
-            logger.info(f"🎯 {len(candidates)} vidéos candidates trouvées (max {candidates[0]['duration']}s)")
-            return candidates
-        else:
-            logger.warning(f"Aucune vidéo Dailymotion admissible pour: {title}")
-            return []
-
-    except Exception as e:
-        logger.error(f"Erreur lors de la recherche Dailymotion pour '{title}': {e}")
-        return []
 
-
-def search_movie_flexible(title: str) -> List[Dict]:
+def search_movie_flexible(title: str) -> Iterator[List[Dict]]:
     """
     Recherche un film via Dailymotion API.
     Durée attendue : 30 min à 3 heures (1800–10800s)
-    Retourne une liste de candidats triés par durée décroissante.
+    Générateur paresseux : une liste de candidats par page de résultats.
     """
-    try:
-        query = f"{title}"
-        logger.info(f"Recherche Dailymotion (film): '{query}'")
-        url = "https://api.dailymotion.com/videos"
-        params = {
-            "search": query,
-            "limit": "10",
-            "fields": "id,title,duration,url"
-        }
-        resp = requests.get(url, params=params, timeout=30)
-        if resp.status_code != 200:
-            logger.error(f"Dailymotion API error {resp.status_code}")
-            return []
-        data = resp.json()
-        items = data.get("list", [])
-        if not items:
-            logger.debug(f"Aucun résultat Dailymotion pour '{query}'")
-            return []
-
-        candidates = []
-
-        for video in items:
-            video_url = video.get("url")
-            video_duration = video.get("duration", 0)
-            video_title = video.get("title", "").lower()
-
-            # Exclure trailers/teasers
-            if any(kw in video_title for kw in ['trailer', 'bande-annonce', 'teaser', 'preview', 'promo', 'official trailer', 'extrait']):
-                logger.debug(f"Exclu (trailer): {video_title[:50]}")
-                continue
-
-            # Durée 30 min à 3 heures
-            if not (1800 <= video_duration <= 10800):
-                logger.debug(f"Durée hors plage film ({video_duration}s): {video_title[:50]}")
-                continue
-
-            candidates.append({
-                'url': video_url,
-                'title': video.get("title", ""),
-                'duration': video_duration,
-                'source': 'Dailymotion'
-            })
-            logger.info(f"✅ Candidat Dailymotion (film): {video.get('title','')[:80]} ({video_duration}s)")
-
-        # Trier par durée décroissante
-        candidates.sort(key=lambda x: x['duration'], reverse=True)
-        if candidates:
-            logger.info(f"🎯 {len(candidates)} films candidates trouvés (max {candidates[0]['duration']}s)")
-            return candidates
-        else:
-            logger.warning(f"Aucune vidéo Dailymotion admissible pour film: {title}")
-            return []
-
-    except Exception as e:
-        logger.error(f"Erreur lors de la recherche film Dailymotion pour '{title}': {e}")
-        return []
+    return dailymotion_client.search(title, *MOVIE_DURATION_RANGE,
+                                     excluded_keywords=MOVIE_EXCLUDED_KEYWORDS)
 
 
 def find_local_video_url_from_estimation(metadata: Dict) -> Optional[Dict]:
@@ -218,212 +192,339 @@ def find_local_video_url_from_estimation(metadata: Dict) -> Optional[Dict]:
     return None
 
 
-def process_task(task: Dict[str, Any]) -> bool:
+class TaskJob:
     """
-    Traite une tâche d'analyse.
+    État d'une tâche en cours : candidats à tester, candidat courant,
+    segment choisi et vidéo téléchargée (ou flux).
     """
-    task_id = task.get("id")
-    tmdb_id = task.get("tmdb_id")
-    
-    if not task_id or not tmdb_id:
+
+    def __init__(self, task: Dict[str, Any]):
+        self.task = task
+        self.task_id = task.get("id")
+        self.tmdb_id = task.get("tmdb_id")
+        self.meta: Dict[str, Any] = {}
+        self.title = None
+        self.media_type = task.get("media_type", "tv")
+        self.candidates: List[Dict] = []
+        # Pages de résultats restantes (générateur), avec leur plage de durée
+        self.candidate_pages: Optional[Iterator[List[Dict]]] = None
+        self.duration_range = EPISODE_DURATION_RANGE
+        self.next_index = 0
+        self.candidate: Optional[Dict] = None
+        self.segment_start = 0
+        self.segment_duration = 0
+        self.video_source = None
+        self.video_path: Optional[str] = None
+        # Résultat du segment courant trouvé dans le cache (ni téléchargement ni analyse)
+        self.cached_result: Optional[Dict[str, Any]] = None
+        # Segment réservé dans le cache des téléchargements (fichier partagé, non supprimé)
+        self.lease = None
+
+    @property
+    def downloaded_path(self) -> Optional[str]:
+        """Fichier du segment courant sur disque (téléchargé ou réservé dans le cache)"""
+        if self.video_path:
+            return self.video_path
+        return self.lease.path if self.lease is not None else None
+
+    @property
+    def max_analysis_duration(self) -> int:
+        return MOVIE_ANALYSIS_DURATION if self.media_type == "movie" else MAX_ANALYSIS_DURATION
+
+    @property
+    def analysis_workers(self) -> Optional[int]:
+        return MOVIE_ANALYSIS_WORKERS if self.media_type == "movie" else None
+
+
+def start_task(task: Dict[str, Any]) -> Optional[TaskJob]:
+    """
+    Passe la tâche en 'processing' et recherche ses candidats.
+    Retourne None si la tâche est invalide ; lève une exception si aucune vidéo.
+    """
+    job = TaskJob(task)
+    if not job.task_id or not job.tmdb_id:
         logger.error(f"Tâche invalide: {task}")
-        return False
+        return None
     
-    logger.info(f"=== Traitement tâche {task_id} (TMDB ID: {tmdb_id}) ===")
+    # Déjà en 'processing' : la réservation (claim_pending_tasks) a changé le statut
+    logger.info(f"=== Traitement tâche {job.task_id} (TMDB ID: {job.tmdb_id}) ===")
     
-    video_path = None
-    try:
-        supabase_manager.update_analysis_task_status(task_id, "processing")
-        
-        meta = task.get("metadata", {})
-        if not meta:
-            raise Exception(f"Impossible de trouver les métadonnées dans la tâche {task_id}")
-        
-        title = meta.get("title") or meta.get("fr_title", "Série inconnue")
-        logger.info(f"Série: {title}")
-        
-        media_type = task.get("media_type", "tv")
-        episode_info = find_local_video_url_from_estimation(meta.get("metadata", {}))
-        candidates = []
-        if episode_info:
-            candidates = [episode_info]  # une seule candidate locale
+    job.meta = task.get("metadata", {})
+    if not job.meta:
+        raise Exception(f"Impossible de trouver les métadonnées dans la tâche {job.task_id}")
+    
+    job.title = job.meta.get("title") or job.meta.get("fr_title", "Série inconnue")
+    logger.info(f"Série: {job.title}")
+    
+    episode_info = find_local_video_url_from_estimation(job.meta.get("metadata", {}))
+    if episode_info:
+        job.candidates = [episode_info]  # une seule candidate locale
+    else:
+        if job.media_type == "movie":
+            job.candidate_pages, job.duration_range = search_movie_flexible(job.title), MOVIE_DURATION_RANGE
         else:
-            if media_type == "movie":
-                candidates = search_movie_flexible(title)
-            else:
-                candidates = search_episode_flexible(title)
-        
-        if not candidates:
-            raise Exception(f"Impossible de trouver une vidéo pour {title}")
-        
-        logger.info(f"⚙️  {len(candidates)} candidats à tester")
-        
-        for candidate in candidates:
-            video_path = None  # Réinitialiser pour chaque candidat
-            video_url = candidate['url']
-            logger.info(f"🎬 Essai candidat: {candidate.get('title','?')} ({candidate['duration']}s)")
-            
-            try:
-                logger.info(f"Récupération des métadonnées: {video_url}")
-                video_info = get_video_info(video_url)
-                if not video_info:
-                    logger.warning(f"Impossible de récupérer infos vidéo pour {video_url}, candidat suivant")
-                    continue
-                
-                total_duration = video_info.get('duration', 0)
-                logger.info(f"Durée totale: {total_duration}s")
-                
-                if total_duration > 300:
-                    # RULE 2: Commencer au milieu (éviter intro/générique)
-                    segment_start = max(60, int(total_duration * 0.1))  # au moins 60s ou 10%
-                    segment_duration = min(MAX_ANALYSIS_DURATION, total_duration - segment_start)
-                else:
-                    segment_start = 0
-                    segment_duration = min(MAX_ANALYSIS_DURATION, total_duration)
-                
-                logger.info(f"Segment analysé: start={segment_start}s, duration={segment_duration}s")
-                
-                logger.info(f"Téléchargement du segment: {video_url}")
-                video_path = downloader.download_video_snippet(
-                    video_url=video_url,
-                    output_dir=TEMP_DIR,
-                    max_duration=segment_duration,
-                    start_time=segment_start
-                )
-                
-                if not video_path:
-                    logger.warning(f"Échec du téléchargement pour {video_url}, candidat suivant")
-                    continue
-                
-                logger.info("Analyse vidéo en cours...")
-                result = analyzer.analyze_video(video_path, analyze_motion=True, analyze_flashes=True)
-                
-                if not result.get("success"):
-                    error_msg = result.get("error", "Échec de l'analyse")
-                    raise Exception(f"Analyse échouée: {error_msg}")
-                
-                asl = result.get("average_shot_length", 0)
-                real_score = result.get("composite_score", result.get("pacing_score", 0))
-                num_scenes = result.get("num_scenes", 0)
-                scene_details = result.get("scene_details", [])
-                video_duration_analysis = result.get("video_duration", 0)
-                cuts_per_minute = (num_scenes / video_duration_analysis * 60) if video_duration_analysis > 0 else 0
-                motion_intensity = result.get("motion_analysis", {}).get("motion_intensity", 0.0)
-                
-                logger.info(f"Résultat: ASL={asl:.2f}s, Score={real_score:.1f}, Scènes={num_scenes}, CPM={cuts_per_minute:.2f}, Motion={motion_intensity:.2f}")
-                
-                # RULE 1: Quality Check - si trop peu de scènes, vidéo suspecte
-                if num_scenes < 15:
-                    logger.warning(f"⚠  Candidat rejeté (QUALITY CHECK): seulement {num_scenes} scènes sur {segment_duration}s (ASL={asl:.2f}s). Vidéo suspecte (générique/statique/fake).")
-                    continue  # passage au candidat suivant (le finally nettoiera)
-                
-                # Good candidate: sauvegarder et terminer
-                success = supabase_manager.save_mollo_score(
-                    tmdb_id=str(tmdb_id),
-                    real_score=real_score,
-                    asl=asl,
-                    video_url=video_url,
-                    scene_details=scene_details,
-                    source=candidate.get('source', 'unknown'),
-                    video_type='episode' if media_type == 'tv' else 'film',
-                    cuts_per_minute=cuts_per_minute,
-                    video_duration=video_duration_analysis,
-                    motion_intensity=motion_intensity,
-                    metadata=meta  # transmet les métadonnées complètes de la tâche
-                )
-                
-                if not success:
-                    logger.error(f"Échec sauvegarde Mollo pour TMDB ID {tmdb_id} - tâche {task_id}")
-                    raise Exception("Échec de la sauvegarde du score Mollo")
-                
-                supabase_manager.mark_task_completed(task_id)
-                logger.info(f"✅ Tâche {task_id} terminée avec succès (candidat validé)")
-                return True
-                
-            except Exception as e:
-                logger.warning(f"Erreur avec candidat {candidate.get('title', '?')}: {e}")
-                continue
-            finally:
-                # Nettoyage de la vidéo téléchargée après chaque tentative
-                if video_path and os.path.exists(video_path):
-                    try:
-                        os.remove(video_path)
-                        logger.info(f"Vidéo supprimée: {video_path}")
-                    except Exception as e:
-                        logger.warning(f"Impossible de supprimer {video_path}: {e}")
-        
-        # Si on arrive ici, aucun candidat n'a passé le quality check
-        error_msg = f"Aucun candidat vidéo valide pour {title} après vérification qualité"
-        logger.error(f"❌ {error_msg}")
-        supabase_manager.mark_task_failed(task_id, error_msg)
+            job.candidate_pages, job.duration_range = search_episode_flexible(job.title), EPISODE_DURATION_RANGE
+        if not load_next_candidates(job):
+            raise Exception(f"Impossible de trouver une vidéo pour {job.title}")
+    
+    logger.info(f"⚙️  {len(job.candidates)} candidats à tester")
+    return job
+
+
+def load_next_candidates(job: TaskJob) -> bool:
+    """
+    Ajoute les candidats de la page de résultats suivante, probés en
+    parallèle et classés avant tout téléchargement. Les pages sans candidat
+    exploitable sont passées. Retourne False quand les résultats sont épuisés.
+    """
+    if job.candidate_pages is None:
         return False
+    for candidates in job.candidate_pages:
+        if not candidates:
+            continue
+        ranked = probe_and_rank(candidates, job.title, get_video_info, *job.duration_range)
+        if ranked:
+            job.candidates.extend(ranked)
+            return True
+        logger.info("Aucun candidat exploitable sur cette page (liens morts ou hors plage), page suivante")
+    job.candidate_pages = None
+    return False
+
+
+def probe_next_candidate(job: TaskJob) -> bool:
+    """
+    Passe au prochain candidat dont les métadonnées sont lisibles et choisit
+    le segment à analyser. Retourne False quand tous les candidats ont été testés.
+    """
+    while job.next_index < len(job.candidates) or load_next_candidates(job):
+        candidate = job.candidates[job.next_index]
+        job.next_index += 1
+        video_url = candidate['url']
+        logger.info(f"🎬 Essai candidat: {candidate.get('title','?')} ({candidate['duration']}s)")
         
-        logger.info(f"Récupération des métadonnées: {video_url}")
-        video_info = get_video_info(video_url)
+        # Métadonnées déjà récupérées par probe_and_rank, sauf candidat hors délai ou local
+        video_info = candidate.get('info')
+        if video_info is None:
+            logger.info(f"Récupération des métadonnées: {video_url}")
+            video_info = get_video_info(video_url)
         if not video_info:
-            raise Exception("Impossible de récupérer les infos de la vidéo")
+            logger.warning(f"Impossible de récupérer infos vidéo pour {video_url}, candidat suivant")
+            continue
         
         total_duration = video_info.get('duration', 0)
         logger.info(f"Durée totale: {total_duration}s")
         
         if total_duration > 300:
-            segment_start = 120
-            segment_duration = min(MAX_ANALYSIS_DURATION, total_duration - segment_start)
+            # RULE 2: Commencer au milieu (éviter intro/générique)
+            segment_start = max(60, int(total_duration * 0.1))  # au moins 60s ou 10%
+            segment_duration = min(job.max_analysis_duration, total_duration - segment_start)
         else:
             segment_start = 0
-            segment_duration = min(MAX_ANALYSIS_DURATION, total_duration)
+            segment_duration = min(job.max_analysis_duration, total_duration)
         
         logger.info(f"Segment analysé: start={segment_start}s, duration={segment_duration}s")
-        
-        logger.info(f"Téléchargement du segment: {video_url}")
-        video_path = downloader.download_video_snippet(
+        job.candidate = candidate
+        job.segment_start = segment_start
+        job.segment_duration = segment_duration
+        return True
+    
+    job.candidate = None
+    return False
+
+
+def candidate_result_key(job: TaskJob, video_analyzer: VideoAnalyzer = None) -> str:
+    """Clé du cache des résultats pour le segment du candidat courant"""
+    video_analyzer = video_analyzer or analyzer
+    return analysis_key(job.candidate['url'], job.segment_start, job.segment_duration,
+                        video_analyzer.analysis_signature(), analyze_motion=True, analyze_flashes=True)
+
+
+def fetch_candidate(job: TaskJob, output_dir: str = TEMP_DIR, cancel: threading.Event = None) -> bool:
+    """
+    Télécharge le segment du candidat courant (ou prépare son flux en mode
+    streaming). Retourne False si le téléchargement a échoué.
+    `cancel` interrompt un téléchargement en cours (arrêt du worker).
+    """
+    video_url = job.candidate['url']
+    if result_cache is not None:
+        job.cached_result = result_cache.get(candidate_result_key(job))
+        if job.cached_result is not None:
+            logger.info(f"♻️  Segment déjà analysé, résultat en cache: {video_url}")
+            return True
+    
+    if STREAM_ANALYSIS:
+        # Téléchargement et analyse simultanés : pas de fichier à nettoyer
+        logger.info(f"Analyse en streaming du segment: {video_url}")
+        job.video_source = downloader.open_video_stream(
             video_url=video_url,
-            output_dir=TEMP_DIR,
-            max_duration=segment_duration,
-            start_time=segment_start
+            max_duration=job.segment_duration,
+            start_time=job.segment_start,
+            cache_dir=STREAM_CACHE_DIR
         )
-        
-        if not video_path:
-            raise Exception("Échec du téléchargement")
-        
-        logger.info("Analyse vidéo en cours...")
-        result = analyzer.analyze_video(video_path, analyze_motion=True, analyze_flashes=True)
-        
-        if not result.get("success"):
-            error_msg = result.get("error", "Échec de l'analyse")
-            raise Exception(f"Analyse échouée: {error_msg}")
-        
-        asl = result.get("average_shot_length", 0)
-        real_score = result.get("composite_score", result.get("pacing_score", 0))
-        num_scenes = result.get("num_scenes", 0)
-        scene_details = result.get("scene_details", [])
-        video_duration_analysis = result.get("video_duration", 0)
-        cuts_per_minute = (num_scenes / video_duration_analysis * 60) if video_duration_analysis > 0 else 0
-        motion_intensity = result.get("motion_analysis", {}).get("motion_intensity", 0.0)
-        
-        logger.info(f"Résultat: ASL={asl:.2f}s, Score={real_score:.1f}, Scènes={num_scenes}, CPM={cuts_per_minute:.2f}, Motion={motion_intensity:.2f}")
-        
-        success = supabase_manager.save_mollo_score(
-            tmdb_id=str(tmdb_id),
-            real_score=real_score,
-            asl=asl,
-            video_url=video_url,
-            scene_details=scene_details,
-            source=candidate.get('source', 'unknown'),
-            video_type='episode' if media_type == 'tv' else 'film',
-            cuts_per_minute=cuts_per_minute,
-            video_duration=video_duration_analysis,
-            motion_intensity=motion_intensity,
-            metadata=meta  # transmet les métadonnées complètes de la tâche
+        return True
+    
+    if download_cache is not None:
+        logger.info(f"Téléchargement du segment (cache): {video_url}")
+        job.lease = download_cache.acquire(
+            video_url, job.segment_start, job.segment_duration,
+            lambda directory: downloader.download_snippet_to(
+                video_url,
+                os.path.join(directory, snippet_filename(video_url, job.segment_duration, job.segment_start)),
+                max_duration=job.segment_duration,
+                start_time=job.segment_start,
+                cancel=cancel
+            )
         )
+        if job.lease is None:
+            logger.warning(f"Échec du téléchargement pour {video_url}, candidat suivant")
+            return False
+        job.video_source = job.lease.path
+        return True
+    
+    logger.info(f"Téléchargement du segment: {video_url}")
+    job.video_path = downloader.download_video_snippet(
+        video_url=video_url,
+        output_dir=output_dir,
+        max_duration=job.segment_duration,
+        start_time=job.segment_start,
+        cancel=cancel
+    )
+    
+    if not job.video_path:
+        logger.warning(f"Échec du téléchargement pour {video_url}, candidat suivant")
+        return False
+    job.video_source = job.video_path
+    return True
+
+
+def analyze_candidate(job: TaskJob, video_analyzer: VideoAnalyzer = None, writer: ResultWriter = None) -> bool:
+    """
+    Analyse le candidat courant ; s'il passe le quality check, sauvegarde le
+    score et termine la tâche. Retourne False si le candidat est rejeté.
+    Avec `writer`, score et statut sont écrits plus tard, par lots.
+    """
+    video_analyzer = video_analyzer or analyzer
+    video_url = job.candidate['url']
+    
+    logger.info("Analyse vidéo en cours...")
+    gate = SceneCountGate(
+        min_scenes=MIN_SCENES,
+        min_scene_len=video_analyzer.min_scene_len,
+        max_cuts_per_second=GATE_MAX_CUTS_PER_SECOND
+    )
+    if job.cached_result is not None:
+        result = job.cached_result
+    else:
+        result = video_analyzer.analyze_video(job.video_source, analyze_motion=True, analyze_flashes=True,
+                                              workers=job.analysis_workers, gate=gate)
+        if result_cache is not None:
+            # Résultats réussis seulement : un candidat rejeté par le gate n'est pas conservé
+            result_cache.put(candidate_result_key(job, video_analyzer), result)
+    
+    if result.get("rejected"):
+        # RULE 1 vérifiée pendant l'analyse : abandon sans flux optique
+        logger.warning(f"⚠  Candidat rejeté (QUALITY CHECK): {result.get('error')}. Vidéo suspecte (générique/statique/fake).")
+        return False
+    
+    if not result.get("success"):
+        error_msg = result.get("error", "Échec de l'analyse")
+        raise Exception(f"Analyse échouée: {error_msg}")
+    
+    asl = result.get("average_shot_length", 0)
+    real_score = result.get("composite_score", result.get("pacing_score", 0))
+    num_scenes = result.get("num_scenes", 0)
+    scene_details = result.get("scene_details", [])
+    video_duration_analysis = result.get("video_duration", 0)
+    cuts_per_minute = (num_scenes / video_duration_analysis * 60) if video_duration_analysis > 0 else 0
+    motion_intensity = result.get("motion_analysis", {}).get("motion_intensity", 0.0)
+    
+    logger.info(f"Résultat: ASL={asl:.2f}s, Score={real_score:.1f}, Scènes={num_scenes}, CPM={cuts_per_minute:.2f}, Motion={motion_intensity:.2f}")
+    
+    # RULE 1: Quality Check - si trop peu de scènes, vidéo suspecte
+    if num_scenes < MIN_SCENES:
+        logger.warning(f"⚠  Candidat rejeté (QUALITY CHECK): seulement {num_scenes} scènes sur {job.segment_duration}s (ASL={asl:.2f}s). Vidéo suspecte (générique/statique/fake).")
+        return False
+    
+    # Good candidate: sauvegarder et terminer
+    score_row = supabase_manager.mollo_score_row(
+        tmdb_id=str(job.tmdb_id),
+        real_score=real_score,
+        asl=asl,
+        video_url=video_url,
+        scene_details=scene_details,
+        source=job.candidate.get('source', 'unknown'),
+        video_type='episode' if job.media_type == 'tv' else 'film',
+        cuts_per_minute=cuts_per_minute,
+        video_duration=video_duration_analysis,
+        motion_intensity=motion_intensity,
+        # Métadonnées déjà stockées dans la tâche : renvoyées seulement sur demande
+        metadata=job.meta if RESULT_INCLUDE_METADATA else None
+    )
+    if writer is not None:
+        # Passage en 'completed' seulement après l'écriture du score (voir result_writer.py)
+        writer.complete(job.task_id, score_row)
+        logger.info(f"✅ Tâche {job.task_id} validée, score en attente d'écriture groupée")
+        return True
+    
+    success = supabase_manager.save_mollo_scores([score_row])
+    if not success:
+        logger.error(f"Échec sauvegarde Mollo pour TMDB ID {job.tmdb_id} - tâche {job.task_id}")
+        raise Exception("Échec de la sauvegarde du score Mollo")
+    
+    supabase_manager.mark_task_completed(job.task_id)
+    logger.info(f"✅ Tâche {job.task_id} terminée avec succès (candidat validé)")
+    return True
+
+
+def cleanup_candidate(job: TaskJob):
+    """Nettoyage de la vidéo téléchargée après chaque tentative"""
+    video_path, job.video_path, job.video_source = job.video_path, None, None
+    job.cached_result = None
+    lease, job.lease = job.lease, None
+    if lease is not None:
+        # Segment conservé dans le cache des téléchargements
+        lease.release()
+    if video_path:
+        # Supprimée quand aucun autre candidat ne partage ce téléchargement
+        downloader.release_snippet(video_path)
+        logger.info(f"Vidéo libérée: {video_path}")
+
+
+def fail_task(job: TaskJob, error_msg: str = None, writer: ResultWriter = None):
+    """Aucun candidat n'a passé le quality check"""
+    error_msg = error_msg or f"Aucun candidat vidéo valide pour {job.title} après vérification qualité"
+    logger.error(f"❌ {error_msg}")
+    if writer is not None:
+        writer.fail(job.task_id, error_msg)
+    else:
+        supabase_manager.mark_task_failed(job.task_id, error_msg)
+
+
+def process_task(task: Dict[str, Any]) -> bool:
+    """
+    Traite une tâche d'analyse.
+    """
+    task_id = task.get("id")
+    try:
+        job = start_task(task)
+        if job is None:
+            return False
         
-        if not success:
-            logger.error(f"Échec sauvegarde Mollo pour TMDB ID {tmdb_id} - tâche {task_id}")
-            raise Exception("Échec de la sauvegarde du score Mollo")
+        while probe_next_candidate(job):
+            try:
+                if not fetch_candidate(job):
+                    continue
+                if analyze_candidate(job):
+                    return True
+            except Exception as e:
+                logger.warning(f"Erreur avec candidat {job.candidate.get('title', '?')}: {e}")
+                continue
+            finally:
+                cleanup_candidate(job)
         
-        supabase_manager.mark_task_completed(task_id)
-        logger.info(f"✅ Tâche {task_id} terminée avec succès")
-        return True
+        # Si on arrive ici, aucun candidat n'a passé le quality check
+        fail_task(job)
+        return False
         
     except Exception as e:
         logger.error(f"❌ Erreur sur tâche {task_id}: {e}")
@@ -431,12 +532,246 @@ def process_task(task: Dict[str, Any]) -> bool:
         return False
 
 
+class WorkerPipeline:
+    """
+    Worker à étages : recherche / probe, téléchargement et analyse ont
+    chacun leur pool de threads et leur file bornée (voir pipeline.py).
+    
+    Un candidat qui échoue au téléchargement ou à l'analyse est renvoyé à
+    l'étage de probe pour passer au candidat suivant de la même tâche.
+    
+    Prefetch : au plus `prefetch_depth` tâches sont réclamées en plus de
+    celles en cours d'analyse ; leurs recherches et téléchargements avancent
+    pendant l'analyse. Les vidéos en attente d'analyse sont limitées par un
+    budget disque. Une tâche abandonnée (arrêt du worker, erreur inattendue
+    d'un étage) est remise en 'pending'.
+    """
+    
+    def __init__(self, probe_workers: int = PIPELINE_PROBE_WORKERS,
+                 download_workers: int = PIPELINE_DOWNLOAD_WORKERS,
+                 analysis_workers: int = PIPELINE_ANALYSIS_WORKERS,
+                 queue_size: int = PIPELINE_QUEUE_SIZE,
+                 prefetch_depth: int = PREFETCH_DEPTH,
+                 disk_budget_mb: int = PREFETCH_DISK_BUDGET_MB,
+                 wakeup: TaskWakeup = None):
+        self.probe = Stage("probe", self._probe, probe_workers, queue_size, on_error=self._abandon)
+        self.download = Stage("download", self._download, download_workers, queue_size, on_error=self._abandon)
+        self.analysis = Stage("analysis", self._analyze, analysis_workers, queue_size, on_error=self._abandon)
+        self.stages = [self.probe, self.download, self.analysis]
+        # Scores et statuts écrits par lots (write-behind)
+        self.writer = ResultWriter(supabase_manager)
+        counters = {"cache recherche Dailymotion": dailymotion_client.stats, "supabase": supabase_manager.stats,
+                    "écriture des résultats": self.writer.stats}
+        if metadata_cache:
+            counters["cache métadonnées"] = metadata_cache.stats
+        if result_cache:
+            counters["cache résultats"] = result_cache.stats
+        if download_cache:
+            counters["cache téléchargements"] = download_cache.stats
+        self.monitor = StageMonitor(self.stages, interval=PIPELINE_STATS_INTERVAL, counters=counters)
+        self.prefetch_depth = max(0, prefetch_depth)
+        self.wakeup = wakeup or TaskWakeup(create_notifier())
+        self.disk_budget = DiskBudget(disk_budget_mb * 1024 * 1024)
+        # Un analyseur par thread d'analyse (statistiques de dernière analyse non partagées)
+        self._analyzers = threading.local()
+        self._lock = threading.Lock()
+        # Tâches réclamées et pas encore terminées : id -> tâche (dict) ou TaskJob
+        self._in_flight: Dict[Any, Any] = {}
+        self._stopping = threading.Event()
+        self.processed_count = 0
+    
+    # ---- Suivi des tâches réclamées ----
+    
+    def _claim(self, limit: int) -> List[Dict[str, Any]]:
+        """Réserve jusqu'à `limit` tâches en un seul aller-retour"""
+        tasks = supabase_manager.claim_pending_tasks(limit)
+        with self._lock:
+            for task in tasks:
+                self._in_flight[task.get("id")] = task
+        return tasks
+    
+    def _track(self, job: TaskJob):
+        with self._lock:
+            self._in_flight[job.task_id] = job
+    
+    def _finish(self, task_id):
+        with self._lock:
+            self._in_flight.pop(task_id, None)
+    
+    def _claim_capacity(self) -> int:
+        """Tâches réservables maintenant (limite du prefetch, place dans l'étage de probe)"""
+        if not self.probe.has_capacity():
+            return 0
+        with self._lock:
+            in_flight = len(self._in_flight)
+        return min(TASK_CLAIM_BATCH, self.analysis.workers + self.prefetch_depth - in_flight)
+    
+    def _discard(self, job: TaskJob):
+        """Supprime la vidéo du candidat courant et libère son budget disque"""
+        if job.downloaded_path:
+            self.disk_budget.remove(job.downloaded_path)
+        cleanup_candidate(job)
+    
+    def _release(self, item):
+        """Remet une tâche réclamée en 'pending' (fichiers supprimés)"""
+        if isinstance(item, TaskJob):
+            self._discard(item)
+            task_id = item.task_id
+        else:
+            task_id = item.get("id")
+        self._finish(task_id)
+        if supabase_manager.release_task(task_id):
+            logger.info(f"↩️  Tâche {task_id} remise en pending")
+        else:
+            logger.warning(f"Impossible de remettre la tâche {task_id} en pending")
+    
+    def _abandon(self, item, error: Exception):
+        """Erreur inattendue d'un étage : la tâche est rendue à la file"""
+        self._release(item)
+    
+    # ---- Étages ----
+    
+    def _probe(self, item):
+        """Nouvelle tâche (dict) ou tâche renvoyée (TaskJob) : candidat suivant"""
+        if isinstance(item, TaskJob):
+            job = item
+        else:
+            try:
+                job = start_task(item)
+            except Exception as e:
+                logger.error(f"❌ Erreur sur tâche {item.get('id')}: {e}")
+                self.writer.fail(item.get("id"), str(e))
+                self._finish(item.get("id"))
+                return
+            if job is None:
+                self._finish(item.get("id"))
+                return
+            self._track(job)
+        
+        try:
+            found = probe_next_candidate(job)
+        except Exception as e:
+            logger.warning(f"Erreur de probe pour la tâche {job.task_id}: {e}")
+            self.probe.resubmit(job)
+            return
+        if not found:
+            fail_task(job, writer=self.writer)
+            self._finish(job.task_id)
+            return
+        if not self.download.submit(job):
+            self._release(job)  # arrêt du worker
+    
+    def _download(self, job: TaskJob):
+        if not self.disk_budget.wait_for_room(self._stopping):
+            self._release(job)
+            return
+        # Dossier par thread : deux téléchargements simultanés ne partagent pas de fichier
+        output_dir = os.path.join(TEMP_DIR, threading.current_thread().name)
+        try:
+            if fetch_candidate(job, output_dir=output_dir, cancel=self._stopping):
+                if job.downloaded_path:
+                    # Segments en cache compris : réservés jusqu'à l'analyse, l'éviction
+                    # du cache (DOWNLOAD_CACHE_MAX_MB) ne peut pas les supprimer
+                    self.disk_budget.add(job.downloaded_path)
+                if not self.analysis.submit(job):
+                    self._release(job)  # arrêt du worker
+                return
+        except Exception as e:
+            logger.warning(f"Erreur avec candidat {job.candidate.get('title', '?')}: {e}")
+        self._discard(job)
+        self.probe.resubmit(job)
+    
+    def _analyze(self, job: TaskJob):
+        video_analyzer = getattr(self._analyzers, "analyzer", None)
+        if video_analyzer is None:
+            video_analyzer = self._analyzers.analyzer = VideoAnalyzer(threshold=analyzer.threshold)
+        try:
+            if analyze_candidate(job, video_analyzer, writer=self.writer):
+                self._finish(job.task_id)
+                with self._lock:
+                    self.processed_count += 1
+                    logger.info(f"📊 Total traité: {self.processed_count} tâches")
+                return
+        except Exception as e:
+            logger.warning(f"Erreur avec candidat {job.candidate.get('title', '?')}: {e}")
+        finally:
+            self._discard(job)
+        self.probe.resubmit(job)
+    
+    # ---- Boucle principale ----
+    
+    def run(self):
+        for stage in self.stages:
+            stage.start()
+        self.monitor.start()
+        logger.info(f"Pipeline: probe x{self.probe.workers}, téléchargement x{self.download.workers}, "
+                    f"analyse x{self.analysis.workers}, prefetch {self.prefetch_depth} tâche(s), "
+                    f"budget disque {self.disk_budget.max_bytes // (1024 * 1024)} Mo")
+        try:
+            while True:
+                # Ne réclamer que dans la limite du prefetch et si l'étage de probe peut accepter
+                capacity = self._claim_capacity()
+                if capacity <= 0:
+                    time.sleep(0.5)
+                    continue
+                try:
+                    tasks = self._claim(capacity)
+                except Exception as e:
+                    logger.error(f"Erreur dans la boucle principale: {e}", exc_info=True)
+                    tasks = []
+                for task in tasks:
+                    logger.info(f"Tâche trouvée: ID={task.get('id')} TMDB={task.get('tmdb_id')}")
+                    self.probe.submit(task)
+                if tasks:
+                    self.wakeup.task_found()
+                else:
+                    logger.debug(f"Aucune tâche pending, attente (max {self.wakeup.delay:.1f}s)...")
+                    self.wakeup.wait()
+        finally:
+            self.stop()
+    
+    def stop(self):
+        """Arrête les étages et remet en 'pending' les tâches réclamées non terminées"""
+        self._stopping.set()
+        self.wakeup.close()
+        self.monitor.stop()
+        for stage in self.stages:
+            stage.stop()
+        self.writer.close()
+        with self._lock:
+            abandoned = list(self._in_flight.values())
+        for item in abandoned:
+            self._release(item)
+
+
+def _interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
 def main_loop():
     """Boucle principale du worker"""
     logger.info("🚀 Démarrage du worker Mollo")
-    logger.info(f"Polling toutes les {POLL_INTERVAL}s")
+    wakeup = TaskWakeup(create_notifier())
+    if wakeup.notifier is not None:
+        logger.info(f"Réveil sur notification, poll de sécurité toutes les {wakeup.max_interval:.0f}s")
+    else:
+        logger.info(f"Polling adaptatif de {wakeup.min_interval}s à {wakeup.max_interval:.0f}s "
+                    f"(TASK_NOTIFY_DSN vide : un poll toutes les {wakeup.max_interval:.0f}s au repos)")
+    # Mêmes chemins que ceux affichés par l'API : caches partagés
+    logger.info(f"Cache des résultats: {result_cache.path if result_cache else 'désactivé'}")
+    logger.info(f"Cache des segments: {download_cache.directory if download_cache else 'désactivé'}")
     logger.info("=" * 60)
     
+    if WORKER_PIPELINE:
+        # docker stop (SIGTERM) : même arrêt que Ctrl+C, les tâches réclamées sont rendues
+        signal.signal(signal.SIGTERM, _interrupt)
+        try:
+            WorkerPipeline(wakeup=wakeup).run()
+        except KeyboardInterrupt:
+            logger.info("🛑 Arrêt demandé (Ctrl+C)")
+        logger.info("👋 Worker arrêté")
+        return
+    
     processed_count = 0
     
     while True:
@@ -450,9 +785,10 @@ def main_loop():
                 if success:
                     processed_count += 1
                     logger.info(f"📊 Total traité: {processed_count} tâches")
+                wakeup.task_found()
             else:
-                logger.debug("Aucune tâche pending, attente...")
-                time.sleep(POLL_INTERVAL)
+                logger.debug(f"Aucune tâche pending, attente (max {wakeup.delay:.1f}s)...")
+                wakeup.wait()
                 
         except KeyboardInterrupt:
             logger.info("🛑 Arrêt demandé (Ctrl+C)")
@@ -0,0 +1,205 @@
+"""
+Moteur yt-dlp en processus pour PacingScore
+
+Au lieu de lancer `python -m yt_dlp` à chaque probe ou téléchargement
+(démarrage de l'interpréteur, import de yt-dlp, initialisation des
+extracteurs), les appels passent par des instances `yt_dlp.YoutubeDL`
+réutilisées :
+- deux pools de threads exécutent les appels, l'un pour les probes
+  (extract_info), l'autre pour les téléchargements : des téléchargements
+  longs ne retardent pas les probes ; chaque thread garde une instance par
+  jeu d'options (cookies, jetons et état des extracteurs conservés) ;
+- chaque appel a un délai, compté à partir de son démarrage effectif ;
+  l'attente dans la file du pool est bornée séparément (même délai par
+  défaut) : l'appelant n'attend jamais plus que la somme des deux ;
+- un appel hors délai ou annulé (threading.Event) libère l'appelant
+  immédiatement ; un téléchargement est interrompu (hook de progression,
+  ou arrêt du ffmpeg lancé par yt-dlp), une extraction bloquée sur le
+  réseau se termine au plus tard après YTDLP_SOCKET_TIMEOUT secondes sans
+  données (socket_timeout de YoutubeDL), libérant son thread.
+
+YTDLP_IN_PROCESS=false revient aux sous-processus.
+"""
+
+import os
+import json
+import time
+import signal
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    import yt_dlp
+    from yt_dlp.utils import DownloadCancelled
+except ImportError:  # moteur indisponible : les appelants gardent les sous-processus
+    yt_dlp = None
+    DownloadCancelled = Exception
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+IN_PROCESS = os.getenv("YTDLP_IN_PROCESS", "true").lower() in ("1", "true", "yes")
+ENGINE_WORKERS = int(os.getenv("YTDLP_ENGINE_WORKERS", 4))  # téléchargements
+PROBE_WORKERS = int(os.getenv("YTDLP_PROBE_WORKERS", 4))  # extract_info
+SOCKET_TIMEOUT = float(os.getenv("YTDLP_SOCKET_TIMEOUT", 20))  # secondes sans données sur une connexion
+
+
+class YtDlpCancelled(Exception):
+    """Appel yt-dlp annulé ou hors délai"""
+
+
+def _kill_child_processes(marker: str):
+    """
+    Tue les processus enfants dont la ligne de commande contient `marker`
+    (ffmpeg lancé par yt-dlp pour un fichier donné). Linux uniquement.
+    """
+    if not os.path.isdir("/proc"):
+        return
+    own_pid = os.getpid()
+    marker_bytes = marker.encode()
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "rb") as f:
+                # pid (comm) state ppid ... : comm peut contenir des espaces
+                parent_pid = int(f.read().rsplit(b")", 1)[1].split()[1])
+            if parent_pid != own_pid:
+                continue
+            with open(f"/proc/{entry}/cmdline", "rb") as f:
+                if marker_bytes not in f.read():
+                    continue
+            os.kill(int(entry), signal.SIGKILL)
+            logger.info(f"[YT-DLP] Processus {entry} arrêté (annulation)")
+        except (OSError, ValueError, IndexError):
+            continue
+
+
+class YtDlpEngine:
+    """
+    Pool d'instances YoutubeDL réutilisées.
+
+    `options` reprend les paramètres de YoutubeDL (équivalents des options
+    de ligne de commande : format, http_headers, external_downloader...).
+    """
+
+    def __init__(self, workers: int = ENGINE_WORKERS, probe_workers: int = PROBE_WORKERS):
+        if yt_dlp is None:
+            raise RuntimeError("yt_dlp n'est pas installé")
+        self._downloads = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="yt-dlp")
+        self._probes = ThreadPoolExecutor(max_workers=max(1, probe_workers), thread_name_prefix="yt-dlp-probe")
+        self._local = threading.local()
+
+    # ---- Instances par thread ----
+
+    def _client(self, options: Dict[str, Any]) -> "yt_dlp.YoutubeDL":
+        clients = getattr(self._local, "clients", None)
+        if clients is None:
+            clients = self._local.clients = {}
+        key = json.dumps(options, sort_keys=True)
+        if key not in clients:
+            params = dict(options)
+            params.setdefault("socket_timeout", SOCKET_TIMEOUT)
+            params["progress_hooks"] = [self._check_cancelled]
+            clients[key] = yt_dlp.YoutubeDL(params)
+        return clients[key]
+
+    def _check_cancelled(self, status: Dict[str, Any]):
+        cancelled = getattr(self._local, "cancelled", None)
+        if cancelled is not None and cancelled.is_set():
+            raise DownloadCancelled("Téléchargement annulé")
+
+    # ---- Exécution ----
+
+    def _run(self, executor: ThreadPoolExecutor, call: Callable[[], Any], timeout: float,
+             cancel: threading.Event = None, kill_marker: str = None, queue_timeout: float = None) -> Any:
+        """
+        Exécute `call` sur `executor` : au plus `queue_timeout` secondes
+        d'attente dans la file (défaut : `timeout`), puis `timeout` secondes
+        d'exécution ; YtDlpCancelled au-delà ou si `cancel` est levé.
+        """
+        queue_limit = timeout if queue_timeout is None else queue_timeout
+        queue_deadline = time.monotonic() + queue_limit
+        cancelled = threading.Event()
+        started: List[float] = []  # début effectif de l'appel (hors attente dans la file)
+        lock = threading.Lock()  # démarrage et abandon dans la file mutuellement exclusifs
+
+        def task():
+            self._local.cancelled = cancelled
+            try:
+                with lock:
+                    if cancelled.is_set():
+                        raise DownloadCancelled("Appel annulé avant son démarrage")
+                    started.append(time.monotonic())
+                return call()
+            finally:
+                self._local.cancelled = None
+
+        future = executor.submit(task)
+        while True:
+            deadline = started[0] + timeout if started else queue_deadline
+            try:
+                return future.result(timeout=min(0.2, max(0.0, deadline - time.monotonic())))
+            except FutureTimeoutError:
+                pass
+            with lock:
+                # Début de l'appel entre-temps : le délai d'exécution remplace celui de la file
+                deadline = started[0] + timeout if started else queue_deadline
+                if time.monotonic() < deadline and not (cancel is not None and cancel.is_set()):
+                    continue
+                # Délai dépassé ou annulation : libérer l'appelant, interrompre le travail
+                cancelled.set()
+                queued = not started
+            future.cancel()
+            if kill_marker:
+                _kill_child_processes(kill_marker)
+            if cancel is not None and cancel.is_set():
+                raise YtDlpCancelled("Appel yt-dlp annulé")
+            if queued:
+                raise YtDlpCancelled(f"Timeout yt-dlp (en file d'attente depuis {queue_limit:.0f}s)")
+            raise YtDlpCancelled(f"Timeout yt-dlp ({timeout:.0f}s)")
+
+    def extract_info(self, url: str, options: Dict[str, Any], timeout: float = 30,
+                     cancel: threading.Event = None) -> Optional[Dict]:
+        """Métadonnées (équivalent de --dump-single-json), None si yt-dlp n'a rien extrait"""
+        def call():
+            ydl = self._client(options)
+            info = ydl.extract_info(url, download=False)
+            return ydl.sanitize_info(info) if info else None
+        return self._run(self._probes, call, timeout, cancel)
+
+    def download(self, url: str, output_path: str, options: Dict[str, Any],
+                 downloader_args: List[str] = None, timeout: float = 180,
+                 cancel: threading.Event = None) -> str:
+        """Télécharge dans `output_path` (équivalent de --output / --external-downloader-args)"""
+        def call():
+            ydl = self._client(options)
+            # Instance propre au thread : paramètres par appel modifiables sans verrou
+            ydl.params["outtmpl"]["default"] = output_path
+            if downloader_args is not None:
+                ydl.params["external_downloader_args"] = {"default": downloader_args}
+            if ydl.download([url]) != 0:
+                raise Exception("Erreur yt-dlp: téléchargement échoué")
+            return output_path
+        return self._run(self._downloads, call, timeout, cancel, kill_marker=output_path)
+
+    def close(self):
+        self._downloads.shutdown(wait=False, cancel_futures=True)
+        self._probes.shutdown(wait=False, cancel_futures=True)
+
+
+_engine: Optional[YtDlpEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> Optional[YtDlpEngine]:
+    """Moteur partagé du processus, None si désactivé (YTDLP_IN_PROCESS) ou yt_dlp absent"""
+    global _engine
+    if not IN_PROCESS or yt_dlp is None:
+        return None
+    with _engine_lock:
+        if _engine is None:
+            _engine = YtDlpEngine()
+        return _engine